@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import LoggerService
+
+
+class StubSentimentAnalyzer:
+    # Stands in for the HuggingFace pipeline: a fixed cost per forward pass plus a small per-text cost.
+    def __init__(self, call_cost: float, text_cost: float):
+        self.call_cost = call_cost
+        self.text_cost = text_cost
+
+    async def analyze_sentiment(self, text: str) -> str:
+        return (await self.analyze_sentiment_batch([text]))[0]
+
+    async def analyze_sentiment_batch(self, texts: list) -> list:
+        await asyncio.sleep(self.call_cost + self.text_cost * len(texts))
+        return ['negative' if 'failed' in text else 'neutral' for text in texts]
+
+
+class SlowSubscriber:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def receive(self, message: str) -> None:
+        await asyncio.sleep(self.delay)
+
+
+async def log_inline(logger: LoggerService, analyzer: StubSentimentAnalyzer, subscribers: list, lock: asyncio.Lock, message: str) -> None:
+    # The pre-queue behaviour: score, emit and fan out serially under a global lock.
+    sentiment_level = await analyzer.analyze_sentiment(message)
+    async with lock:
+        logger.logger.log(logger._level_number(logger._adjust_log_level('info', sentiment_level)), message)
+        for subscriber in subscribers:
+            await subscriber.receive(message)
+
+
+async def main(args: argparse.Namespace) -> None:
+    logging.disable(logging.CRITICAL)
+    analyzer = StubSentimentAnalyzer(args.call_cost, args.text_cost)
+    subscribers = [SlowSubscriber(args.subscriber_delay) for _ in range(args.subscribers)]
+    messages = [f"Processed file {i} in {i % 17} ms" for i in range(args.messages)]
+
+    logger = LoggerService.get_instance("BenchLogger")
+    lock = asyncio.Lock()
+    start = time.perf_counter()
+    for message in messages:
+        await log_inline(logger, analyzer, subscribers, lock, message)
+    inline_elapsed = time.perf_counter() - start
+
+    logger.configure({'subscriber_queue_size': args.messages}, analyzer)
+    for subscriber in subscribers:
+        logger.subscribe(subscriber)
+    start = time.perf_counter()
+    for message in messages:
+        await logger.log('info', message)
+    enqueue_elapsed = time.perf_counter() - start
+    await logger.close()
+    drained_elapsed = time.perf_counter() - start
+
+    print(f"{args.messages} messages, {args.subscribers} subscribers")
+    print(f"  inline:  {args.messages / inline_elapsed:12.0f} logs/s")
+    print(f"  queued:  {args.messages / enqueue_elapsed:12.0f} logs/s at the call site, "
+          f"{args.messages / drained_elapsed:.0f} logs/s fully drained")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare inline and queue-based LoggerService throughput")
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--subscribers', type=int, default=3)
+    parser.add_argument('--call-cost', type=float, default=0.002, help='Seconds per sentiment model call')
+    parser.add_argument('--text-cost', type=float, default=0.0001, help='Extra seconds per text in a call')
+    parser.add_argument('--subscriber-delay', type=float, default=0.0005)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,47 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import FileManager
+from src.processing.metadata_extractor import ContentHarvester
+
+
+def load_corpus(input_dir: str, copies: int) -> list:
+    corpus = []
+    for path in FileManager.find_files(input_dir):
+        with open(path, encoding='utf-8', errors='ignore') as f:
+            corpus.append((path, f.read()))
+    return corpus * copies
+
+
+async def run_mode(corpus: list, mode: str, workers: int) -> float:
+    harvester = ContentHarvester({'metadata_options': {'executor': mode, 'max_workers': workers}})
+    try:
+        # Warm the pool so worker start-up is not counted against throughput.
+        await harvester.extract_metadata(*corpus[0])
+        start = time.perf_counter()
+        await asyncio.gather(*(harvester.extract_metadata(path, text) for path, text in corpus))
+        return time.perf_counter() - start
+    finally:
+        harvester.shutdown()
+
+
+async def main(args: argparse.Namespace) -> None:
+    corpus = load_corpus(args.input_dir, args.copies)
+    total_mb = sum(len(text) for _, text in corpus) / 1e6
+    print(f"{len(corpus)} files, {total_mb:.1f} MB, {args.workers} workers")
+    for mode in ('inline', 'process'):
+        elapsed = await run_mode(corpus, mode, args.workers)
+        print(f"{mode:>8}: {elapsed:7.2f}s  {len(corpus) / elapsed:8.1f} files/s  {total_mb / elapsed:6.2f} MB/s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare inline and process-pool metadata extraction over mock/input")
+    parser.add_argument('--input-dir', default='./mock/input')
+    parser.add_argument('--copies', type=int, default=50, help='How many times to repeat the corpus')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,63 @@
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import FileManager
+from src.processing.metadata_extractor import MetadataParser, detect_format
+
+
+def html_sample(index: int, sections: int = 40) -> str:
+    body = ''.join(
+        f"<h2>Section {i}</h2><p>Paragraph {i} with a [ref-{i}] and <a href='#s{i}'>link</a>.</p>"
+        f"<div class='x'><span>{'lorem ipsum ' * 20}</span></div>"
+        for i in range(sections)
+    )
+    return (f"<html><head><title>Page {index}</title><meta name='keywords' content='alpha, beta, gamma'>"
+            f"<meta name='description' content='Synthetic page {index}'></head><body><h1>Page {index}</h1>{body}</body></html>")
+
+
+def load_corpus(input_dir: str, html_pages: int) -> list:
+    corpus = []
+    for path in FileManager.find_files(input_dir):
+        with open(path, encoding='utf-8', errors='ignore') as f:
+            corpus.append((path, f.read()))
+    corpus.extend((f"page_{i}.html", html_sample(i)) for i in range(html_pages))
+    return corpus
+
+
+def time_per_format(parse, corpus: list, rounds: int) -> dict:
+    totals = defaultdict(float)
+    for _ in range(rounds):
+        for path, text in corpus:
+            start = time.perf_counter()
+            parse(path, text)
+            totals[detect_format(path, text)] += time.perf_counter() - start
+    return totals
+
+
+def main(args: argparse.Namespace) -> None:
+    corpus = load_corpus(args.input_dir, args.html_pages)
+    counts = defaultdict(int)
+    for path, text in corpus:
+        counts[detect_format(path, text)] += args.rounds
+    full = time_per_format(MetadataParser({'metadata_options': {'fast_path': False}}).parse, corpus, args.rounds)
+    fast = time_per_format(MetadataParser({'metadata_options': {'fast_path': True}}).parse, corpus, args.rounds)
+    print(f"{'format':>10} {'files':>7} {'full ms/file':>13} {'fast ms/file':>13} {'speedup':>8}")
+    for content_format in sorted(counts):
+        full_ms = full[content_format] / counts[content_format] * 1000
+        fast_ms = fast[content_format] / counts[content_format] * 1000
+        print(f"{content_format:>10} {counts[content_format]:>7} {full_ms:>13.3f} {fast_ms:>13.3f} {full_ms / max(fast_ms, 1e-9):>7.1f}x")
+    print(f"{'total':>10} {sum(counts.values()):>7} {sum(full.values()):>12.2f}s {sum(fast.values()):>12.2f}s "
+          f"{sum(full.values()) / max(sum(fast.values()), 1e-9):>7.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Per-file metadata cost of the full BeautifulSoup path versus the format-aware fast path")
+    parser.add_argument('--input-dir', default='./mock/input')
+    parser.add_argument('--html-pages', type=int, default=20, help='Synthetic HTML pages added to the mock corpus')
+    parser.add_argument('--rounds', type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,62 @@
+import argparse
+import os
+import resource
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import ModelRegistry
+
+VOCAB = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]'] + [chr(c) for c in range(ord('a'), ord('z') + 1)] + ['the', 'file', 'data']
+
+
+def build_tiny_model(directory: str, hidden_size: int, num_labels: int, head: str) -> str:
+    # Randomly initialised BERT small enough to build in milliseconds, so this runs offline.
+    from transformers import BertConfig, BertForSequenceClassification, BertForTokenClassification, BertTokenizerFast
+    os.makedirs(directory, exist_ok=True)
+    vocab_file = os.path.join(directory, 'vocab.txt')
+    with open(vocab_file, 'w') as f:
+        f.write('\n'.join(VOCAB))
+    config = BertConfig(vocab_size=len(VOCAB), hidden_size=hidden_size, num_hidden_layers=2, num_attention_heads=2,
+                        intermediate_size=hidden_size * 2, max_position_embeddings=128, num_labels=num_labels)
+    model_class = BertForTokenClassification if head == 'token' else BertForSequenceClassification
+    model_class(config).save_pretrained(directory)
+    BertTokenizerFast(vocab_file=vocab_file, model_max_length=128).save_pretrained(directory)
+    return directory
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as root:
+        sentiment_model = build_tiny_model(os.path.join(root, 'sentiment'), args.hidden_size, 2, 'sequence')
+        ner_model = build_tiny_model(os.path.join(root, 'ner'), args.hidden_size, 5, 'token')
+
+        registry = ModelRegistry({'memory_budget_mb': args.budget_mb})
+        with ThreadPoolExecutor(args.threads) as pool:
+            pipelines = list(pool.map(lambda _: registry.load('sentiment-analysis', sentiment_model), range(args.threads)))
+        assert all(p is pipelines[0] for p in pipelines), "concurrent loads of one key must share a pipeline"
+        assert registry.stats['loads'] == 1, registry.stats
+        print(f"{args.threads} concurrent requests -> {registry.stats['loads']} load, "
+              f"{registry.total_bytes() / 1e6:.2f} MB resident in registry")
+
+        registry.load('ner', ner_model)
+        assert registry.stats['evictions'] >= 1, registry.stats
+        assert ('sentiment-analysis', sentiment_model) not in registry.entries, "the first model must be evicted over budget"
+        assert ('ner', ner_model) in registry.entries, "the model just loaded must stay resident"
+        print(f"after loading a second model with a {args.budget_mb} MB budget: "
+              f"{len(registry.entries)} resident, stats {registry.stats}")
+        print(pipelines[0](['the file', 'data']))
+        print(f"peak RSS {peak_rss_mb():.0f} MB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Exercise ModelRegistry dedup and eviction with tiny random local models")
+    parser.add_argument('--hidden-size', type=int, default=32)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--budget-mb', type=float, default=0.05, help='Small enough that the second model evicts the first')
+    main(parser.parse_args())
@@ -0,0 +1,54 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import sql_schema, typescript_types
+from src.processing.parser_registry import ParserRegistry
+
+# (file name, text, expected parser). The padded heads are ordinary text files that open with
+# blank or indented lines: a failed sniff over them must stay linear in the padding.
+CASES = [
+    ('notes.txt', ' ' * 64 + 'hello world', None),
+    ('notes.txt', '\n\t  ' * 256 + 'hello world', None),
+    ('notes.txt', '-- ' * 256 + '\nhello world', None),
+    ('notes.txt', '/* a */ ' * 256 + 'hello world', None),
+    ('notes.txt', 'logging.basicConfig(level=logging.INFO)\n', None),
+    ('app.py', 'os.makedirs(path, exist_ok=True)\n', None),
+    ('main.js', 'console.log("hello", x)\n', None),
+    ('dump.txt', ' ' * 64 + '-- users\npublic.users (\n  id uuid primary key,\n  name text\n)\n', 'sql_ddl'),
+    ('dump.txt', '\n' * 64 + 'create table t (id int)\n', 'sql_ddl'),
+    ('api.txt', ' ' * 64 + '// api\nexport interface User {\n  id: string;\n}\n', 'typescript'),
+]
+
+
+def main(args: argparse.Namespace) -> int:
+    registry = ParserRegistry()
+    rng = random.Random(args.seed)
+    cases = CASES + [('dump.txt', sql_schema(rng, 4096), 'sql_ddl'), ('api.txt', typescript_types(rng, 4096), 'typescript')]
+    failures = []
+    print(f"{'file':>10} {'head':>28} {'parser':>11} {'ms':>8}")
+    for file_name, text, expected in cases:
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            parser = registry.resolve(file_name, text)
+        elapsed_ms = (time.perf_counter() - start) / args.rounds * 1000
+        print(f"{file_name:>10} {text[:26]!r:>28} {parser or '-':>11} {elapsed_ms:>8.3f}")
+        if parser != expected:
+            failures.append(f"{file_name} {text[:26]!r}: resolved to {parser}, expected {expected}")
+        if elapsed_ms > args.max_ms:
+            failures.append(f"{file_name} {text[:26]!r}: {elapsed_ms:.1f} ms per resolve, over {args.max_ms} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check ParserRegistry sniffing results and that a failed sniff stays cheap")
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-ms', type=float, default=5.0, help='Allowed milliseconds per resolve call')
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,226 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import generate_corpus
+from src.utils import FileManager, LoggerService, ModelRegistry
+from src.processing.processor import DataProcessor
+
+STUB_SENTIMENT_MODEL = 'stub/sentiment'
+STUB_NER_MODEL = 'stub/ner'
+STAGES = ['read', 'metadata', 'context', 'external', 'internal', 'end_to_end']
+# Higher is better for throughput, lower is better for latency.
+REGRESSION_METRICS = {'files_per_sec': 1, 'mb_per_sec': 1, 'p99_ms': -1}
+
+
+class StubPipeline:
+    # Stands in for a HuggingFace pipeline: same call signature, a fixed cost per batch plus a
+    # per-word cost, and deterministic outputs so no weights are downloaded or run.
+    def __init__(self, task: str, call_cost: float = 0.0, word_cost: float = 0.0):
+        self.task = task
+        self.call_cost = call_cost
+        self.word_cost = word_cost
+
+    def __call__(self, texts: List[str], batch_size: int = None) -> List:
+        if self.call_cost or self.word_cost:
+            time.sleep(self.call_cost + self.word_cost * sum(len(text.split()) for text in texts))
+        if self.task == 'ner':
+            return [[{'word': word, 'entity': 'B-MISC', 'score': 0.9} for word in text.split() if word[:1].isupper()][:8]
+                    for text in texts]
+        return [{'label': 'POSITIVE' if len(text) % 2 else 'NEGATIVE', 'score': 0.9} for text in texts]
+
+
+class TimedDataProcessor(DataProcessor):
+    # Records read-start to write-end latency for every record that leaves the pipeline.
+    latencies: List[float] = []
+
+    async def _read_file(self, item):
+        start = time.perf_counter()
+        task = await super()._read_file(item)
+        if task is not None:
+            task['bench_started'] = start
+        return task
+
+    async def _write_task(self, task):
+        task = await super()._write_task(task)
+        self.latencies.append(time.perf_counter() - task['bench_started'])
+        return task
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def summarize(latencies: List[float], elapsed: float, total_bytes: int) -> Dict[str, float]:
+    return {
+        'files': len(latencies),
+        'seconds': round(elapsed, 4),
+        'files_per_sec': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'mb_per_sec': round(total_bytes / 1e6 / elapsed, 3) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+async def time_stage(items: List, run: Callable[..., Awaitable], concurrency: int, total_bytes: int) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def timed(item) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await run(*item)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(item) for item in items))
+    return summarize(latencies, time.perf_counter() - start, total_bytes)
+
+
+def bench_config(corpus_dir: str, output_file: str, args: argparse.Namespace) -> Dict:
+    return {
+        'globalSettings': {'filePaths': {'inputDir': corpus_dir, 'outputFile': output_file}},
+        'inference_options': {'sentiment_model': STUB_SENTIMENT_MODEL, 'ner_model': STUB_NER_MODEL},
+        'metadata_options': {'executor': args.metadata_executor},
+        'pipeline_options': {'workers': {'read': args.concurrency, 'enrich': args.concurrency}},
+        'external_data_sources': {'api_calls': []},
+    }
+
+
+def install_stub_models(args: argparse.Namespace) -> None:
+    registry = ModelRegistry.get_instance()
+    registry.register('sentiment-analysis', STUB_SENTIMENT_MODEL, StubPipeline('sentiment-analysis', args.call_cost, args.word_cost))
+    registry.register('ner', STUB_NER_MODEL, StubPipeline('ner', args.call_cost, args.word_cost))
+
+
+def prime_context_extractor(extractor) -> None:
+    # Builds the batchers up front so the stubs are used without importing transformers.
+    extractor.sentiment_batcher = extractor._create_batcher('sentiment-analysis', STUB_SENTIMENT_MODEL)
+    extractor.ner_batcher = extractor._create_batcher('ner', STUB_NER_MODEL)
+
+
+async def run_benchmarks(corpus_dir: str, workdir: str, args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    install_stub_models(args)
+    config = bench_config(corpus_dir, os.path.join(workdir, 'out.jsonl'), args)
+    processor = DataProcessor(config)
+    processor.initialize_services()
+    prime_context_extractor(processor.context_extractor)
+    paths = sorted(FileManager.find_files(corpus_dir))
+    total_bytes = sum(os.path.getsize(path) for path in paths)
+    results = {}
+
+    # Each stage is fed the previous stage's outputs, so the timings exclude upstream work.
+    texts: Dict[str, str] = {}
+    async def read(path: str) -> None:
+        texts[path] = (await processor._read_file(path) or {}).get('file_text', '')
+    results['read'] = await time_stage([(path,) for path in paths], read, args.concurrency, total_bytes)
+
+    metadata: Dict[str, Dict] = {}
+    async def extract_metadata(path: str) -> None:
+        summary = await processor.metadata_extractor.generate_summary(texts[path])
+        metadata[path] = await processor.metadata_extractor.extract_metadata(path, texts[path], summary)
+    results['metadata'] = await time_stage([(path,) for path in paths], extract_metadata, args.concurrency, total_bytes)
+
+    context: Dict[str, Dict] = {}
+    async def extract_context(path: str) -> None:
+        context[path] = await processor.context_extractor.extract_enhanced_context(texts[path])
+    results['context'] = await time_stage([(path,) for path in paths], extract_context, args.concurrency, total_bytes)
+
+    enrichment_inputs = [(metadata[path], context[path]) for path in paths]
+    results['external'] = await time_stage(enrichment_inputs, processor.data_enrichment_service.integrate_external_data, args.concurrency, total_bytes)
+    results['internal'] = await time_stage(enrichment_inputs, processor.internal_data_utility.prepare_data_for_llm, args.concurrency, total_bytes)
+    processor.metadata_extractor.shutdown()
+
+    end_to_end = TimedDataProcessor(config)
+    end_to_end.initialize_services()
+    prime_context_extractor(end_to_end.context_extractor)
+    TimedDataProcessor.latencies = []
+    start = time.perf_counter()
+    await end_to_end.process_files()
+    results['end_to_end'] = summarize(TimedDataProcessor.latencies, time.perf_counter() - start, total_bytes)
+    return results
+
+
+def find_regressions(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    regressions = []
+    for stage, metrics in results['stages'].items():
+        previous = baseline.get('stages', {}).get(stage)
+        if not previous:
+            continue
+        for metric, direction in REGRESSION_METRICS.items():
+            old, new = previous.get(metric), metrics.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * direction
+            if change < -threshold:
+                regressions.append(f"{stage}.{metric}: {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def main(args: argparse.Namespace) -> int:
+    logging.disable(logging.CRITICAL)
+    LoggerService.get_instance().configure({'sentiment_enabled': False})
+    with tempfile.TemporaryDirectory() as workdir:
+        corpus_dir = args.corpus_dir or os.path.join(workdir, 'corpus')
+        if not args.corpus_dir:
+            generate_corpus(corpus_dir, args.count, args.size_kb, args.seed)
+        stages = asyncio.run(run_benchmarks(corpus_dir, workdir, args))
+
+    results = {
+        'corpus': {'count_per_kind': args.count, 'size_kb': args.size_kb, 'seed': args.seed, 'corpus_dir': args.corpus_dir},
+        'settings': {'concurrency': args.concurrency, 'metadata_executor': args.metadata_executor,
+                     'call_cost': args.call_cost, 'word_cost': args.word_cost},
+        'environment': {'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count()},
+        'stages': stages,
+    }
+    print(f"{'stage':>11} {'files':>6} {'files/s':>9} {'MB/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'RSS MB':>8}")
+    for stage in STAGES:
+        m = stages[stage]
+        print(f"{stage:>11} {m['files']:>6} {m['files_per_sec']:>9.1f} {m['mb_per_sec']:>8.2f} "
+              f"{m['p50_ms']:>9.2f} {m['p99_ms']:>9.2f} {m['peak_rss_mb']:>8.0f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"FAIL: regressions beyond {args.threshold:.0%} against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"OK: no regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Per-stage and end-to-end throughput on a synthetic corpus, with stub models")
+    parser.add_argument('--corpus-dir', help='Benchmark an existing directory instead of generating a corpus')
+    parser.add_argument('--count', type=int, default=20, help='Generated files per kind')
+    parser.add_argument('--size-kb', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--metadata-executor', choices=['inline', 'process'], default='inline')
+    parser.add_argument('--call-cost', type=float, default=0.0, help='Simulated seconds per stub model batch')
+    parser.add_argument('--word-cost', type=float, default=0.0, help='Simulated seconds per word in a stub model batch')
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    parser.add_argument('--baseline', help='Results JSON from an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed fractional regression before exiting non-zero')
+    sys.exit(main(parser.parse_args()))
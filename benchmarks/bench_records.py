@@ -0,0 +1,123 @@
+import argparse
+import gc
+import itertools
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.processing.metadata_extractor import MetadataParser
+from src.processing.output_writer import fast_dumpb, fast_dumps
+from src.processing.records import EXTERNAL_DETAILS, EXTERNAL_TOPICS, INTERNAL_DETAILS, INTERNAL_TOPICS, SimulatedEntries
+
+CONFIG = {
+    'custom_tags': ['training', 'enriched', 'v2'],
+    'custom_metadata': {'source': 'mock', 'license': 'internal', 'pipeline_version': '0.0.1'},
+    'base_url': 'http://127.0.0.1:8000/',
+}
+
+
+def fresh(word: str) -> str:
+    # A new string object with the same value, as parsing a file produces for every record.
+    return (' ' + word)[1:]
+
+
+def sample_inputs(count: int, vocabulary: int, per_record: int, seed: int) -> list:
+    rng = random.Random(seed)
+    words = [f"term {i}" for i in range(vocabulary)]
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(vocabulary)))
+    return [
+        (f"docs/file_{i}.md",
+         [fresh(word) for word in rng.choices(words, cum_weights=weights, k=per_record)],
+         [fresh(word.title()) for word in rng.choices(words, cum_weights=weights, k=per_record)])
+        for i in range(count)
+    ]
+
+
+def legacy_builder():
+    # Records as _enrich_data built them before: a fresh link per keyword and fresh entry
+    # dicts and topic lists per entity and keyword, in every record.
+    parser = MetadataParser({**CONFIG, 'metadata_options': {'link_cache_size': 0}})
+
+    def build(file_path: str, keywords: list, entities: list) -> dict:
+        metadata = parser._build_metadata(file_path, '', '', None, '', keywords, [], [], [], 'markdown')
+        external_data = {}
+        for entity in entities:
+            external_data[entity] = {'entity': entity, 'details': 'Simulated entity details from external source.'}
+        for keyword in keywords:
+            external_data[keyword] = {'keyword': keyword, 'related_topics': ['Topic 1', 'Topic 2']}
+        internal_data = {entity: {'entity': entity, 'details': 'Simulated entity details for internal use.'} for entity in entities} | {
+            keyword: {'keyword': keyword, 'related_topics': ['Internal Topic 1', 'Internal Topic 2']} for keyword in keywords}
+        return {'file_path': file_path, 'metadata': metadata, 'context': {'named_entities': entities},
+                'external_data': external_data, 'internal_data': internal_data}
+    return build
+
+
+def compact_builder(cache_size: int):
+    parser = MetadataParser(CONFIG)
+    external, internal = SimulatedEntries(EXTERNAL_DETAILS, EXTERNAL_TOPICS, cache_size), SimulatedEntries(INTERNAL_DETAILS, INTERNAL_TOPICS, cache_size)
+
+    def build(file_path: str, keywords: list, entities: list) -> dict:
+        metadata = parser._build_metadata(file_path, '', '', None, '', keywords, [], [], [], 'markdown')
+        return {'file_path': file_path, 'metadata': metadata, 'context': {'named_entities': entities},
+                'external_data': external.build(entities, keywords), 'internal_data': internal.build(entities, keywords)}
+    return build
+
+
+def legacy_encode(record: dict) -> bytes:
+    # The writer used to take a str line and encode it again.
+    return (fast_dumps(record) + '\n').encode('utf-8')
+
+
+def measure_memory(build, inputs: list) -> float:
+    # Bytes retained per record while all of them are held in flight.
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = [build(*item) for item in inputs]
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del held
+    return retained / len(inputs)
+
+
+def measure_throughput(build, encode, inputs: list, rounds: int) -> float:
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for item in inputs:
+            encode(build(*item))
+        best = min(best, time.perf_counter() - start)
+    return len(inputs) / best
+
+
+def main(args: argparse.Namespace) -> None:
+    legacy, compact = legacy_builder(), compact_builder(args.entry_cache_size)
+    inputs = sample_inputs(args.records, args.vocabulary, args.terms, args.seed)
+    # Both representations must write the same JSON.
+    for item in inputs[:50]:
+        assert json.loads(fast_dumpb(compact(*item))) == json.loads(legacy_encode(legacy(*item))), item[0]
+    # Inputs carry their own fresh strings, so keep a copy per run for a fair memory comparison.
+    legacy_bytes = measure_memory(legacy, inputs)
+    compact_bytes = measure_memory(compact, sample_inputs(args.records, args.vocabulary, args.terms, args.seed))
+    legacy_rate = measure_throughput(legacy, legacy_encode, inputs, args.rounds)
+    compact_rate = measure_throughput(compact, fast_dumpb, inputs, args.rounds)
+    print(f"{'':>10} {'bytes/record':>13} {'records/s':>11}")
+    print(f"{'legacy':>10} {legacy_bytes:>13.0f} {legacy_rate:>11.0f}")
+    print(f"{'compact':>10} {compact_bytes:>13.0f} {compact_rate:>11.0f}")
+    print(f"{'ratio':>10} {legacy_bytes / max(compact_bytes, 1):>12.2f}x {compact_rate / max(legacy_rate, 1):>10.2f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Per-record memory and build+encode throughput of legacy dict records versus compact records")
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--vocabulary', type=int, default=5000, help='Distinct keywords and entities, drawn Zipf-like')
+    parser.add_argument('--terms', type=int, default=12, help='Keywords and entities per record')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--entry-cache-size', type=int, default=65536, help='record_options.entry_cache_size; 0 disables shared entries')
+    parser.add_argument('--seed', type=int, default=0)
+    main(parser.parse_args())
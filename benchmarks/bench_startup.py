@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['transformers', 'torch', 'bs4', 'aiohttp']
+LIGHT_COMMANDS = ['validate_output', 'upload_output', 'merge']
+ALL_COMMANDS = ['process', 'run_data_preparation', 'validate_output', 'upload_output', 'merge', 'run_all']
+
+# Runs in a fresh interpreter so every measurement starts from a cold import cache.
+CHILD = '''
+import asyncio, json, sys, time
+start = time.perf_counter()
+from src.app import Application
+from src.commands.command_parser import CommandParser
+import_time = time.perf_counter() - start
+
+async def run():
+    # Commands raise on failure; merge has no shards in the empty workdir, which is still a
+    # valid measurement of what the command imports.
+    app = Application(json.loads(sys.argv[2]))
+    await app.async_init()
+    try:
+        await CommandParser(app.config).parse_args([sys.argv[1]])
+    except Exception as e:
+        return str(e)
+    finally:
+        await app.logger.close()
+
+error = asyncio.run(run())
+print(json.dumps({
+    'import_s': import_time,
+    'first_command_s': time.perf_counter() - start,
+    'heavy_modules': [m for m in json.loads(sys.argv[3]) if m in sys.modules],
+    'error': error,
+}))
+'''
+
+
+def measure(command: str, config: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD, command, json.dumps(config), json.dumps(HEAVY_MODULES)],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(args: argparse.Namespace) -> int:
+    with tempfile.TemporaryDirectory() as workdir:
+        input_dir = os.path.join(workdir, 'input')
+        os.makedirs(input_dir)
+        # Log sentiment scoring is left as configured by default: the CLI itself turns it off for
+        # its light commands, and whether the other commands import transformers through the
+        # logger is part of what is measured.
+        config = {
+            'globalSettings': {'filePaths': {'inputDir': input_dir, 'outputFile': os.path.join(workdir, 'out.jsonl')}},
+        }
+        failures = []
+        print(f"{'command':>22} {'import ms':>10} {'first cmd ms':>13}  heavy modules")
+        for command in args.commands:
+            runs = [measure(command, config) for _ in range(args.repeat)]
+            best = min(runs, key=lambda r: r['first_command_s'])
+            print(f"{command:>22} {best['import_s'] * 1000:>10.1f} {best['first_command_s'] * 1000:>13.1f}  "
+                  f"{', '.join(best['heavy_modules']) or '-'}" + (f"  (failed: {best['error']})" if best['error'] else ''))
+            if command in LIGHT_COMMANDS and 'transformers' in best['heavy_modules']:
+                failures.append(command)
+    if failures:
+        print(f"FAIL: light commands imported transformers: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="CLI import time and time-to-first-command per subcommand")
+    parser.add_argument('--commands', nargs='+', default=ALL_COMMANDS)
+    parser.add_argument('--repeat', type=int, default=3)
+    sys.exit(main(parser.parse_args()))
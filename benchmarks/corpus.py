@@ -0,0 +1,107 @@
+import argparse
+import base64
+import os
+import random
+from typing import Callable, Dict, List
+
+# Deterministic synthetic inputs shaped like mock/input: the same seed, counts and size
+# always produce byte-identical files, so benchmark runs on different machines are comparable.
+
+WORDS = ('artwork artist region style price quantity profile storage bucket audit record table file '
+         'order payment shipping review gallery upload token session metadata context summary').split()
+SQL_TYPES = ['uuid primary key', 'text', 'varchar(255) not null', 'integer check (quantity >= 0)', 'numeric',
+             'timestamp with time zone default current_timestamp', 'boolean default false']
+TS_TYPES = ['string', 'number', 'boolean', 'string | null', 'Date', 'string[]']
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+
+def _identifier(rng: random.Random) -> str:
+    return '_'.join(rng.sample(WORDS, 2))
+
+
+def _fill(rng: random.Random, size: int, header: str, unit: Callable[[random.Random, int], str], footer: str = '') -> str:
+    parts, length, index = [header], len(header) + len(footer), 0
+    while length < size:
+        part = unit(rng, index)
+        parts.append(part)
+        length += len(part)
+        index += 1
+    parts.append(footer)
+    return ''.join(parts)
+
+
+def html_document(rng: random.Random, size: int) -> str:
+    head = (f"<html><head><title>{_words(rng, 4).title()}</title>"
+            f"<meta name='keywords' content='{', '.join(rng.sample(WORDS, 3))}'>"
+            f"<meta name='description' content='{_words(rng, 8)}'></head><body><h1>{_words(rng, 3).title()}</h1>")
+    return _fill(rng, size, head, lambda r, i: (
+        f"<h2>Section {i}</h2><p>{_words(r, 40)} [ref-{i}] <a href='#s{i}'>{_words(r, 2)}</a>.</p>"
+        f"<pre><code>const {_identifier(r)} = {i};</code></pre>"), '</body></html>')
+
+
+def markdown_document(rng: random.Random, size: int) -> str:
+    return _fill(rng, size, f"# {_words(rng, 3).title()}\n\n{_words(rng, 50)}\n\n", lambda r, i: (
+        f"## {_words(r, 3).title()}\n\n{_words(r, 60)} [{_words(r, 2)}](https://example.com/{i})\n\n"
+        f"1. **Text:** {_words(r, 8)}\n2. **Code:** `console.log(\"{_words(r, 2)}\")`\n\n"
+        f"```python\ndef {_identifier(r)}():\n    return {i}\n```\n\n"))
+
+
+def sql_schema(rng: random.Random, size: int) -> str:
+    def table(r: random.Random, index: int) -> str:
+        columns = [f"  {_identifier(r)} {r.choice(SQL_TYPES)}" for _ in range(r.randint(4, 12))]
+        return f"public.{_identifier(r)}_{index} (\n  id uuid primary key,\n" + ',\n'.join(columns) + "\n)\n\n"
+    return _fill(rng, size, '', table)
+
+
+def typescript_types(rng: random.Random, size: int) -> str:
+    def interface(r: random.Random, index: int) -> str:
+        fields = ''.join(f"  {_identifier(r)}: {r.choice(TS_TYPES)};\n" for _ in range(r.randint(4, 16)))
+        name = ''.join(word.title() for word in r.sample(WORDS, 2))
+        return f"export interface {name}{index} {{\n  id: string;\n{fields}}}\n\n"
+    return _fill(rng, size, '', interface)
+
+
+def base64_blob(rng: random.Random, size: int) -> str:
+    # A PNG header followed by random bytes, encoded on one line like mock/input/base64.txt.
+    raw = b'\x89PNG\r\n\x1a\n' + rng.randbytes(max(0, size * 3 // 4 - 8))
+    return base64.b64encode(raw).decode('ascii')
+
+
+GENERATORS: Dict[str, Callable[[random.Random, int], str]] = {
+    '.html': html_document,
+    '.md': markdown_document,
+    '.schema': sql_schema,
+    '.types': typescript_types,
+    '.b64.txt': base64_blob,
+}
+
+
+def generate_corpus(directory: str, count: int = 20, size_kb: int = 16, seed: int = 0,
+                    mix: Dict[str, int] = None) -> List[str]:
+    # count files of each kind (or the per-suffix counts in mix), spread over a few subdirectories.
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for suffix, generate in GENERATORS.items():
+        for index in range((mix or {}).get(suffix, count)):
+            rng = random.Random(f"{seed}:{suffix}:{index}")
+            subdirectory = os.path.join(directory, f"group_{index % 4}")
+            os.makedirs(subdirectory, exist_ok=True)
+            path = os.path.join(subdirectory, f"doc_{index:05d}{suffix}")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(generate(rng, size_kb * 1024))
+            paths.append(path)
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write a deterministic synthetic corpus modelled on mock/input")
+    parser.add_argument('directory')
+    parser.add_argument('--count', type=int, default=20, help='Files per kind')
+    parser.add_argument('--size-kb', type=int, default=16, help='Approximate size of each file')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    paths = generate_corpus(args.directory, args.count, args.size_kb, args.seed)
+    print(f"wrote {len(paths)} files, {sum(os.path.getsize(p) for p in paths) / 1e6:.1f} MB to {args.directory}")
@@ -0,0 +1,40 @@
+import argparse
+import asyncio
+import random
+
+from aiohttp import web
+
+
+def create_app(latency: float = 0.02, error_rate: float = 0.0) -> web.Application:
+    # Answers any GET with {'status': 'ok', ...} after a fixed latency; error_rate injects 503s.
+    app = web.Application()
+    app['hits'] = 0
+
+    async def handle(request: web.Request) -> web.Response:
+        app['hits'] += 1
+        await asyncio.sleep(latency)
+        if random.random() < error_rate:
+            return web.json_response({'status': 'error'}, status=503)
+        return web.json_response({'status': 'ok', 'path': request.path, 'params': dict(request.query)})
+
+    app.router.add_get('/{tail:.*}', handle)
+    return app
+
+
+async def start_stub_server(host: str = '127.0.0.1', port: int = 0, **kwargs) -> tuple:
+    app = create_app(**kwargs)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, app, f"http://{host}:{bound_port}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local stand-in for the enrichment APIs")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    web.run_app(create_app(args.latency, args.error_rate), host='127.0.0.1', port=args.port)
@@ -0,0 +1,65 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from http_stub_server import start_stub_server
+from src.utils import LoggerService, RequestManager
+
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def timed(coroutine, latencies: list) -> None:
+    start = time.perf_counter()
+    await coroutine
+    latencies.append(time.perf_counter() - start)
+
+
+async def session_per_request(url: str, params: dict) -> dict:
+    # The previous RequestManager behaviour: a new ClientSession (and connection) per call.
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url, params=params) as response:
+            return await response.json()
+
+
+async def run(label: str, make_call, keys: list, app) -> None:
+    app['hits'] = 0
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(make_call(key), latencies) for key in keys))
+    elapsed = time.perf_counter() - start
+    print(f"{label:>18}: {len(keys) / elapsed:8.0f} req/s  p50 {percentile(latencies, 0.5) * 1000:7.1f} ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms  upstream hits {app['hits']}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    runner, app, base_url = await start_stub_server(latency=args.latency, error_rate=args.error_rate)
+    keys = [f"keyword-{i % args.distinct}" for i in range(args.requests)]
+    manager = RequestManager(LoggerService.get_instance("LoadTest"), {'limit_per_host': args.limit_per_host, 'backoff_base': 0.01})
+    try:
+        print(f"{args.requests} requests over {args.distinct} distinct keys against {base_url}")
+        await run('session per call', lambda key: session_per_request(f"{base_url}/topics", {'q': key}), keys, app)
+        await run('pooled+coalesced', lambda key: manager.send_request(f"{base_url}/topics", params={'q': key}), keys, app)
+        print(f"{'':>18}  {manager.stats}")
+    finally:
+        await manager.close()
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test RequestManager against the local stub server")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--distinct', type=int, default=50, help='Distinct query keys among the requests')
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--limit-per-host', type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,69 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.processing.uploader import LocalDirectorySink
+
+
+def create_app(directory: str, latency: float = 0.0, error_rate: float = 0.0) -> web.Application:
+    # Local stand-in for the HttpSink protocol, storing uploads in directory through
+    # LocalDirectorySink. error_rate injects 503s on chunk uploads to exercise retries.
+    sink = LocalDirectorySink(directory)
+    app = web.Application(client_max_size=1024 ** 3)
+    app['chunks'] = 0
+
+    async def begin(request: web.Request) -> web.Response:
+        body = await request.json()
+        upload_id, chunks = await sink.begin(body['name'], body['size'], body['chunk_bytes'], body.get('upload_id'))
+        return web.json_response({'upload_id': upload_id, 'chunks': chunks})
+
+    async def put_chunk(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        if random.random() < error_rate:
+            return web.json_response({'status': 'error'}, status=503)
+        try:
+            await sink.put_chunk(request.match_info['upload_id'], int(request.match_info['index']),
+                                 await request.read(), request.headers.get('X-Chunk-SHA256', ''))
+        except (ValueError, OSError) as e:
+            return web.json_response({'status': 'error', 'error': str(e)}, status=400)
+        app['chunks'] += 1
+        return web.json_response({'status': 'ok'})
+
+    async def complete(request: web.Request) -> web.Response:
+        body = await request.json()
+        try:
+            await sink.complete(request.match_info['upload_id'], body['name'], body['size'], body['sha256'], body['chunks'])
+        except (ValueError, OSError) as e:
+            return web.json_response({'status': 'error', 'error': str(e)}, status=400)
+        return web.json_response({'status': 'ok'})
+
+    app.router.add_post('/uploads', begin)
+    app.router.add_put('/uploads/{upload_id}/chunks/{index}', put_chunk)
+    app.router.add_post('/uploads/{upload_id}/complete', complete)
+    return app
+
+
+async def start_upload_server(directory: str, host: str = '127.0.0.1', port: int = 0, **kwargs) -> tuple:
+    app = create_app(directory, **kwargs)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, app, f"http://{host}:{bound_port}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local stand-in for the chunked upload sink")
+    parser.add_argument('directory')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    web.run_app(create_app(args.directory, args.latency, args.error_rate), host='127.0.0.1', port=args.port)
@@ -11,14 +11,11 @@ run_data_preparation() {
 }
 
 validate_output() {
-    if [ -f $1 ]; then
-        if [ "$(jq length $1)" -gt 0 ]; then
-            echo "Output file contains valid JSON data." | tee -a $2
-        else
-            echo "Output file is empty or contains invalid JSON data." | tee -a $2
-        fi
+    # Streams plain, compressed or sharded output record by record; exits non-zero on any invalid record.
+    if python -m src.processing.output_validator "$1" >>"$2" 2>&1; then
+        echo "Output file contains valid JSON data." | tee -a $2
     else
-        echo "Output file $1 does not exist." | tee -a $2
+        echo "Output file is missing, empty or contains invalid records." | tee -a $2
     fi
 }
 run_data_preparation() {
@@ -26,14 +23,11 @@ run_data_preparation() {
 }
 
 validate_output() {
-    if [ -f $1 ]; then
-        if [ "$(jq length $1)" -gt 0 ]; then
-            echo "Output file contains valid JSON data." | tee -a $2
-        else
-            echo "Output file is empty or contains invalid JSON data." | tee -a $2
-        fi
+    # Streams plain, compressed or sharded output record by record; exits non-zero on any invalid record.
+    if python -m src.processing.output_validator "$1" >>"$2" 2>&1; then
+        echo "Output file contains valid JSON data." | tee -a $2
     else
-        echo "Output file $1 does not exist." | tee -a $2
+        echo "Output file is missing, empty or contains invalid records." | tee -a $2
     fi
 }
 
@@ -42,13 +36,34 @@ set_permissions() {
 }
 
 upload_output() {
-    scp $1 user@remote_server:/path/to/destination >>$2 2>&1
+    # Parallel, resumable, checksummed chunked upload to the sink in config.json's upload_options.
+    python -m src.processing.uploader "$1" >>"$2" 2>&1
 }
 
 cleanup_temp_files() {
     rm -rf $1
 }
 
+# Runs N shard workers as local processes, then merges their outputs; usage: run_sharded N log_file
+run_sharded() {
+    local pids=() failed=0
+    for ((i = 0; i < $1; i++)); do
+        python -m src process --shard "$i/$1" >>"$2" 2>&1 &
+        pids+=($!)
+    done
+    for pid in "${pids[@]}"; do
+        wait "$pid" || failed=1
+    done
+    if [ $failed -ne 0 ]; then
+        echo "A shard worker failed, not merging." | tee -a $2
+        return 1
+    fi
+    if ! python -m src merge --shards "$1" >>"$2" 2>&1; then
+        echo "Merging shard outputs failed." | tee -a $2
+        return 1
+    fi
+}
+
 run_all() {
     >$1
     run_data_preparation $2 $3 $1
@@ -63,13 +78,15 @@ display_menu() {
     echo "2. Validate output"
     echo "3. Upload output"
     echo "4. Run all steps"
-    read -p "Enter your choice (1-4): " choice
+    echo "5. Run sharded on this machine"
+    read -p "Enter your choice (1-5): " choice
 
     case $choice in
     1) run_data_preparation $1 $2 $3 ;;
     2) validate_output $2 $3 ;;
     3) upload_output $2 $3 ;;
     4) run_all $1 $2 $3 $4 ;;
+    5) run_sharded $1 $2 ;;
     *) echo "Invalid choice. Exiting." ;;
     esac
 }
@@ -1,26 +1,36 @@
-import tracemalloc
 import asyncio
+import sys
 
-async def main_async():
-    tracemalloc.start()  # Get the object allocation traceback
-    from utils import LoggerService
+async def main_async() -> int:
+    # Allocation tracing is opt-in through telemetry_options.tracemalloc_interval.
+    from src.utils import LoggerService
+    from src.telemetry import Telemetry
     
     logger = LoggerService("MainLogger", [0,100]) 
+    exit_code = 0
     
     try:
-        from app import Application
+        from src.app import Application
         app = Application()
         await app.async_init()  # Initialize async parts of the Application
         await app.run()  # Run the application
 
     except Exception as error:
         await logger.log("error", f"Exception occurred: {error}")  # Use the LoggerService instance for logging exceptions.
+        exit_code = 1
     finally:
-        tracemalloc.stop()  # Stop tracemalloc after the main function execution
+        await logger.close()  # Drain queued log messages before exiting
+        Telemetry.get_instance().close()
+    return exit_code
 
-if __name__ == "__main__":
+def main():
+    # Entry point for the console scripts in setup.py and `python -m src`.
     loop = asyncio.get_event_loop()
     if loop.is_running():
         asyncio.ensure_future(main_async())
     else:
-        loop.run_until_complete(main_async())
+        # A failed command exits non-zero, so scripts can tell (run_sharded waits on it).
+        sys.exit(loop.run_until_complete(main_async()))
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,11 @@
 import asyncio
+import os
 import sys
 from typing import Dict, Optional
 
 class Application:
     def __init__(self, config_overrides: Optional[Dict[str, str]] = None):
-        self.config_path = './../config.json'
+        self.config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config.json')
         self.logger = None
         self.config_manager = None
         self.utils = None
@@ -12,17 +13,22 @@ class Application:
         self.waiting = False
 
     async def async_init(self):
-        from utils import LoggerService, ConfigManager  # Imports moved here to avoid circular dependency
-        self.logger = self.logger or await LoggerService.get_instance("ApplicationLogger", (30, 40))
+        from src.utils import LoggerService, ConfigManager, ModelRegistry  # Imports moved here to avoid circular dependency
+        from src.telemetry import Telemetry
+        self.logger = self.logger or LoggerService.get_instance("ApplicationLogger", (30, 40))
         self.config_manager = self.config_manager or ConfigManager(self.config_path)
         self.config = self.config or await self.config_manager.load_config()
+        self.logger.configure(self.config.get('logging_options', {}))
+        model_registry = ModelRegistry.get_instance()
+        model_registry.configure(self.config.get('model_registry', {}))
+        Telemetry.get_instance().configure(self.config.get('telemetry_options', {}))
         asyncio.create_task(self._setup_async())
 
     async def _setup_async(self):
         await self.logger.log("info", "Application initialized.")
 
     async def run(self):
-        from commands.command_parser import CommandParser
+        from src.commands.command_parser import CommandParser
         command_parser = CommandParser(self.config)
         await command_parser.parse_args()
 
@@ -40,7 +46,7 @@ class Application:
         print(f"Application failed to start: {error}")
 
     @classmethod
-    async def main(cls):
+    async def main(cls) -> int:
         try:
             config_overrides = sys.argv[1] if len(sys.argv) > 1 else None
             app = cls(config_overrides)
@@ -49,6 +55,8 @@ class Application:
             await app.run()
         except Exception as e:
             await cls._log_application_failure(e)
+            return 1
+        return 0
 
 if __name__ == "__main__":
-    asyncio.run(Application.main())
+    sys.exit(asyncio.run(Application.main()))
@@ -1,37 +1,91 @@
-from utils import LoggerService
+import json
+import os
+
+from src.utils import LoggerService
 
 class CLIOperations:
     def __init__(self):
         self.logger = LoggerService.get_instance()
 
-    def run_data_augmentation(self, input_dir, output_file):
+    async def run_data_augmentation(self, input_dir, output_file):
         if input_dir and output_file:
-            self.logger.log("info", f"./shell_controller.sh run_data_augmentation {input_dir} {output_file}")
+            await self.logger.log("info", f"./shell_controller.sh run_data_augmentation {input_dir} {output_file}")
 
-    def set_permissions(self, script_path):
+    async def set_permissions(self, script_path):
         if script_path:
-            self.logger.log("info", f"./shell_controller.sh set_permissions {script_path}")
+            await self.logger.log("info", f"./shell_controller.sh set_permissions {script_path}")
 
-    def run_data_preparation(self, input_dir, output_file):
+    async def run_data_preparation(self, input_dir, output_file):
         if input_dir and output_file:
-            self.logger.log("info", f"./shell_controller.sh run_data_preparation {input_dir} {output_file}")
+            await self.logger.log("info", f"./shell_controller.sh run_data_preparation {input_dir} {output_file}")
+
+    async def validate_output(self, output_file, options=None):
+        # Runs the streaming validator in-process instead of shelling out to jq.
+        if not output_file:
+            return None
+        from src.processing.output_validator import OutputValidator
+        report = await OutputValidator(options).validate(output_file, (options or {}).get('index_file'))
+        await self.log_validation_report(report, output_file, options)
+        return report
+
+    async def log_validation_report(self, report, output_file, options=None):
+        summary = (f"Validated {report['records']} records in {len(report['files'])} file(s) from {output_file}: "
+                   f"{report['invalid_records']} invalid, {report['duplicate_ids']} duplicate ids")
+        await self.logger.log("info" if report['valid'] else "error", summary)
+        for error in report['errors'][:10]:
+            await self.logger.log("error", f"{error['file']}:{error['line']}: {error['error']}")
+        report_file = (options or {}).get('report_file')
+        if report_file:
+            with open(report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
 
-    def validate_output(self, output_file):
-        if output_file:
-            self.logger.log("info", f"./shell_controller.sh validate_output {output_file}")
+    async def merge_shards(self, output_file, shard_count=None, options=None, output_options=None):
+        # Combines the per-worker outputs of a sharded run into output_file, dropping repeated record ids.
+        if not output_file:
+            return None
+        from src.processing.sharding import ShardMerger, find_shard_outputs
+        shard_outputs = find_shard_outputs(output_file, shard_count)
+        stats = await ShardMerger(options, output_options).merge(shard_outputs, output_file)
+        await self.logger.log("info", f"Merged {stats['records']} records from {stats['shards']} shard outputs into {output_file}: "
+                                      f"{stats['written']} written, {stats['duplicates']} duplicate ids dropped, {stats['invalid']} invalid")
+        return stats
 
-    def upload_output(self, output_file):
-        if output_file:
-            self.logger.log("info", f"./shell_controller.sh upload_output {output_file}")
+    async def upload_output(self, output_file, options=None, shards=None, on_uploaded=None, index_file=None):
+        # Uploads every shard of output_file in verified chunks, then its index. shards may be an
+        # async iterable of shard paths, so each shard is uploaded as soon as it is closed.
+        if not output_file:
+            return None
+        options = options or {}
+        if not options.get('sink'):
+            await self.logger.log("warning", f"Not uploading {output_file}: upload_options.sink is not configured")
+            return None
+        from src.processing.output_writer import read_index
+        from src.processing.uploader import ChunkedUploader
+        uploader = ChunkedUploader(options, options.get('manifest_file') or f"{output_file}.upload.json")
+        index_file = index_file or f"{output_file}.index.json"
+        try:
+            if shards is not None:
+                await uploader.upload_stream(shards, on_uploaded)
+            else:
+                await uploader.upload_all(path for path in read_index(output_file, index_file) if path != index_file)
+            # The index goes last, so a reader never finds it pointing at shards not uploaded yet.
+            if os.path.exists(index_file):
+                await uploader.upload_all([index_file])
+        finally:
+            await uploader.close()
+        stats = uploader.stats
+        await self.logger.log("info", f"Uploaded {output_file}: {stats['files']} files, {stats['chunks']} chunks, {stats['bytes']} bytes sent "
+                                      f"({stats['files_skipped']} files and {stats['chunks_skipped']} chunks already uploaded, {stats['retries']} retries)")
+        return stats
 
-    def run_all(self, log_file, input_dir, output_file, temp_dir):
+    async def run_all(self, log_file, input_dir, output_file, temp_dir):
         if log_file and input_dir and output_file and temp_dir:
-            self.logger.log("info", f"./shell_controller.sh run_all {log_file} {input_dir} {output_file} {temp_dir}")
+            await self.logger.log("info", f"./shell_controller.sh run_all {log_file} {input_dir} {output_file} {temp_dir}")
 
-    def run_cleanup(self, temp_dir):
+    async def run_cleanup(self, temp_dir):
         if temp_dir:
-            self.logger.log("info", f"./shell_controller.sh cleanup_temp_files {temp_dir}")
+            await self.logger.log("info", f"./shell_controller.sh cleanup_temp_files {temp_dir}")
 
-    def run_summary_report(self, output_file, report_file):
+    async def run_summary_report(self, output_file, report_file):
         if output_file and report_file:
-            self.logger.log("info", f"./shell_controller.sh run_summary_report {output_file} {report_file}")
+            await self.logger.log("info", f"./shell_controller.sh run_summary_report {output_file} {report_file}")
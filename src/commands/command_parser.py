@@ -1,38 +1,139 @@
 import argparse
+import asyncio
 from typing import Sequence, Optional
-from src.processing.processor import DataProcessor
 from src.utils import LoggerService
 
 class CommandParser:
+    # Commands that never touch the NLP models; they must not import transformers or score logs.
+    LIGHT_COMMANDS = {'validate_output', 'upload_output', 'merge'}
+
     def __init__(self, config: dict):
         self.config = config
-        self.processor = DataProcessor(config)
         self.logger = LoggerService.get_instance()
+        self.output_file = config.get('globalSettings', {}).get('filePaths', {}).get('outputFile')
+        self.shard = None
+        self.shard_count = None
+        self.resume = False
+        self.only_stages = None
+        # Handlers import their dependencies on first call, so startup only pays for the command being run.
         self.commands = {
-            'process': self.processor.process_files,
-            'run_data_preparation': self.processor.run_data_preparation,
-            'validate_output': self.processor.validate_output,
-            'upload_output': self.processor.upload_output,
-            'run_all': self.processor.run_all
+            'process': self.process,
+            'run_data_preparation': self.process,
+            'validate_output': self.validate_output,
+            'upload_output': self.upload_output,
+            'merge': self.merge,
+            'run_all': self.run_all
         }
 
     async def parse_args(self, args: Optional[Sequence[str]] = None) -> argparse.Namespace:
         parser = argparse.ArgumentParser(description="Command parser for data processing tasks")
         parser.add_argument('command', choices=self.commands.keys(), help='The command to execute')
+        parser.add_argument('--shard', help='Process only worker i of N (zero-based), e.g. 0/4, writing a per-shard output')
+        parser.add_argument('--shards', type=int, help='Number of shard outputs to merge; discovered from disk when omitted')
+        parser.add_argument('--resume', action='store_true', help='Continue an interrupted process run from its progress journal')
+        parser.add_argument('--stages', help='run_all: re-run only these comma-separated stages, taking the others from the cache')
         parsed_args = parser.parse_args(args=args)
+        if parsed_args.shard:
+            from src.processing.sharding import parse_shard
+            try:
+                self.shard = parse_shard(parsed_args.shard)
+            except ValueError as e:
+                parser.error(str(e))
+        self.shard_count = parsed_args.shards
+        self.resume = parsed_args.resume
+        self.only_stages = [name.strip() for name in parsed_args.stages.split(',') if name.strip()] if parsed_args.stages else None
         await self.execute_command(parsed_args)
         return parsed_args
 
     async def execute_command(self, parsed_args):
         command = parsed_args.command
+        if command in self.LIGHT_COMMANDS:
+            self.logger.configure({**self.config.get('logging_options', {}), 'sentiment_enabled': False})
+        # Failures propagate to the entry point, which logs them and exits non-zero so that
+        # scripts such as run_sharded can tell a failed command from a finished one.
         try:
             if command in self.commands:
                 await self.commands[command]()
-        except Exception as e:
-            self.logger.error(f"An error occurred during command execution: {e}")
         finally:
             await self.cleanup()
 
+    async def process(self):
+        from src.processing.processor import DataProcessor
+        await DataProcessor(self.config, shard=self.shard, resume=self.resume).process_files()
+
+    async def validate_output(self):
+        from src.commands.cli_operations import CLIOperations
+        await CLIOperations().validate_output(self._worker_output_file(), self.config.get('validation_options', {}))
+
+    async def merge(self):
+        from src.commands.cli_operations import CLIOperations
+        await CLIOperations().merge_shards(self.output_file, self.shard_count, self.config.get('sharding_options', {}),
+                                           self.config.get('output_options', {}))
+
+    async def upload_output(self):
+        from src.commands.cli_operations import CLIOperations
+        await CLIOperations().upload_output(self._worker_output_file(), self.config.get('upload_options', {}), index_file=self._worker_index_file())
+
+    def _worker_output_file(self):
+        # With --shard, validate_output and upload_output act on this worker's own output.
+        if self.shard is None or not self.output_file:
+            return self.output_file
+        from src.processing.sharding import shard_output_file
+        return shard_output_file(self.output_file, *self.shard)
+
+    def _worker_index_file(self):
+        # A shard worker always uses the default index name next to its own output.
+        index_file = self.config.get('output_options', {}).get('index_file') if self.shard is None else None
+        return index_file or f"{self._worker_output_file()}.index.json"
+
+    async def run_all(self):
+        # One in-process stage graph instead of running the steps one after another: validation
+        # and upload pick up each output shard as soon as the processor finishes it.
+        from src.commands.dag import DagExecutor
+        options = {'cache_file': f"{self._worker_output_file()}.dag-cache.json", **self.config.get('dag_options', {})}
+        await DagExecutor(self._run_all_stages(), options).run(self.only_stages)
+
+    def _run_all_stages(self):
+        from src.commands.dag import Stage, directory_signature
+        from src.commands.cli_operations import CLIOperations
+        operations = CLIOperations()
+        output_file = self._worker_output_file()
+        validation_options = self.config.get('validation_options', {})
+
+        async def process(context):
+            from src.processing.processor import DataProcessor
+            processor = DataProcessor(self.config, shard=self.shard, resume=self.resume,
+                                      on_shard=lambda path: context.publish_threadsafe('shards', path))
+            await processor.process_files()
+
+        async def process_fingerprint():
+            input_dir = self.config.get('globalSettings', {}).get('filePaths', {}).get('inputDir', './mock/input')
+            return {'config': self.config, 'shard': self.shard, 'inputs': await asyncio.to_thread(directory_signature, input_dir)}
+
+        async def validate(context):
+            from src.processing.output_validator import OutputValidator
+            report = await OutputValidator(validation_options).validate_stream(context.stream('shards'))
+            await operations.log_validation_report(report, output_file, validation_options)
+            if not report['valid']:
+                raise ValueError(f"{output_file} failed validation")
+            context.publish('validation', {key: report[key] for key in ('records', 'invalid_records', 'duplicate_ids')})
+
+        async def upload(context):
+            await operations.upload_output(output_file, self.config.get('upload_options', {}), context.stream('shards'),
+                                           lambda path: context.publish('uploaded', path), self._worker_index_file())
+
+        async def cleanup(context):
+            await context.input('validation')
+            await context.input('uploaded')
+            await operations.run_cleanup(self.config.get('dag_options', {}).get('temp_dir'))
+
+        return [
+            Stage('process', process, outputs=['shards'], fingerprint=process_fingerprint),
+            Stage('validate', validate, inputs=['shards'], outputs=['validation']),
+            Stage('upload', upload, inputs=['shards'], outputs=['uploaded']),
+            Stage('cleanup', cleanup, inputs=['validation', 'uploaded']),
+        ]
+
     async def cleanup(self):
         # Perform any cleanup tasks here
         pass
@@ -0,0 +1,305 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from src.utils import LoggerService
+from src.telemetry import Telemetry
+
+
+class UpstreamFailed(Exception):
+    pass
+
+
+class StagesFailed(Exception):
+    # Raised by DagExecutor.run once the cache is saved and the report logged; carries the report.
+    def __init__(self, report: Dict[str, Dict[str, Any]]):
+        failed = [name for name, entry in report.items() if entry['status'] in ('failed', 'skipped')]
+        super().__init__(f"Stages failed or skipped: {', '.join(failed)}")
+        self.report = report
+
+
+class Artifact:
+    # A named list of items published by one stage. Consumers either stream the items as they
+    # are published or wait for the producing stage to finish and take them all. Publishing is
+    # synchronous, so items published from a thread through call_soon_threadsafe keep their order
+    # relative to the producer finishing.
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items: List[Any] = []
+        self.done = False
+        self.failed = False
+        self.waiter: Optional[asyncio.Future] = None
+
+    def _wake(self) -> None:
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+        self.waiter = None
+
+    def publish(self, item: Any) -> None:
+        self.items.append(item)
+        self._wake()
+
+    def finish(self, failed: bool = False) -> None:
+        self.done = True
+        self.failed = failed
+        self._wake()
+
+    async def _wait(self) -> None:
+        if self.waiter is None:
+            self.waiter = asyncio.get_running_loop().create_future()
+        await asyncio.shield(self.waiter)
+
+    async def stream(self) -> AsyncIterator[Any]:
+        index = 0
+        while True:
+            while index >= len(self.items) and not self.done:
+                await self._wait()
+            if index >= len(self.items):
+                if self.failed:
+                    raise UpstreamFailed(f"producer of '{self.name}' failed")
+                return
+            index += 1
+            yield self.items[index - 1]
+
+    async def all(self) -> List[Any]:
+        while not self.done:
+            await self._wait()
+        if self.failed:
+            raise UpstreamFailed(f"producer of '{self.name}' failed")
+        return list(self.items)
+
+
+class StageContext:
+    def __init__(self, stage: 'Stage', artifacts: Dict[str, Artifact], loop: asyncio.AbstractEventLoop):
+        self.stage = stage
+        self.artifacts = artifacts
+        self.loop = loop
+
+    def stream(self, name: str) -> AsyncIterator[Any]:
+        # Items of an input artifact as they are published, ending when its producer finishes.
+        return self.artifacts[name].stream()
+
+    async def input(self, name: str) -> List[Any]:
+        return await self.artifacts[name].all()
+
+    def publish(self, name: str, item: Any) -> None:
+        self.artifacts[name].publish(item)
+
+    def publish_threadsafe(self, name: str, item: Any) -> None:
+        # For callbacks fired from worker threads, such as the output writer finishing a shard.
+        self.loop.call_soon_threadsafe(self.artifacts[name].publish, item)
+
+
+class Stage:
+    # One unit of work in a run. 'inputs' and 'outputs' name artifacts; a stage starts as soon
+    # as the run starts and blocks only where it reads an input, so a stage that streams its
+    # input overlaps with the stage producing it. 'fingerprint' returns what, besides the
+    # inputs, decides the result (config, source files); its cached result is reused while the
+    # fingerprint, the inputs and every file it published are unchanged.
+
+    def __init__(self, name: str, run: Callable[[StageContext], Awaitable[None]], inputs: Sequence[str] = (),
+                 outputs: Sequence[str] = (), fingerprint: Optional[Callable[[], Awaitable[Any]]] = None, cache: bool = True):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.fingerprint = fingerprint
+        self.cache = cache
+
+
+def directory_signature(directory: str) -> str:
+    # Digest of every file's relative path, size and mtime under directory, for stage fingerprints.
+    digest = hashlib.sha256()
+    for root, directories, files in os.walk(directory):
+        directories.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            digest.update(f"{os.path.relpath(path, directory)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def file_signatures(items: Iterable[Any]) -> Dict[str, List[int]]:
+    # Size and mtime of every published item that is an existing file path.
+    signatures = {}
+    for item in items:
+        if isinstance(item, str) and os.path.isfile(item):
+            stat = os.stat(item)
+            signatures[item] = [stat.st_size, stat.st_mtime_ns]
+    return signatures
+
+
+class DagExecutor:
+    # Runs stages concurrently in one event loop, in dependency order only where a stage waits
+    # on an input. Results are cached per stage in a JSON file; a stage whose upstream all came
+    # from the cache, and whose key is unchanged, is not run again. 'only' re-executes just the
+    # named stages and takes every other stage from the cache. A run in which any stage failed
+    # or was skipped raises StagesFailed, so the CLI exits non-zero.
+
+    def __init__(self, stages: List[Stage], options: Dict = None):
+        # Options come from the 'dag_options' config block.
+        options = options or {}
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_file = options.get('cache_file')
+        self.use_cache = options.get('cache', True)
+        self.report_file = options.get('report_file')
+        self.logger = LoggerService.get_instance()
+        self.telemetry = Telemetry.get_instance()
+        self.producers: Dict[str, str] = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in self.producers:
+                    raise ValueError(f"Artifact '{output}' is produced by both '{self.producers[output]}' and '{stage.name}'")
+                self.producers[output] = stage.name
+        for stage in stages:
+            for name in stage.inputs:
+                if name not in self.producers:
+                    raise ValueError(f"Stage '{stage.name}' reads '{name}', which no stage produces")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order, state = [], {}
+
+        def visit(name: str) -> None:
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Stage graph has a cycle through '{name}'")
+            state[name] = 'visiting'
+            for artifact in self.stages[name].inputs:
+                visit(self.producers[artifact])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def upstream(self, name: str) -> List[str]:
+        return sorted({self.producers[artifact] for artifact in self.stages[name].inputs})
+
+    async def run(self, only: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, Any]]:
+        unknown = set(only or ()) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+        cache = self._load_cache()
+        loop = asyncio.get_running_loop()
+        artifacts = {name: Artifact(name) for name in self.producers}
+        # Resolved with 'cached' or 'run' as soon as a stage knows whether it will run.
+        decided = {name: loop.create_future() for name in self.stages}
+        report: Dict[str, Dict[str, Any]] = {}
+        started = time.perf_counter()
+
+        async def execute(name: str) -> None:
+            stage = self.stages[name]
+            entry = report[name] = {'status': 'pending', 'start': None, 'duration': None}
+            cached = cache.get(name)
+            status = 'ran'
+            try:
+                if only is not None and name not in only:
+                    if not self._fresh(cached):
+                        raise ValueError(f"Stage '{name}' has no usable cached result; include it in the stages to run")
+                    status = 'cached'
+                elif only is None and self.use_cache and stage.cache:
+                    # A cached result is only trusted when every upstream stage was cached too; a
+                    # stage whose upstream runs starts right away and streams what it publishes.
+                    upstream = [await decided[producer] for producer in self.upstream(name)]
+                    if all(state == 'cached' for state in upstream):
+                        key = await self._key(stage, artifacts)
+                        if cached is not None and cached.get('key') == key and self._fresh(cached):
+                            status = 'cached'
+                decided[name].set_result('cached' if status == 'cached' else 'run')
+                if status == 'cached':
+                    for artifact, items in cached['artifacts'].items():
+                        for item in items:
+                            artifacts[artifact].publish(item)
+                else:
+                    entry['start'] = time.perf_counter() - started
+                    with self.telemetry.span('dag.stage', name):
+                        await stage.run(StageContext(stage, artifacts, loop))
+                    entry['duration'] = time.perf_counter() - started - entry['start']
+                    if stage.cache:
+                        published = {artifact: list(artifacts[artifact].items) for artifact in stage.outputs}
+                        cache[name] = {
+                            'key': await self._key(stage, artifacts),
+                            'artifacts': published,
+                            'files': await asyncio.to_thread(file_signatures, (item for items in published.values() for item in items)),
+                            'duration': entry['duration'],
+                        }
+                entry['status'] = status
+            except UpstreamFailed as e:
+                entry['status'] = 'skipped'
+                entry['error'] = str(e)
+            except Exception as e:
+                entry['status'] = 'failed'
+                entry['error'] = str(e)
+                await self.logger.log("error", f"Stage '{name}' failed: {e}")
+            finally:
+                failed = entry['status'] not in ('ran', 'cached')
+                if failed:
+                    cache.pop(name, None)
+                if not decided[name].done():
+                    decided[name].set_result('run')
+                for artifact in stage.outputs:
+                    artifacts[artifact].finish(failed)
+
+        await asyncio.gather(*(execute(name) for name in self.order))
+        report['total'] = {'status': 'ran', 'start': 0.0, 'duration': time.perf_counter() - started}
+        self._save_cache(cache)
+        await self._log_report(report)
+        if any(entry['status'] in ('failed', 'skipped') for entry in report.values()):
+            raise StagesFailed(report)
+        return report
+
+    async def _key(self, stage: Stage, artifacts: Dict[str, Artifact]) -> str:
+        # Only called once every input has finished, so the input lists are complete.
+        material = {
+            'fingerprint': await stage.fingerprint() if stage.fingerprint is not None else None,
+            'inputs': {name: await artifacts[name].all() for name in stage.inputs},
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _fresh(cached: Optional[Dict[str, Any]]) -> bool:
+        if cached is None:
+            return False
+        return all(
+            os.path.isfile(path) and [os.stat(path).st_size, os.stat(path).st_mtime_ns] == signature
+            for path, signature in cached.get('files', {}).items()
+        )
+
+    def _load_cache(self) -> Dict[str, Dict[str, Any]]:
+        if not (self.use_cache and self.cache_file and os.path.exists(self.cache_file)):
+            return {}
+        try:
+            with open(self.cache_file, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self, cache: Dict[str, Dict[str, Any]]) -> None:
+        if not (self.use_cache and self.cache_file):
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_file)), exist_ok=True)
+        temp_path = f"{self.cache_file}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2, default=str)
+        os.replace(temp_path, self.cache_file)
+
+    async def _log_report(self, report: Dict[str, Dict[str, Any]]) -> None:
+        for name, entry in report.items():
+            timing = f"{entry['duration']:.2f}s" if entry.get('duration') is not None else '-'
+            offset = f" from +{entry['start']:.2f}s" if entry.get('start') is not None and entry['status'] == 'ran' else ''
+            error = f": {entry['error']}" if entry.get('error') else ''
+            await self.logger.log("error" if entry['status'] in ('failed', 'skipped') else "info",
+                                  f"Stage {name}: {entry['status']} {timing}{offset}{error}")
+        if self.report_file:
+            with open(self.report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
@@ -0,0 +1,182 @@
+from typing import AsyncIterator, Dict, IO, List, Optional, Tuple, Union
+import asyncio
+import concurrent.futures
+import fnmatch
+import io
+import os
+import tarfile
+import threading
+import zipfile
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+# Separates an archive from the member path inside it, e.g. 'bundle.zip!/src/utils.py'.
+MEMBER_SEPARATOR = '!/'
+
+_DONE = object()
+
+
+def is_archive(name: str) -> bool:
+    return name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+class ByteBudget:
+    # Bounds the bytes read from archives but not yet consumed downstream. A single member
+    # larger than the whole budget is still admitted once nothing else is in flight.
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self, size: int) -> None:
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight == 0 or self.in_flight + size <= self.capacity)
+            self.in_flight += size
+
+    async def release(self, size: int) -> None:
+        async with self.condition:
+            self.in_flight -= size
+            self.condition.notify_all()
+
+
+class ArchiveSource:
+    # Streams selected members of zip and tar(.gz/.bz2/.xz) archives straight from the archive,
+    # without extracting anything to disk. Members are filtered by name before decompression,
+    # nested archives are opened in memory, and reads are bounded by an in-flight byte budget.
+
+    def __init__(self, options: Dict = None):
+        # Options come from the 'archive_options' config block.
+        options = options or {}
+        self.include = options.get('include', ['*'])
+        self.exclude = options.get('exclude', [])
+        self.max_in_flight_bytes = options.get('max_in_flight_bytes', 64 * 1024 * 1024)
+        self.max_member_size = options.get('max_member_size')
+        self.workers = options.get('workers', 4)
+        self.max_depth = options.get('max_depth', 2)
+        self.encoding = options.get('encoding', 'utf-8')
+
+    def accepts(self, name: str, size: int) -> bool:
+        base_name = os.path.basename(name)
+        if any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(base_name, p) for p in self.exclude):
+            return False
+        if self.max_member_size is not None and size > self.max_member_size:
+            return False
+        return any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(base_name, p) for p in self.include)
+
+    @staticmethod
+    def list_members(archive_path: str) -> List[str]:
+        if zipfile.is_zipfile(archive_path):
+            with zipfile.ZipFile(archive_path) as archive:
+                return [info.filename for info in archive.infolist() if not info.is_dir()]
+        with tarfile.open(archive_path, mode='r:*') as archive:
+            return [member.name for member in archive.getmembers() if member.isfile()]
+
+    async def iter_members(self, archive_path: str, prefix: Optional[str] = None,
+                           decode: bool = True) -> AsyncIterator[Tuple[str, Union[str, bytes]]]:
+        # Yields (member path, decoded text), or the raw bytes with decode=False. Member paths are
+        # relative to the archive unless a prefix such as 'bundle.zip!/' is given; nested members
+        # always carry their archive's name.
+        queue: asyncio.Queue = asyncio.Queue()
+        budget = ByteBudget(self.max_in_flight_bytes)
+        producer = asyncio.create_task(self._produce(archive_path, prefix or '', 0, queue, budget))
+        producer.add_done_callback(lambda task: queue.put_nowait(task.exception() or _DONE) if not task.cancelled() else None)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                name, content = item
+                try:
+                    yield name, content.decode(self.encoding, errors='ignore') if decode else content
+                finally:
+                    await budget.release(len(content))
+        finally:
+            if not producer.done():
+                producer.cancel()
+
+    async def _produce(self, source: Union[str, IO[bytes]], prefix: str, depth: int,
+                       queue: asyncio.Queue, budget: ByteBudget) -> None:
+        if await asyncio.to_thread(self._is_zip, source):
+            await self._produce_zip(source, prefix, depth, queue, budget)
+        else:
+            await self._produce_tar(source, prefix, depth, queue, budget)
+
+    @staticmethod
+    def _is_zip(source: Union[str, IO[bytes]]) -> bool:
+        result = zipfile.is_zipfile(source)
+        if not isinstance(source, str):
+            source.seek(0)
+        return result
+
+    def _wants(self, name: str, size: int, depth: int) -> bool:
+        return (is_archive(name) and depth < self.max_depth) or self.accepts(name, size)
+
+    async def _produce_zip(self, source: Union[str, IO[bytes]], prefix: str, depth: int,
+                           queue: asyncio.Queue, budget: ByteBudget) -> None:
+        archive = await asyncio.to_thread(zipfile.ZipFile, source)
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def read_member(info: zipfile.ZipInfo) -> None:
+            try:
+                # ZipFile serialises access to the underlying file, so members can be read from threads.
+                content = await asyncio.to_thread(archive.read, info)
+                await self._emit(prefix + info.filename, content, depth, queue, budget)
+            finally:
+                semaphore.release()
+
+        try:
+            tasks = []
+            for info in archive.infolist():
+                if info.is_dir() or not self._wants(info.filename, info.file_size, depth):
+                    continue
+                await semaphore.acquire()
+                await budget.acquire(info.file_size)
+                tasks.append(asyncio.create_task(read_member(info)))
+            await asyncio.gather(*tasks)
+        finally:
+            archive.close()
+
+    async def _produce_tar(self, source: Union[str, IO[bytes]], prefix: str, depth: int,
+                           queue: asyncio.Queue, budget: ByteBudget) -> None:
+        # Compressed tar streams only support sequential reads, so one thread walks the members
+        # and blocks on the byte budget before reading each one.
+        loop = asyncio.get_running_loop()
+        stop = threading.Event()
+
+        def run_on_loop(coroutine) -> None:
+            future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+            while True:
+                try:
+                    return future.result(timeout=0.1)
+                except concurrent.futures.TimeoutError:
+                    if stop.is_set():
+                        future.cancel()
+                        raise concurrent.futures.CancelledError()
+
+        def walk() -> None:
+            open_kwargs = {'name': source} if isinstance(source, str) else {'fileobj': source}
+            with tarfile.open(mode='r:*', **open_kwargs) as archive:
+                for member in archive:
+                    if not member.isfile() or not self._wants(member.name, member.size, depth):
+                        continue
+                    run_on_loop(budget.acquire(member.size))
+                    content = archive.extractfile(member).read()
+                    run_on_loop(self._emit(prefix + member.name, content, depth, queue, budget))
+
+        try:
+            await asyncio.to_thread(walk)
+        except asyncio.CancelledError:
+            # The worker thread outlives the cancelled await; tell it to stop waiting on the loop.
+            stop.set()
+            raise
+
+    async def _emit(self, name: str, content: bytes, depth: int, queue: asyncio.Queue, budget: ByteBudget) -> None:
+        if is_archive(name) and depth < self.max_depth:
+            # The nested archive is held in memory while its members stream; release its budget
+            # first so its own members can never wait on it.
+            await budget.release(len(content))
+            await self._produce(io.BytesIO(content), name + MEMBER_SEPARATOR, depth + 1, queue, budget)
+            return
+        await queue.put((name, content))
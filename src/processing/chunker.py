@@ -0,0 +1,166 @@
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import re
+
+from src.utils import LoggerService
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+_SECTION_START = re.compile(r'#{1,6} |<h[1-6]', re.IGNORECASE)
+_WORD = re.compile(r'\S+')
+
+
+class TokenChunker:
+    # Splits documents into samples of at most max_tokens tokens along paragraph boundaries,
+    # preferring to start a new sample at a section heading, and drops samples shorter than
+    # min_tokens. Documents from concurrent callers are tokenized together in batched calls
+    # to a fast tokenizer; without one, whitespace-separated words stand in for tokens.
+
+    def __init__(self, config: Dict):
+        processing_defaults = config.get('globalSettings', {}).get('processingDefaults', {})
+        options = config.get('chunking_options', {})
+        self.max_tokens = options.get('max_tokens', processing_defaults.get('maxTextLength', 512))
+        self.min_tokens = options.get('min_tokens', processing_defaults.get('minTextLength', 0))
+        self.tokenizer_id = options.get('tokenizer', 'distilbert-base-uncased')
+        self.batch_size = options.get('batch_size', 64)
+        self.max_wait = options.get('max_wait_ms', 5) / 1000
+        self.logger = LoggerService.get_instance()
+        self.tokenizer = None
+        self._tokenizer_task: Optional[asyncio.Task] = None
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _load_tokenizer(self) -> None:
+        # Every caller awaits the one shared load, so none of them falls back to whitespace
+        # words while it is still running; shielded so a cancelled caller cannot cancel it.
+        if self.tokenizer is not None:
+            return
+        if self._tokenizer_task is None:
+            self._tokenizer_task = asyncio.ensure_future(self._fetch_tokenizer())
+        await asyncio.shield(self._tokenizer_task)
+
+    async def _fetch_tokenizer(self) -> None:
+        try:
+            from transformers import AutoTokenizer
+            self.tokenizer = await asyncio.to_thread(AutoTokenizer.from_pretrained, self.tokenizer_id, use_fast=True)
+            if not getattr(self.tokenizer, 'is_fast', False):
+                raise ValueError(f"{self.tokenizer_id} has no fast tokenizer")
+        except Exception as e:
+            self.tokenizer = None
+            await self.logger.log("error", f"Chunking with whitespace words, tokenizer unavailable: {e}")
+
+    async def chunk(self, text: str) -> List[Dict[str, Any]]:
+        # Returns [{'text', 'num_tokens', 'input_ids'}]; input_ids is None without a tokenizer.
+        if not text.strip():
+            return []
+        offsets, input_ids = await self.tokenize(text)
+        return self._split(text, offsets, input_ids)
+
+    async def tokenize(self, text: str) -> Tuple[List[Tuple[int, int]], Optional[List[int]]]:
+        await self._load_tokenizer()
+        if self.tokenizer is None:
+            return [match.span() for match in _WORD.finditer(text)], None
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((text, future))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._drain())
+        return await future
+
+    async def _drain(self) -> None:
+        while self._pending:
+            if len(self._pending) < self.batch_size:
+                # Give concurrent workers a moment to join the batch.
+                await asyncio.sleep(self.max_wait)
+            batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            texts = [text for text, _ in batch]
+            try:
+                encoded = await asyncio.to_thread(self.tokenizer, texts, add_special_tokens=False, return_offsets_mapping=True)
+                for index, (_, future) in enumerate(batch):
+                    if not future.done():
+                        future.set_result(([tuple(span) for span in encoded['offset_mapping'][index]], encoded['input_ids'][index]))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _split(self, text: str, offsets: List[Tuple[int, int]], input_ids: Optional[List[int]]) -> List[Dict[str, Any]]:
+        token_starts = [start for start, _ in offsets]
+        samples, current_start, current_end = [], None, None
+
+        def emit(first_token: int, last_token: int) -> None:
+            if last_token - first_token < self.min_tokens or last_token <= first_token:
+                return
+            samples.append({
+                'text': text[offsets[first_token][0]:offsets[last_token - 1][1]],
+                'num_tokens': last_token - first_token,
+                'input_ids': input_ids[first_token:last_token] if input_ids is not None else None,
+            })
+
+        for paragraph_start, paragraph_end, is_section in self._paragraphs(text):
+            first = bisect_left(token_starts, paragraph_start)
+            last = bisect_right(token_starts, paragraph_end - 1)
+            if first == last:
+                continue
+            if current_start is not None:
+                too_long = last - current_start > self.max_tokens
+                # A heading starts a new sample once the current one is long enough to keep.
+                new_section = is_section and current_end - current_start >= self.min_tokens
+                if too_long or new_section:
+                    emit(current_start, current_end)
+                    current_start = None
+            if current_start is None:
+                current_start = first
+            current_end = last
+            # A single paragraph longer than max_tokens is cut into max_tokens windows.
+            while current_end - current_start > self.max_tokens:
+                emit(current_start, current_start + self.max_tokens)
+                current_start += self.max_tokens
+        if current_start is not None:
+            emit(current_start, current_end)
+        return samples
+
+    @staticmethod
+    def _paragraphs(text: str):
+        start = 0
+        for match in _PARAGRAPH_BREAK.finditer(text):
+            yield start, match.start(), bool(_SECTION_START.match(text, start))
+            start = match.end()
+        yield start, len(text), bool(_SECTION_START.match(text, start))
+
+
+class SequencePacker:
+    # Concatenates samples from consecutive documents, separated by separator_id, and cuts the
+    # stream into sequences of exactly sequence_length tokens, so training batches need no padding.
+
+    def __init__(self, sequence_length: int, separator_id: Optional[int] = None, drop_last: bool = False):
+        self.sequence_length = sequence_length
+        self.separator_id = separator_id
+        self.drop_last = drop_last
+        self.buffer: List[int] = []
+        self.sources: List[str] = []
+        self.packed = 0
+
+    def add(self, samples: List[List[int]], source: str) -> List[Dict[str, Any]]:
+        sequences = []
+        for input_ids in samples:
+            if self.buffer and self.separator_id is not None:
+                self.buffer.append(self.separator_id)
+            self.buffer.extend(input_ids)
+            if source not in self.sources:
+                self.sources.append(source)
+            while len(self.buffer) >= self.sequence_length:
+                sequences.append(self._emit(self.buffer[:self.sequence_length]))
+                self.buffer = self.buffer[self.sequence_length:]
+                self.sources = [source] if self.buffer else []
+        return sequences
+
+    def flush(self) -> List[Dict[str, Any]]:
+        if not self.buffer or self.drop_last:
+            return []
+        sequence = self._emit(self.buffer)
+        self.buffer, self.sources = [], []
+        return [sequence]
+
+    def _emit(self, input_ids: List[int]) -> Dict[str, Any]:
+        self.packed += 1
+        return {'input_ids': input_ids, 'length': len(input_ids), 'sources': list(self.sources)}
@@ -1,28 +1,56 @@
-from typing import Dict, List
-from transformers import AutoTokenizer, pipeline, set_seed
-from src.utils import LoggerService
+from typing import Dict, Iterator, List, Optional, Tuple
+from collections import deque
+import asyncio
+from src.utils import LoggerService, ModelRegistry
+from src.processing.inference_batcher import InferenceBatcher
 
 class ContextExtractor:
 
     def __init__(self, config: Dict[str, str]):
         self.config = config
-        self._initialize_pipelines()
+        self.inference_options = config.get('inference_options', {})
+        self.registry = ModelRegistry.get_instance()
+        self.sentiment_model = self.inference_options.get('sentiment_model', 'distilbert-base-uncased-finetuned-sst-2-english')
+        self.ner_model = self.inference_options.get('ner_model', 'dbmdz/bert-large-cased-finetuned-conll03-english')
+        self.sentiment_batcher: Optional[InferenceBatcher] = None
+        self.ner_batcher: Optional[InferenceBatcher] = None
+        self._initialization_failed = False
 
-    async def _initialize_pipelines(self):
+    async def _initialize_pipelines(self, ner: bool = True):
+        # Each model is loaded once up front so a missing one fails here; after a registry
+        # eviction the batchers reload it themselves, off the event loop.
+        # Sentiment-only callers (log scoring) pass ner=False and never load the NER model.
+        if self._initialization_failed:
+            return
         try:
-            set_seed(42)
-            self.sentiment_pipeline = pipeline('sentiment-analysis', model=AutoTokenizer.from_pretrained('distilbert-base-uncased'))
-            self.ner_pipeline = pipeline('ner', model=AutoTokenizer.from_pretrained('dbmdz/bert-large-cased-finetuned-conll03-english'))
-
+            if self.sentiment_batcher is None:
+                from transformers import set_seed
+                set_seed(42)
+                await self.registry.get('sentiment-analysis', self.sentiment_model)
+                self.sentiment_batcher = self._create_batcher('sentiment-analysis', self.sentiment_model)
+            if ner and self.ner_batcher is None:
+                await self.registry.get('ner', self.ner_model)
+                self.ner_batcher = self._create_batcher('ner', self.ner_model)
         except Exception as e:
+            self._initialization_failed = True
             await LoggerService.get_instance().log("error", f"Failed to initialize NLP pipelines: {e}")
 
+    def _create_batcher(self, task: str, model_id: str) -> InferenceBatcher:
+        return InferenceBatcher(
+            pipeline_provider=lambda: self.registry.get(task, model_id),
+            max_tokens=self.inference_options.get('max_tokens'),
+            batch_size=self.inference_options.get('batch_size', 16),
+            max_wait=self.inference_options.get('max_wait_ms', 10) / 1000,
+            max_pending=self.inference_options.get('max_pending', 256),
+        )
+
     async def extract_enhanced_context(self, file_text: str) -> Dict[str, str]:
+        await self._initialize_pipelines()
         try:
-            paragraphs = self._split_into_paragraphs(file_text)
+            surrounding_text, section_headers = self._scan_paragraphs(file_text)
             return {
-                'surrounding_text': self._extract_surrounding_text(paragraphs),
-                'section_headers': self._extract_section_headers(paragraphs),
+                'surrounding_text': surrounding_text,
+                'section_headers': section_headers,
                 'named_entities': await self._extract_named_entities(file_text),
                 'sentiment_score': await self._analyze_sentiment(file_text),
                 'code_examples': self.check_for_code_examples(file_text),
@@ -32,28 +60,46 @@ class ContextExtractor:
             await LoggerService.get_instance().log("error", f"Error extracting enhanced context: {e}")
             return {}
 
-    def _split_into_paragraphs(self, text: str) -> List[str]:
-        return text.split('\n\n')
+    def _split_into_paragraphs(self, text: str) -> Iterator[str]:
+        # Lazy equivalent of text.split('\n\n'); only one paragraph is materialised at a time.
+        start = 0
+        while True:
+            end = text.find('\n\n', start)
+            if end == -1:
+                yield text[start:]
+                return
+            yield text[start:end]
+            start = end + 2
 
-    def _extract_surrounding_text(self, paragraphs: List[str]) -> List[str]:
+    def _scan_paragraphs(self, text: str) -> Tuple[List[str], List[str]]:
+        # Surrounding text and section headers in one pass, keeping only the first and last
+        # paragraphs instead of the full paragraph list.
         num_surrounding_paragraphs = self.config.get('context_options', {}).get('num_surrounding_paragraphs', 3)
-        return paragraphs[:num_surrounding_paragraphs] + paragraphs[-num_surrounding_paragraphs:]
-
-    def _extract_section_headers(self, paragraphs: List[str]) -> List[str]:
-        return [p.split('\n', 1)[0] for p in paragraphs if p.startswith('# ')]
+        head: List[str] = []
+        tail = deque(maxlen=num_surrounding_paragraphs)
+        section_headers = []
+        for paragraph in self._split_into_paragraphs(text):
+            if len(head) < num_surrounding_paragraphs:
+                head.append(paragraph)
+            tail.append(paragraph)
+            if paragraph.startswith('# '):
+                section_headers.append(paragraph.split('\n', 1)[0])
+        return head + list(tail), section_headers
 
     async def _extract_named_entities(self, text: str) -> List[str]:
         try:
-            # Assuming the ner_pipeline method accepts text and returns entities
-            return [entity['word'] for entity in self.ner_pipeline(text)]
+            windows = await self.ner_batcher.submit(text)
+            return [entity['word'] for entities, _ in windows for entity in entities]
         except Exception as e:
             await LoggerService.get_instance().log("error", f"Error extracting named entities: {e}")
             return []
 
     async def _analyze_sentiment(self, text: str) -> float:
         try:
-            result = self.sentiment_pipeline(text)
-            return result[0]['score']
+            windows = await self.sentiment_batcher.submit(text)
+            total_tokens = sum(num_tokens for _, num_tokens in windows)
+            # Token-weighted mean over windows, so long documents are scored in full.
+            return sum(result['score'] * num_tokens for result, num_tokens in windows) / total_tokens if total_tokens else 0.0
         except Exception as e:
             await LoggerService.get_instance().log("error", f"Error analyzing sentiment: {e}")
             return 0.0   
@@ -71,11 +117,18 @@ class ContextExtractor:
         return 'General'
 
     async def analyze_sentiment(self, text: str) -> str:
-        # Removed redundant pipeline initialization as it's already done in _initialize_pipelines
-        result = self.sentiment_pipeline(text)[0]
-        if result['label'] == 'NEGATIVE':
+        await self._initialize_pipelines(ner=False)
+        weights = {}
+        for result, num_tokens in await self.sentiment_batcher.submit(text):
+            weights[result['label']] = weights.get(result['label'], 0) + result['score'] * num_tokens
+        label = max(weights, key=weights.get) if weights else None
+        if label == 'NEGATIVE':
             return 'negative'
-        elif result['label'] == 'POSITIVE':
+        elif label == 'POSITIVE':
             return 'positive'
         else:
-            return 'neutral'
\ No newline at end of file
+            return 'neutral'
+
+    async def analyze_sentiment_batch(self, texts: List[str]) -> List[str]:
+        # Submitted together so the InferenceBatcher scores them in shared batches.
+        return list(await asyncio.gather(*(self.analyze_sentiment(text) for text in texts)))
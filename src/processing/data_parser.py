@@ -1,49 +1,53 @@
 from typing import Dict
 from ..utils import LoggerService, RequestManager, ConfigManager
+from .response_cache import ResponseCache
+from .records import EXTERNAL_DETAILS, EXTERNAL_TOPICS, SimulatedEntries
 
 
 
 class DataProcessor:
-    def __init__(self, config: Dict[str, Dict]):
+    def __init__(self, config: Dict[str, Dict], request_manager: RequestManager = None):
         self.config = config
-        self.external_data: Dict[str, Dict] = {}
-        self.cache: Dict[str, Dict] = {}
+        self.cache = ResponseCache(config.get('cache_options', {}))
+        self.simulated = SimulatedEntries(EXTERNAL_DETAILS, EXTERNAL_TOPICS, config.get('record_options', {}).get('entry_cache_size', 65536))
         self.source_fetchers: Dict[str, callable] = {
             'generic': self._fetch_generic_api_data,
         }
         self.logger = LoggerService.get_instance()
         self.config_manager = ConfigManager()
-        self.request_manager = RequestManager(self.logger)
+        self.request_manager = request_manager or RequestManager(self.logger, config.get('http_options', {}))
 
     async def integrate_external_data(self, metadata: Dict[str, Dict], context: Dict[str, Dict]) -> Dict[str, Dict]:
-        await self._extract_and_simulate_data(metadata, context)
-        await self._process_external_sources()
-        return self.external_data
+        # Built per call so concurrent pipeline workers never share (or grow) a result dict.
+        external_data = await self._extract_and_simulate_data(metadata, context)
+        await self._process_external_sources(external_data)
+        return external_data
 
-    async def _extract_and_simulate_data(self, metadata: Dict[str, Dict], context: Dict[str, Dict]) -> None:
-        for entity in context.get('named_entities', []): 
-            self.external_data[entity] = {'entity': entity, 'details': 'Simulated entity details from external source.'}
-        for keyword in metadata.get('keywords', []): 
-            self.external_data[keyword] = {'keyword': keyword, 'related_topics': ['Topic 1', 'Topic 2']}
+    async def _extract_and_simulate_data(self, metadata: Dict[str, Dict], context: Dict[str, Dict]) -> Dict[str, Dict]:
+        return self.simulated.build(context.get('named_entities', []), metadata.get('keywords', []))
 
-    async def _process_external_sources(self) -> None:
+    async def _process_external_sources(self, external_data: Dict[str, Dict]) -> None:
         external_data_sources = self.config.get('external_data_sources', {}).get('api_calls', [])
         for source in external_data_sources:
             if fetcher := self.source_fetchers.get(source.get('type')):
-                self.external_data.update(await fetcher(source))
+                external_data.update(await fetcher(source))
 
     async def _fetch_generic_api_data(self, source: Dict[str, Dict]) -> Dict[str, Dict]:
-        cache_key = source['url'] + str(source.get('params', {}))
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+        cache_key = self.cache.key_for(source['url'], source.get('params', {}))
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            return cached
         
         response = await self.request_manager.send_request(source['url'], params=source.get('params', {}))
         if 'status' in response and response['status'] == 'ok':
-            self.cache[cache_key] = response
-            return self.cache[cache_key]
+            await self.cache.set(cache_key, response, self.cache.ttl_for(source))
+            return response
         else:
             await self.logger.log("error", f"Failed to fetch data from {source['url']}")
             return {}
+
+    def close(self) -> None:
+        self.cache.close()
     
     async def _initialize_models_and_pipelines(self) -> Dict[str, str]:
         try:
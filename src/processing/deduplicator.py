@@ -0,0 +1,156 @@
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import zlib
+
+_WORD = re.compile(r'\w+')
+# Mersenne prime for the universal hash family ((a * x + b) mod p) used by the permutations.
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+class MinHasher:
+    # MinHash signatures over word shingles. Words are hashed once in Python; shingle hashes and
+    # all num_perm permutations are computed as NumPy array operations over the whole document.
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        import numpy
+        self.numpy = numpy
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        generator = numpy.random.default_rng(seed)
+        # 32-bit coefficients over 32-bit folded shingle hashes keep a * x + b exact within uint64.
+        self.a = generator.integers(1, 1 << 32, size=num_perm, dtype=numpy.uint64)
+        self.b = generator.integers(0, 1 << 32, size=num_perm, dtype=numpy.uint64)
+        # Odd multipliers combining the word hashes of a shingle position by position.
+        self.mixers = generator.integers(1, 1 << 32, size=shingle_size, dtype=numpy.uint64) | numpy.uint64(1)
+
+    def shingle_hashes(self, text: str):
+        numpy = self.numpy
+        words = numpy.fromiter((zlib.crc32(word.encode('utf-8')) for word in _WORD.findall(text.lower())), dtype=numpy.uint64)
+        if len(words) == 0:
+            return words
+        width = min(self.shingle_size, len(words))
+        count = len(words) - width + 1
+        hashes = numpy.zeros(count, dtype=numpy.uint64)
+        for position in range(width):
+            hashes += words[position:position + count] * self.mixers[position]
+        return numpy.unique(hashes)
+
+    def signature(self, text: str):
+        numpy = self.numpy
+        hashes = self.shingle_hashes(text)
+        if len(hashes) == 0:
+            return numpy.full(self.num_perm, numpy.iinfo(numpy.uint64).max, dtype=numpy.uint64)
+        # All permutations of all shingles in one (num_perm, shingles) broadcast.
+        folded = (hashes ^ (hashes >> numpy.uint64(32))) & numpy.uint64(0xFFFFFFFF)
+        permuted = (self.a[:, None] * folded[None, :] + self.b[:, None]) % numpy.uint64(_MERSENNE_PRIME)
+        return permuted.min(axis=1)
+
+
+class DedupIndex:
+    # Persistent exact-hash and LSH band index. SQLite in WAL mode lets concurrent shard
+    # processes and later runs share one index file.
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS exact (hash TEXT NOT NULL, file_path TEXT PRIMARY KEY)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS exact_hash ON exact (hash)')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS signatures (file_path TEXT PRIMARY KEY, signature BLOB NOT NULL)')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS bands (band INTEGER NOT NULL, bucket BLOB NOT NULL, file_path TEXT NOT NULL, '
+                                'PRIMARY KEY (band, bucket, file_path))')
+        self.connection.commit()
+
+    def find_exact(self, content_hash: str, file_path: str) -> Optional[str]:
+        row = self.connection.execute('SELECT file_path FROM exact WHERE hash = ? AND file_path != ? LIMIT 1',
+                                      (content_hash, file_path)).fetchone()
+        return row[0] if row else None
+
+    def candidates(self, buckets: List[bytes], file_path: str) -> List[Tuple[str, bytes]]:
+        placeholders = ' OR '.join('(band = ? AND bucket = ?)' for _ in buckets)
+        parameters = [value for band, bucket in enumerate(buckets) for value in (band, bucket)]
+        return self.connection.execute(
+            f'SELECT DISTINCT s.file_path, s.signature FROM bands b JOIN signatures s ON s.file_path = b.file_path '
+            f'WHERE ({placeholders}) AND b.file_path != ?', parameters + [file_path]).fetchall()
+
+    def add(self, file_path: str, content_hash: str, signature: bytes, buckets: List[bytes]) -> None:
+        # Replaces any entries for the path, so an edited file is indexed by its new content only.
+        self.connection.execute('DELETE FROM bands WHERE file_path = ?', (file_path,))
+        self.connection.execute('INSERT OR REPLACE INTO exact (hash, file_path) VALUES (?, ?)', (content_hash, file_path))
+        self.connection.execute('INSERT OR REPLACE INTO signatures (file_path, signature) VALUES (?, ?)', (file_path, signature))
+        self.connection.executemany('INSERT OR IGNORE INTO bands (band, bucket, file_path) VALUES (?, ?, ?)',
+                                    [(band, bucket, file_path) for band, bucket in enumerate(buckets)])
+        self.connection.commit()
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+    @staticmethod
+    def remove(path: str) -> None:
+        # Deletes an index file together with its WAL side files.
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+class Deduplicator:
+    # Drops exact duplicates (by normalised content hash) and near duplicates (estimated
+    # Jaccard similarity of word shingles at or above threshold, found through LSH bands)
+    # of documents already seen in this run, an earlier run, or another shard sharing the index.
+
+    def __init__(self, options: Dict = None):
+        # Options come from the 'dedup_options' config block.
+        options = options or {}
+        self.threshold = options.get('threshold', 0.85)
+        self.bands = options.get('bands', 16)
+        self.minhasher = MinHasher(options.get('num_perm', 128), options.get('shingle_size', 5), options.get('seed', 1))
+        if self.minhasher.num_perm % self.bands:
+            raise ValueError("dedup_options.num_perm must be a multiple of dedup_options.bands")
+        self.rows = self.minhasher.num_perm // self.bands
+        self.index = DedupIndex(options.get('index_file') or ':memory:')
+        self.lock = asyncio.Lock()
+        self.stats = {'checked': 0, 'exact': 0, 'near': 0}
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.blake2b(' '.join(text.lower().split()).encode('utf-8'), digest_size=16).hexdigest()
+
+    def _fingerprint(self, text: str) -> Tuple[str, bytes, List[bytes]]:
+        signature = self.minhasher.signature(text)
+        buckets = [hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(), digest_size=8).digest()
+                   for band in range(self.bands)]
+        return self.content_hash(text), signature.tobytes(), buckets
+
+    def _check_and_add(self, file_path: str, content_hash: str, signature: bytes, buckets: List[bytes]) -> Optional[Tuple[str, str, float]]:
+        numpy = self.minhasher.numpy
+        with self.index.lock:
+            duplicate_of = self.index.find_exact(content_hash, file_path)
+            if duplicate_of is not None:
+                return 'exact', duplicate_of, 1.0
+            current = numpy.frombuffer(signature, dtype=numpy.uint64)
+            for candidate_path, candidate_signature in self.index.candidates(buckets, file_path):
+                similarity = float((numpy.frombuffer(candidate_signature, dtype=numpy.uint64) == current).mean())
+                if similarity >= self.threshold:
+                    return 'near', candidate_path, similarity
+            self.index.add(file_path, content_hash, signature, buckets)
+            return None
+
+    async def check(self, file_path: str, text: str) -> Optional[Tuple[str, str, float]]:
+        # Returns (kind, duplicate of, estimated similarity) for a duplicate, or None after indexing a new document.
+        fingerprint = await asyncio.to_thread(self._fingerprint, text)
+        # Check-then-add is serialised so two near-identical files in flight cannot both pass.
+        async with self.lock:
+            result = await asyncio.to_thread(self._check_and_add, file_path, *fingerprint)
+        self.stats['checked'] += 1
+        if result is not None:
+            self.stats[result[0]] += 1
+        return result
+
+    def close(self) -> None:
+        self.index.close()
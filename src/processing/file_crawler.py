@@ -1,14 +1,224 @@
-from typing import Dict, List
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import fnmatch
 import os
+import re
+import threading
+
+from src.processing.archive_source import ArchiveSource
+from src.processing.records import INTERNAL_DETAILS, INTERNAL_TOPICS, SimulatedEntries
+
+
+def _class_end(pattern: str, start: int) -> Optional[int]:
+    # Index of the ']' closing the bracket class opened at start, or None when it is never
+    # closed and the '[' is a literal. A ']' first in the class is a member, not the end.
+    i = start + 1
+    if i < len(pattern) and pattern[i] in '!^':
+        i += 1
+    if i < len(pattern) and pattern[i] == ']':
+        i += 1
+    end = pattern.find(']', i)
+    return end if end != -1 else None
+
+
+def _gitignore_regex(pattern: str) -> str:
+    parts, i = [], 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        elif pattern[i] == '[' and (end := _class_end(pattern, i)) is not None:
+            # '[abc]', '[a-z]' and '[!abc]' as in fnmatch; like '*' and '?', a class never matches '/'.
+            negate = pattern[i + 1] in '!^'
+            members = pattern[i + 2 if negate else i + 1:end]
+            members = members.replace('\\', '\\\\').replace('[', '\\[').replace(']', '\\]')
+            parts.append(f"[^/{members}]" if negate else f"(?!/)[{members}]")
+            i = end + 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return ''.join(parts)
+
+
+class IgnoreRules:
+    # One .gitignore-style file: '#' comments, '!' negation, '*', '?', '**' and '[...]' classes,
+    # trailing '/' for directories only, and patterns with a leading or inner '/' anchored to
+    # the directory that holds the file.
+
+    def __init__(self, base_dir: str, lines: List[str]):
+        self.base_dir = base_dir
+        self.rules: List[Tuple[re.Pattern, bool, bool]] = []
+        for line in lines:
+            line = line.rstrip('\n').rstrip()
+            if not line or line.startswith('#'):
+                continue
+            negate = line.startswith('!')
+            line = line[1:] if negate else line
+            directory_only = line.endswith('/')
+            anchored = '/' in line.rstrip('/')
+            line = line.strip('/')
+            prefix = '' if anchored else '(?:.*/)?'
+            self.rules.append((re.compile(f"^{prefix}{_gitignore_regex(line)}$"), negate, directory_only))
+
+    @classmethod
+    def load(cls, base_dir: str, file_name: str) -> Optional['IgnoreRules']:
+        path = os.path.join(base_dir, file_name)
+        if not os.path.isfile(path):
+            return None
+        with open(path, encoding='utf-8', errors='ignore') as f:
+            return cls(base_dir, f.readlines())
+
+    def match(self, path: str, is_dir: bool) -> Optional[bool]:
+        # True = ignored, False = re-included by a '!' rule, None = no rule applies. Last match wins.
+        relative = os.path.relpath(path, self.base_dir).replace(os.sep, '/')
+        result = None
+        for regex, negate, directory_only in self.rules:
+            if directory_only and not is_dir:
+                continue
+            if regex.match(relative):
+                result = not negate
+        return result
+
+
+class DirectoryCrawler:
+    # Walks a tree with os.scandir, one directory per thread-pool task, yielding files as soon
+    # as their directory has been scanned instead of materialising the whole listing.
+
+    def __init__(self, options: Dict = None):
+        # Options come from the 'crawl_options' config block.
+        options = options or {}
+        self.workers = options.get('workers', 8)
+        self.include = options.get('include', [])
+        self.exclude = options.get('exclude', [])
+        self.ignore_files = options.get('ignore_files', ['.gitignore'])
+        self.max_file_size = options.get('max_file_size')
+        self.skip_binary = options.get('skip_binary', False)
+        # Symlinked files are always listed, as os.walk listed them; follow_symlinks only decides
+        # whether symlinked directories are descended into.
+        self.follow_symlinks = options.get('follow_symlinks', False)
+        # Dot-named files are skipped, and dot-named directories are not descended into.
+        self.skip_hidden = options.get('skip_hidden', True)
+        self.visited = set()
+        self.visited_lock = threading.Lock()
+
+    def walk(self, root: str) -> Iterator[str]:
+        self.visited = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {self._submit(pool, root, root, [])}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirectories = future.result()
+                    pending.update(self._submit(pool, root, directory, rules) for directory, rules in subdirectories)
+                    yield from files
+
+    async def iter_files(self, root: str) -> AsyncIterator[str]:
+        self.visited = set()
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {asyncio.wrap_future(self._submit(pool, root, root, []), loop=loop)}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    files, subdirectories = future.result()
+                    pending.update(asyncio.wrap_future(self._submit(pool, root, directory, rules), loop=loop)
+                                   for directory, rules in subdirectories)
+                    for file_path in files:
+                        yield file_path
+
+    def _submit(self, pool: ThreadPoolExecutor, root: str, directory: str, rules: List[IgnoreRules]) -> Future:
+        return pool.submit(self._scan, root, directory, rules)
+
+    def _scan(self, root: str, directory: str, inherited_rules: List[IgnoreRules]) -> Tuple[List[str], List[Tuple[str, List[IgnoreRules]]]]:
+        files, subdirectories = [], []
+        if not self._first_visit(directory):
+            return files, subdirectories
+        rules = inherited_rules + [r for r in (IgnoreRules.load(directory, name) for name in self.ignore_files) if r]
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except OSError:
+            return files, subdirectories
+        for entry in entries:
+            if self.skip_hidden and entry.name.startswith('.'):
+                continue
+            try:
+                is_dir = entry.is_dir()
+                if is_dir and not self.follow_symlinks and entry.is_symlink():
+                    continue
+                if not is_dir and not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            relative = os.path.relpath(entry.path, root).replace(os.sep, '/')
+            if self._ignored(entry.path, relative, entry.name, is_dir, rules):
+                continue
+            if is_dir:
+                subdirectories.append((entry.path, rules))
+            elif self._accept_file(entry, relative):
+                files.append(entry.path)
+        return files, subdirectories
+
+    def _first_visit(self, directory: str) -> bool:
+        # Symlinked directories can point back up the tree; (device, inode) pairs catch the loop.
+        try:
+            stat = os.stat(directory)
+        except OSError:
+            return False
+        with self.visited_lock:
+            key = (stat.st_dev, stat.st_ino)
+            if key in self.visited:
+                return False
+            self.visited.add(key)
+            return True
+
+    def _ignored(self, path: str, relative: str, name: str, is_dir: bool, rules: List[IgnoreRules]) -> bool:
+        if any(fnmatch.fnmatch(relative, pattern) or fnmatch.fnmatch(name, pattern) for pattern in self.exclude):
+            return True
+        ignored = False
+        for rule_set in rules:
+            verdict = rule_set.match(path, is_dir)
+            if verdict is not None:
+                ignored = verdict
+        return ignored
+
+    def _accept_file(self, entry: os.DirEntry, relative: str) -> bool:
+        if self.include and not any(fnmatch.fnmatch(relative, pattern) or fnmatch.fnmatch(entry.name, pattern) for pattern in self.include):
+            return False
+        if self.max_file_size is not None:
+            try:
+                if entry.stat().st_size > self.max_file_size:
+                    return False
+            except OSError:
+                return False
+        return not (self.skip_binary and self.is_binary(entry.path))
+
+    @staticmethod
+    def is_binary(file_path: str, sniff_length: int = 8192) -> bool:
+        try:
+            with open(file_path, 'rb') as f:
+                return b'\x00' in f.read(sniff_length)
+        except OSError:
+            return True
+
 
 class FileProcessor:
-    def __init__(self, config: Dict[str, Dict]):
+    def __init__(self, config: Dict[str, Dict], request_manager=None):
         from src.utils import LoggerService, FileManager, RequestManager
         self.config = config
-        self.internal_data: Dict[str, Dict] = {}
         self.logger = LoggerService.get_instance("FileProcessorLogger")
-        self.request_manager = RequestManager(self.logger)
+        self.request_manager = request_manager or RequestManager(self.logger, config.get('http_options', {}))
         self.file_manager = FileManager()
+        self.simulated = SimulatedEntries(INTERNAL_DETAILS, INTERNAL_TOPICS, config.get('record_options', {}).get('entry_cache_size', 65536))
         self.source_handlers = {handler_type: getattr(self, f"_fetch_{handler_type}_internal_api_data")
                                  for handler_type in config.get('internal_data_source_types', ['generic'])}
         self.error_count = 0
@@ -26,48 +236,28 @@ class FileProcessor:
             return {}
 
     async def prepare_data_for_llm(self, metadata: Dict[str, Dict], context: Dict[str, Dict]) -> Dict[str, Dict]:
-        await self._simulate_and_extract_data(metadata, context)
-        await self._handle_internal_sources()
-        return self.internal_data
-
-    async def _simulate_and_extract_data(self, metadata: Dict[str, Dict], context: Dict[str, Dict]) -> None:
-        entities = context.get('named_entities', [])
-        keywords = metadata.get('keywords', [])
-
-        self.internal_data = {
-            entity: {
-                'entity': entity,
-                'details': 'Simulated entity details for internal use.',
-            }
-            for entity in entities
-        } | {
-            keyword: {
-                'keyword': keyword,
-                'related_topics': ['Internal Topic 1', 'Internal Topic 2'],
-            }
-            for keyword in keywords
-        }
+        # Built per call so concurrent pipeline workers never share a result dict.
+        internal_data = await self._simulate_and_extract_data(metadata, context)
+        await self._handle_internal_sources(internal_data)
+        return internal_data
 
-    async def _handle_internal_sources(self) -> None:
+    async def _simulate_and_extract_data(self, metadata: Dict[str, Dict], context: Dict[str, Dict]) -> Dict[str, Dict]:
+        return self.simulated.build(context.get('named_entities', []), metadata.get('keywords', []))
+
+    async def _handle_internal_sources(self, internal_data: Dict[str, Dict]) -> None:
         internal_data_sources = self.config.get('internal_data_sources', [])
         for source in internal_data_sources:
             if handler := self.source_handlers.get(source.get('type')):
-                self.internal_data.update(await handler(source))
-
-    async def process_zip_file(self, zip_path: str, extract_dir: str) -> Dict[str, str]:
-        await self.file_manager.create_directory(extract_dir)
-        await self.file_manager.extract_zip_file(zip_path, extract_dir)
-        return await self.file_manager.list_files_in_directory(
-            extract_dir, exclude_hidden=True
-        )
-
-    async def read_python_files(self, file_paths: List[str], extract_dir: str) -> Dict[str, str]:
-        file_contents = {}
-        for file_path in file_paths:
-            if file_path.endswith('.py'):  # Process only Python files
-                content = await self.file_manager.read_file(os.path.join(extract_dir, file_path))
-                file_contents[file_path] = content
-        return file_contents
+                internal_data.update(await handler(source))
+
+    async def process_zip_file(self, zip_path: str, extract_dir: str = None) -> List[str]:
+        # Lists the archive's members in place; extract_dir is kept for callers but nothing is written to it.
+        return await asyncio.to_thread(ArchiveSource.list_members, zip_path)
+
+    async def read_python_files(self, zip_path: str, extract_dir: str = None) -> Dict[str, str]:
+        # Streams the Python members straight out of the archive (and any archives nested in it).
+        archive_source = ArchiveSource({**self.config.get('archive_options', {}), 'include': ['*.py']})
+        return {name: content async for name, content in archive_source.iter_members(zip_path)}
 
     async def display_utils_content(self, python_file_contents: Dict[str, str]) -> None:
         utils_content = python_file_contents['src/utils.py']
@@ -78,8 +268,8 @@ class FileProcessor:
 
     async def process_files(self, zip_path: str, extract_dir: str, test_content_path: str) -> Dict[str, str]:
         extracted_files = await self.process_zip_file(zip_path, extract_dir)
-        python_files = [file for file in extracted_files if file.endswith('.py')]
-        python_file_contents = await self.read_python_files(python_files, extract_dir)
+        python_file_contents = await self.read_python_files(zip_path, extract_dir)
+        python_files = list(python_file_contents)
         await self.display_utils_content(python_file_contents)
         test_content = await self.read_test_content(test_content_path)
 
@@ -0,0 +1,122 @@
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+import asyncio
+
+
+class InferenceBatcher:
+    # Collects texts from concurrent callers, splits them into token-bounded windows and runs
+    # them through a HuggingFace pipeline in length-sorted batches off the event loop.
+
+    def __init__(self, pipeline: Callable = None, tokenizer: Any = None, max_tokens: Optional[int] = None,
+                 batch_size: int = 16, max_wait: float = 0.01, max_pending: int = 256,
+                 pipeline_provider: Optional[Callable[[], Awaitable[Any]]] = None):
+        # pipeline_provider is awaited per submit and per drained slice instead of pinning one
+        # pipeline for good, so a shared ModelRegistry can evict the weights behind it and
+        # reload them off the event loop. Each slice keeps the pipeline it resolved until done.
+        self._pipeline = pipeline
+        self.pipeline_provider = pipeline_provider
+        self._tokenizer = tokenizer
+        self._max_tokens = max_tokens
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.max_pending = max(self.batch_size, max_pending)
+        self._pending: List[Tuple[str, int, asyncio.Future]] = []
+        # One slot per outstanding window; submit waits for a free slot, so callers feel
+        # backpressure once max_pending windows are queued or running.
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def resolve_pipeline(self) -> Callable:
+        return await self.pipeline_provider() if self.pipeline_provider is not None else self._pipeline
+
+    def tokenizer_for(self, pipeline: Callable) -> Any:
+        return self._tokenizer if self._tokenizer is not None else getattr(pipeline, 'tokenizer', None)
+
+    def max_tokens_for(self, tokenizer: Any) -> int:
+        if self._max_tokens is None:
+            # Leave room for [CLS]/[SEP]; some tokenizers report an effectively unbounded limit.
+            model_max_length = getattr(tokenizer, 'model_max_length', 512) or 512
+            self._max_tokens = max(16, min(model_max_length, 512) - 2)
+        return self._max_tokens
+
+    def split_into_windows(self, text: str, tokenizer: Any = None) -> List[Tuple[str, int]]:
+        if not text.strip():
+            return []
+        offsets = None
+        tokenizer = tokenizer if tokenizer is not None else self._tokenizer
+        max_tokens = self.max_tokens_for(tokenizer)
+        if tokenizer is not None:
+            try:
+                offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)['offset_mapping']
+            except NotImplementedError:
+                # Slow (pure Python) tokenizers cannot report offsets; fall back to whitespace words.
+                offsets = None
+        if offsets is None:
+            words = text.split()
+            return [(' '.join(words[i:i + max_tokens]), len(words[i:i + max_tokens]))
+                    for i in range(0, len(words), max_tokens)]
+        windows = []
+        for start in range(0, len(offsets), max_tokens):
+            chunk = offsets[start:start + max_tokens]
+            windows.append((text[chunk[0][0]:chunk[-1][1]], len(chunk)))
+        return windows
+
+    async def submit(self, text: str) -> List[Tuple[Any, int]]:
+        # Returns one (pipeline output, token count) pair per window, in document order.
+        tokenizer = self.tokenizer_for(await self.resolve_pipeline())
+        # Tokenizing a long document takes a while; off the loop, other callers keep batching meanwhile.
+        windows = await asyncio.to_thread(self.split_into_windows, text, tokenizer)
+        if not windows:
+            return []
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # The semaphore belongs to the loop that first waited on it; a fresh asyncio.run() needs a new one.
+            self._loop, self._slots, self._pending = loop, asyncio.Semaphore(self.max_pending), []
+        futures = []
+        for window, num_tokens in windows:
+            await self._slots.acquire()
+            future = loop.create_future()
+            self._pending.append((window, num_tokens, future))
+            futures.append(future)
+            # Started per window so a document longer than max_pending drains while it waits.
+            if self._task is None or self._task.done():
+                self._task = asyncio.create_task(self._drain())
+        outputs = await asyncio.gather(*futures)
+        return [(output, num_tokens) for output, (_, num_tokens) in zip(outputs, windows)]
+
+    async def _drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            if len(self._pending) < self.batch_size:
+                # Give other in-flight callers a moment to join the batch.
+                await asyncio.sleep(self.max_wait)
+            pending, self._pending = self._pending[:self.max_pending], self._pending[self.max_pending:]
+            pending.sort(key=lambda item: item[1])
+            try:
+                pipeline = await self.resolve_pipeline()
+            except Exception as e:
+                self._fail(pending, e)
+                continue
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                texts = [window for window, _, _ in batch]
+                try:
+                    outputs = await loop.run_in_executor(None, self._infer, pipeline, texts)
+                except Exception as e:
+                    self._fail(batch, e)
+                    continue
+                for (_, _, future), output in zip(batch, outputs):
+                    if not future.done():
+                        future.set_result(output)
+                    self._slots.release()
+
+    def _fail(self, items: List[Tuple[str, int, asyncio.Future]], error: Exception) -> None:
+        for _, _, future in items:
+            if not future.done():
+                future.set_exception(error)
+            self._slots.release()
+
+    @staticmethod
+    def _infer(pipeline: Callable, texts: List[str]) -> List[Any]:
+        # List input always yields one output per text, whatever the pipeline task.
+        return list(pipeline(texts, batch_size=len(texts)))
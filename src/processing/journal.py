@@ -0,0 +1,163 @@
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+import json
+import os
+import time
+
+from src.processing.output_writer import open_output
+
+
+def _sync(handle: IO) -> None:
+    handle.flush()
+    try:
+        os.fsync(handle.fileno())
+    except (AttributeError, OSError, ValueError):
+        # Some compressed streams do not expose their underlying file descriptor.
+        pass
+
+
+class ProgressJournal:
+    # Write-ahead progress log for one output. The writer appends a 'record' line for every
+    # output line only after that line's bytes have been flushed (and fsynced) to its shard, a
+    # 'flush' line with the shard's durable length, and a 'closed' line once a shard is renamed
+    # into place. After a crash, replaying the journal gives the files that are finished and the
+    # length each shard must be cut back to. Lines are appended only, so a torn last line is the
+    # only damage a crash can do; it is ignored on load and cut off before a resumed run appends.
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        self.header: Dict[str, Any] = {}
+        self.shards: Dict[int, Dict[str, Any]] = {}
+        self.completed: Dict[str, Dict[str, Any]] = {}
+        self.pending: List[Dict[str, Any]] = []
+        self.handle: Optional[IO[str]] = None
+        self.valid_bytes = 0
+
+    def load(self) -> bool:
+        # Returns False when there is no journal to resume from.
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                self._apply(event)
+                self.valid_bytes += len(line)
+        # Records past a shard's last durable flush may not have reached the disk.
+        self.completed = {
+            file_path: entry for file_path, entry in self.completed.items()
+            if entry['shard'] in self.shards and entry['offset'] + entry['length'] <= self.shards[entry['shard']]['bytes']
+        }
+        return bool(self.header)
+
+    def _apply(self, event: Dict[str, Any]) -> None:
+        kind = event.pop('event', None)
+        if kind == 'header':
+            self.header = event
+        elif kind == 'record':
+            self.completed[event.pop('file_path')] = event
+        elif kind in ('flush', 'closed'):
+            shard = self.shards.setdefault(event['shard'], {'closed': False})
+            shard.update(event)
+            shard['closed'] = kind == 'closed'
+
+    def open(self, header: Dict[str, Any], resume: bool = False) -> None:
+        # A fresh run starts a new journal; a resumed run keeps appending to the loaded one.
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if resume and self.header:
+            # Cut a torn last line off before appending after it.
+            os.truncate(self.path, self.valid_bytes)
+            self.handle = open(self.path, 'a', encoding='utf-8')
+            return
+        self.header = header
+        self.shards, self.completed, self.pending = {}, {}, []
+        self.handle = open(self.path, 'w', encoding='utf-8')
+        self._append([{'event': 'header', **header}])
+
+    def add(self, file_path: Optional[str], shard: int, offset: int, length: int, extra: Optional[Dict[str, Any]] = None) -> None:
+        # Held back until the writer reports the bytes as flushed.
+        self.pending.append({'event': 'record', 'file_path': file_path, 'shard': shard, 'offset': offset, 'length': length, **(extra or {})})
+
+    def flushed(self, shard: int, path: str, size: int, records: int) -> None:
+        events, self.pending = self.pending, []
+        events.append({'event': 'flush', 'shard': shard, 'path': path, 'bytes': size, 'records': records})
+        self._append(events)
+
+    def closed(self, shard: int, path: str, size: int, records: int) -> None:
+        self._append([{'event': 'closed', 'shard': shard, 'path': path, 'bytes': size, 'records': records}])
+
+    def _append(self, events: List[Dict[str, Any]]) -> None:
+        for event in events:
+            self._apply(dict(event))
+        self.handle.write(''.join(json.dumps(event, default=str) + '\n' for event in events))
+        if self.fsync:
+            _sync(self.handle)
+        else:
+            self.handle.flush()
+
+    def iter_records(self, compression: str) -> Iterator[Tuple[str, bytes]]:
+        # (file_path, line) for every completed record, in output order, read from the shards
+        # as the interrupted run left them; must run before the writer cuts them back.
+        by_location = {(entry['shard'], entry['offset']): file_path for file_path, entry in self.completed.items()}
+        for index, shard in sorted(self.shards.items()):
+            source = shard['path'] if os.path.exists(shard['path']) else f"{shard['path']}.tmp"
+            position = 0
+            with open_output(source, 'rb', compression) as f:
+                try:
+                    for line in f:
+                        if position + len(line) > shard['bytes']:
+                            break
+                        file_path = by_location.get((index, position))
+                        if file_path is not None:
+                            yield file_path, line
+                        position += len(line)
+                except EOFError:
+                    # The stream of an unfinished compressed shard just stops after its last flush.
+                    pass
+
+    def close(self) -> None:
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+    def remove(self) -> None:
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class DeadLetterList:
+    # Files that failed a pipeline stage, one JSON line each, so a run carries on past bad
+    # input and the failures can be inspected or retried later.
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.handle: Optional[IO[str]] = None
+
+    def open(self, resume: bool = False) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if resume and os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.entries[entry['file_path']] = entry
+        self.handle = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+
+    def add(self, file_path: str, stage: str, error: BaseException) -> None:
+        entry = {'file_path': file_path, 'stage': stage, 'error': f"{type(error).__name__}: {error}", 'time': time.time()}
+        self.entries[file_path] = entry
+        self.handle.write(json.dumps(entry) + '\n')
+        self.handle.flush()
+
+    def close(self) -> None:
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
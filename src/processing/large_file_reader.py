@@ -0,0 +1,138 @@
+from typing import Dict, Iterator, Optional, Tuple
+import base64
+import binascii
+import mmap
+import os
+import re
+
+_BASE64_BYTES = re.compile(rb'[A-Za-z0-9+/=\r\n]*')
+_PARAGRAPH_BREAK = b'\n\n'
+_CONTROL_BYTES = bytes(b for b in range(32) if b not in b'\t\n\r\f\b')
+
+
+def classify_sample(sample: bytes) -> str:
+    # 'binary', 'base64', 'minified' or 'text', judged from the first few KB of a file.
+    if not sample:
+        return 'text'
+    if b'\x00' in sample:
+        return 'binary'
+    control = len(sample) - len(sample.translate(None, _CONTROL_BYTES))
+    if control / len(sample) > 0.05:
+        return 'binary'
+    stripped = sample.strip()
+    if len(stripped) >= 256 and b' ' not in stripped and _BASE64_BYTES.fullmatch(stripped):
+        return 'base64'
+    lines = sample.count(b'\n') + 1
+    if len(sample) / lines > 1000:
+        return 'minified'
+    return 'text'
+
+
+class LargeFileReader:
+    # Reads inputs through mmap so a multi-GB file never has to sit in memory as one string.
+    # Windows are decoded one at a time, and non-prose content (binary, base64, minified) is
+    # skipped, sampled or decoded according to the configured policy.
+
+    DEFAULT_POLICY = {'binary': 'skip', 'base64': 'decode', 'minified': 'sample', 'text': 'process'}
+
+    def __init__(self, options: Dict = None):
+        # Options come from the 'large_file_options' config block.
+        options = options or {}
+        self.threshold_bytes = options.get('threshold_bytes', 16 * 1024 * 1024)
+        self.window_bytes = options.get('window_bytes', 1024 * 1024)
+        self.sample_bytes = options.get('sample_bytes', 64 * 1024)
+        self.sniff_bytes = options.get('sniff_bytes', 8192)
+        self.policy = {**self.DEFAULT_POLICY, **options.get('policy', {})}
+        self.encoding = options.get('encoding', 'utf-8')
+
+    def is_large(self, file_path: str) -> bool:
+        return os.path.getsize(file_path) >= self.threshold_bytes
+
+    def classify(self, file_path: str) -> str:
+        with open(file_path, 'rb') as f:
+            return classify_sample(f.read(self.sniff_bytes))
+
+    def apply_policy(self, content: bytes) -> Tuple[str, Optional[str]]:
+        # For content already in memory: returns (kind, text), with text None when it should be skipped.
+        kind = classify_sample(content[:self.sniff_bytes])
+        action = self.policy.get(kind, 'process')
+        if action == 'skip':
+            return kind, None
+        if action == 'sample':
+            return kind, self._decode(content[:self.sample_bytes])
+        if action == 'decode' and kind == 'base64':
+            try:
+                decoded = base64.b64decode(b''.join(content.split()), validate=False)
+            except (binascii.Error, ValueError):
+                return kind, None
+            # Only keep the payload if it is itself text; encoded images and archives are dropped.
+            decoded_kind = classify_sample(decoded[:self.sniff_bytes])
+            return kind, self._decode(decoded) if decoded_kind == 'text' else None
+        return kind, self._decode(content)
+
+    def iter_texts(self, file_path: str) -> Iterator[str]:
+        # The texts a large file contributes under the policy for its sniffed kind: nothing,
+        # one leading sample, its base64 payload decoded window by window, or its windows.
+        kind = self.classify(file_path)
+        action = self.policy.get(kind, 'process')
+        if action == 'skip':
+            return
+        if action == 'sample':
+            with open(file_path, 'rb') as f:
+                yield self._decode(f.read(self.sample_bytes))
+        elif action == 'decode' and kind == 'base64':
+            decoded = self._iter_base64_decoded(file_path)
+            first = next(decoded, b'')
+            if classify_sample(first[:self.sniff_bytes]) != 'text':
+                return
+            yield self._decode(first)
+            for chunk in decoded:
+                yield self._decode(chunk)
+        else:
+            yield from self.iter_windows(file_path)
+
+    def _iter_base64_decoded(self, file_path: str) -> Iterator[bytes]:
+        # Decodes in windows; characters past the last multiple of four carry into the next one.
+        carry = b''
+        with open(file_path, 'rb') as f, self._map(f) as view:
+            for start in range(0, len(view), self.window_bytes):
+                encoded = carry + b''.join(view[start:start + self.window_bytes].split())
+                usable = len(encoded) - len(encoded) % 4
+                carry = encoded[usable:]
+                try:
+                    yield base64.b64decode(encoded[:usable])
+                except (binascii.Error, ValueError):
+                    return
+
+    def iter_windows(self, file_path: str) -> Iterator[str]:
+        # Windows of at most window_bytes, cut at the last paragraph break (or newline) inside
+        # each window so that paragraphs are not split between records where avoidable.
+        with open(file_path, 'rb') as f, self._map(f) as view:
+            start, size = 0, len(view)
+            while start < size:
+                end = min(start + self.window_bytes, size)
+                if end < size:
+                    cut = view.rfind(_PARAGRAPH_BREAK, start, end)
+                    if cut <= start:
+                        cut = view.rfind(b'\n', start, end)
+                    end = cut + 1 if cut > start else end
+                yield self._decode(view[start:end])
+                start = end
+
+    @staticmethod
+    def _map(f) -> mmap.mmap:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap cannot map an empty file.
+            return _EmptyView()
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _decode(self, content: bytes) -> str:
+        return bytes(content).decode(self.encoding, errors='ignore')
+
+
+class _EmptyView(bytes):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
@@ -0,0 +1,147 @@
+from typing import Dict, IO, List, Optional, Tuple
+import hashlib
+import json
+import os
+
+from src.processing.output_writer import compression_for, open_output
+
+
+class FileManifest:
+    # Persistent map of input path -> (size, mtime, content hash, byte span in an output shard).
+    # The previous run's shards are kept alongside as '.prev' files while a new run is in
+    # progress so unchanged files can copy their records across instead of being re-enriched.
+    # Spans are offsets into the uncompressed shard, so compressed shards are read by seeking
+    # forward through the decompressed stream.
+
+    def __init__(self, manifest_path: str, output_file: str, hash_algorithm: str = 'sha256',
+                 window_bytes: int = 8 * 1024 * 1024):
+        self.manifest_path = manifest_path
+        self.output_file = output_file
+        self.hash_algorithm = hash_algorithm
+        self.window_bytes = window_bytes
+        self.previous: Dict[str, Dict] = {}
+        self.current: Dict[str, Dict] = {}
+        self.previous_outputs: List[str] = []
+        # Archives and large files are split into several records; their paths, by container.
+        self.parts: Dict[str, List[str]] = {}
+        self._previous_handles: Dict[int, IO[bytes]] = {}
+        # Per compressed shard: the offset and bytes of the last window_bytes decompressed.
+        self._windows: Dict[int, Tuple[int, bytearray]] = {}
+
+    def load(self) -> None:
+        outputs = [self.output_file]
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('hash_algorithm') == self.hash_algorithm:
+                self.previous = manifest.get('files', {})
+                outputs = manifest.get('outputs') or outputs
+        self.previous_outputs = [f"{path}.prev" for path in outputs]
+        for path, previous_output in zip(outputs, self.previous_outputs):
+            # If an interrupted run left a .prev file behind, that is still the last committed output.
+            if not os.path.exists(previous_output) and self.previous and os.path.exists(path):
+                os.replace(path, previous_output)
+        # Entries are only reusable if the shard they point into still exists.
+        self.previous = {
+            path: entry for path, entry in self.previous.items()
+            if entry.get('shard', 0) < len(self.previous_outputs) and os.path.exists(self.previous_outputs[entry.get('shard', 0)])
+        }
+        self.parts = {}
+        for path, entry in self.previous.items():
+            if entry.get('parent') is not None:
+                self.parts.setdefault(entry['parent'], []).append(path)
+
+    def hash_bytes(self, content: bytes) -> str:
+        return hashlib.new(self.hash_algorithm, content).hexdigest()
+
+    @staticmethod
+    def file_signature(file_path: str) -> Tuple[int, int]:
+        stat = os.stat(file_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def lookup_unchanged(self, file_path: str, signature: Tuple[int, int], content_hash: Optional[str] = None) -> Optional[Dict]:
+        # A size+mtime match is trusted without hashing; otherwise the content hash decides.
+        entry = self.previous.get(file_path)
+        if entry is None or entry['size'] != signature[0]:
+            return None
+        if entry['mtime_ns'] == signature[1] or (content_hash is not None and entry['hash'] == content_hash):
+            return entry
+        return None
+
+    def lookup_unchanged_parts(self, parent: str, signature: Tuple[int, int]) -> Optional[List[Tuple[str, Dict]]]:
+        # The records an archive or large file was split into last run, if it is unchanged. Parts
+        # carry their container's size and mtime but no content hash, so only those are compared.
+        paths = self.parts.get(parent)
+        if not paths:
+            return None
+        entries = [(path, self.previous[path]) for path in paths]
+        if any((entry['size'], entry['mtime_ns']) != tuple(signature) for _, entry in entries):
+            return None
+        return entries
+
+    def read_previous_records(self, entry: Dict) -> bytes:
+        shard = entry.get('shard', 0)
+        compression = compression_for(self.previous_outputs[shard][:-len('.prev')])
+        offset, length = entry['offset'], entry['length']
+        handle = self._previous_handles.get(shard)
+        if compression == 'none':
+            if handle is None:
+                handle = self._previous_handles[shard] = open_output(self.previous_outputs[shard], 'rb', compression)
+            handle.seek(offset)
+            return handle.read(length)
+        # Decompressing streams only read forward, and rewinding means decompressing the shard
+        # again from the start. Reused spans arrive close to, but not exactly in, shard order
+        # (several serialize workers), so the last window_bytes decompressed stay in memory and
+        # a read that steps back into them is served from there.
+        start, window = self._windows.get(shard, (0, bytearray()))
+        if handle is None or offset < start:
+            if handle is not None:
+                handle.close()
+            handle = self._previous_handles[shard] = open_output(self.previous_outputs[shard], 'rb', compression)
+            start, window = 0, bytearray()
+        end = start + len(window)
+        if offset + length > end:
+            if offset - self.window_bytes > end:
+                # Only the last window_bytes of a long gap are kept.
+                start, window = offset - self.window_bytes, bytearray()
+                handle.seek(start)
+                end = start
+            window += handle.read(offset + length - end)
+        record = bytes(window[offset - start:offset + length - start])
+        if len(window) > self.window_bytes:
+            excess = len(window) - self.window_bytes
+            del window[:excess]
+            start += excess
+        self._windows[shard] = (start, window)
+        return record
+
+    def record(self, file_path: str, signature: Tuple[int, int], content_hash: Optional[str], offset: int, length: int,
+               shard: int = 0, parent: Optional[str] = None) -> None:
+        self.current[file_path] = {
+            'size': signature[0],
+            'mtime_ns': signature[1],
+            'hash': content_hash,
+            'shard': shard,
+            'offset': offset,
+            'length': length,
+        }
+        if parent is not None:
+            self.current[file_path]['parent'] = parent
+
+    def commit(self, outputs: Optional[List[str]] = None) -> None:
+        # Files absent from this run are dropped simply by not carrying their entries over.
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'hash_algorithm': self.hash_algorithm, 'output_file': self.output_file,
+                       'outputs': outputs or [self.output_file], 'files': self.current}, f)
+        os.replace(temp_path, self.manifest_path)
+        self.close()
+        for previous_output in self.previous_outputs:
+            if os.path.exists(previous_output):
+                os.remove(previous_output)
+
+    def close(self) -> None:
+        for handle in self._previous_handles.values():
+            handle.close()
+        self._previous_handles = {}
+        self._windows = {}
@@ -1,85 +1,224 @@
+import functools
 import os
 import re
 import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from bs4 import BeautifulSoup
 from datetime import timezone
-from typing import Dict, List
-from utils import ConfigManager, LoggerService, ModelManager
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from src.utils import ConfigManager, LoggerService, ModelManager
 
-class ContentHarvester:
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
 
-    def __init__(self, config: Dict = None):
-        self.config_manager = ConfigManager()
-        self.config = config if config is not None else asyncio.run(self.config_manager.load_config())
+_HTML_EXTENSIONS = {'.html', '.htm', '.xhtml'}
+_MARKDOWN_EXTENSIONS = {'.md', '.markdown', '.mdx'}
+_HTML_SNIFF = re.compile(r'<(?:!doctype\s+html|html|head|body|title|meta|h[1-6])[\s>/]', re.IGNORECASE)
+_BASE64_SNIFF = re.compile(r'[A-Za-z0-9+/=\r\n]+')
+_HTML_STRAINER = None
+# Code fences and Markdown headings in one left-to-right pass.
+_TEXT_SCAN = re.compile(r'```(?P<code>.*?)```|^#{1,6}[ \t]+(?P<heading>[^\n]*)', re.DOTALL | re.MULTILINE)
+# [references] get their own pass: they may sit on heading lines and inside code fences.
+_REFERENCES = re.compile(r'\[([^\]\n]*)\]')
+
+def _html_strainer():
+    # Only the elements metadata needs are materialised when parsing HTML.
+    global _HTML_STRAINER
+    if _HTML_STRAINER is None:
+        from bs4 import SoupStrainer
+        _HTML_STRAINER = SoupStrainer(['title', 'meta', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+    return _HTML_STRAINER
+
+def detect_format(file_path: str, file_text: str, sniff_length: int = 4096) -> str:
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in _HTML_EXTENSIONS:
+        return 'html'
+    head = file_text[:sniff_length]
+    if '\x00' in head:
+        return 'binary'
+    stripped = head.strip()
+    if len(stripped) >= 256 and ' ' not in stripped and _BASE64_SNIFF.fullmatch(stripped):
+        return 'binary'
+    if extension in _MARKDOWN_EXTENSIONS:
+        return 'markdown'
+    if _HTML_SNIFF.search(head):
+        return 'html'
+    return 'text'
+
+def scan_text(file_text: str) -> Tuple[List[str], List[str], List[str]]:
+    code_examples, headings = [], []
+    for match in _TEXT_SCAN.finditer(file_text):
+        if match.lastgroup == 'code':
+            code_examples.append(match.group('code'))
+        else:
+            headings.append(match.group('heading').strip())
+    return code_examples, headings, [ref.strip() for ref in _REFERENCES.findall(file_text)]
+
+
+class MetadataParser:
+    # Synchronous, CPU-bound half of ContentHarvester. Holds no logger or event loop state
+    # so it can run inline or inside a process-pool worker and return a plain dict.
+
+    def __init__(self, config: Dict, model_manager: Optional[ModelManager] = None):
+        self.config = config
         self.custom_tags = self.config.get('custom_tags', [])
         self.base_url = self.config.get('base_url', 'http://127.0.0.1:8000/')
-        self.logger = LoggerService.get_instance("MetadataExtractorLogger")
-        self.model_manager = ModelManager(self.logger)
-        
-    async def extract_metadata(self, file_path: str, file_text: str, summary: str = "") -> Dict:
+        self.model_manager = model_manager or ModelManager(None)
+        metadata_options = self.config.get('metadata_options', {})
+        self.fast_path = metadata_options.get('fast_path', True)
+        self.custom_metadata = self.config.get('custom_metadata', {})
+        # A keyword's link is the same in every record, so each is built once and shared.
+        self.external_link = functools.lru_cache(maxsize=metadata_options.get('link_cache_size', 65536))(self._external_link)
+        self.publication_day, self.publication_date = None, None
+
+    def parse(self, file_path: str, file_text: str, summary: str = "") -> Dict:
+        if not self.fast_path:
+            return self.parse_full(file_path, file_text, summary)
+        content_format = detect_format(file_path, file_text)
+        title, description, keywords, sections = None, "", [], []
+        code_examples, references = [], []
+        if content_format == 'html':
+            from bs4 import BeautifulSoup
+            soup = BeautifulSoup(file_text, 'html.parser', parse_only=_html_strainer())
+            title = self.extract_title(soup)
+            description = self.extract_description(soup)
+            keywords = self.extract_keywords(soup)
+            sections = self.identify_sections(soup)
+        if content_format != 'binary':
+            code_examples, headings, references = scan_text(file_text)
+            # '#' lines are only headings in Markdown; in code and plain text they are comments.
+            sections = headings if content_format == 'markdown' else sections
+        return self._build_metadata(file_path, file_text, summary, title, description, keywords, sections,
+                                    code_examples, references, content_format)
+
+    def parse_full(self, file_path: str, file_text: str, summary: str = "") -> Dict:
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(file_text, 'html.parser')
-        title = await self.extract_title(soup) or os.path.basename(file_path)
-        description = summary or await self.extract_description(soup) or ""
-        keywords = await self.extract_keywords(soup) or []
-        sections = await self.identify_sections(soup) or []
-        code_examples = await self.check_for_code_examples(file_text)
-        content_type = await self.determine_content_type(file_text) or "unknown"
-        publication_date = datetime.now(timezone.utc).strftime('%Y-%m-%d')
-        tags = self.custom_tags
-        in_text_references = await self.extract_in_text_references(file_text) or []
-        external_links = await self.generate_external_links(keywords) or []
+        return self._build_metadata(file_path, file_text, summary, self.extract_title(soup), self.extract_description(soup),
+                                    self.extract_keywords(soup), self.identify_sections(soup),
+                                    self.check_for_code_examples(file_text), self.extract_in_text_references(file_text),
+                                    detect_format(file_path, file_text))
 
+    def _build_metadata(self, file_path: str, file_text: str, summary: str, title: Optional[str], description: str,
+                        keywords: List[str], sections: List[str], code_examples: List[str], references: List[str],
+                        content_format: str) -> Dict:
+        keywords = keywords or []
         metadata = {
-            'title': title,
-            'description': description,
+            'title': title or os.path.basename(file_path),
+            'description': summary or description or "",
             'keywords': keywords,
-            'sections': sections,
+            'sections': sections or [],
             'code_examples': code_examples,
-            'content_type': content_type,
-            'publication_date': publication_date,
-            'tags': tags,
-            'in_text_references': in_text_references,
-            'external_links': external_links
+            'content_type': self.determine_content_type(file_text) or "unknown",
+            'content_format': content_format,
+            'publication_date': self.today(),
+            'tags': self.custom_tags,
+            'in_text_references': references or [],
+            'external_links': self.generate_external_links(keywords) or []
         }
-        await self.apply_custom_metadata(metadata)
+        metadata.update(self.custom_metadata)
         return metadata
-    
-    async def extract_title(self, soup: BeautifulSoup) -> str:
+
+    def today(self) -> str:
+        # The UTC date string is shared by every record of the same day.
+        day = int(time.time() // 86400)
+        if day != self.publication_day:
+            self.publication_day, self.publication_date = day, datetime.fromtimestamp(day * 86400, timezone.utc).strftime('%Y-%m-%d')
+        return self.publication_date
+
+    def extract_title(self, soup: 'BeautifulSoup') -> str:
         title_tag = soup.find('title')
         return title_tag.get_text() if title_tag else None
 
-    async def extract_keywords(self, soup: BeautifulSoup) -> List[str]:
+    def extract_keywords(self, soup: 'BeautifulSoup') -> List[str]:
         keywords_meta = soup.find('meta', attrs={'name': 'keywords'})
         return [keyword.strip() for keyword in keywords_meta['content'].split(',')] if keywords_meta else []
 
-    async def identify_sections(self, soup: BeautifulSoup) -> List[str]:
+    def identify_sections(self, soup: 'BeautifulSoup') -> List[str]:
         return [header.get_text() for header in soup.find_all(re.compile('^h[1-6]$'))]
 
-    async def extract_in_text_references(self, file_text: str) -> List[str]:
+    def extract_in_text_references(self, file_text: str) -> List[str]:
         return [ref.strip() for ref in re.findall(r'\[(.*?)\]', file_text)]
 
-    async def generate_external_links(self, keywords: List[str]) -> List[str]:
+    def generate_external_links(self, keywords: List[str]) -> List[str]:
         if not self.base_url:
-            await self.logger.log("error", "base_url is required in the configuration.")
             raise ValueError("base_url is required in the configuration.")
-        return [f"{self.base_url}{keyword.replace(' ', '-').lower()}" for keyword in keywords]
+        return [self.external_link(keyword) for keyword in keywords]
 
-    async def apply_custom_metadata(self, metadata: Dict) -> None:
-        custom_metadata = self.config.get('custom_metadata', {})
-        metadata.update(custom_metadata)
+    def _external_link(self, keyword: str) -> str:
+        return f"{self.base_url}{keyword.replace(' ', '-').lower()}"
 
-    async def extract_description(self, soup: BeautifulSoup) -> str:
+    def extract_description(self, soup: 'BeautifulSoup') -> str:
         description_meta = soup.find('meta', attrs={'name': 'description'})
         return description_meta['content'] if description_meta else ""
-    
-    async def check_for_code_examples(self, file_text: str) -> List[str]:
+
+    def check_for_code_examples(self, file_text: str) -> List[str]:
         return list(re.findall(r'```(.*?)```', file_text, re.DOTALL))
 
-    async def determine_content_type(self, file_text: str) -> str:
-        content_type = "unknown"  # Default to unknown
+    def determine_content_type(self, file_text: str) -> str:
         try:
-            content_type = self.model_manager.determine_content_type(file_text)
-        except Exception as e:
-            await self.logger.log("error", f"Failed to determine content type: {e}")
-        return content_type
+            return self.model_manager.determine_content_type(file_text)
+        except Exception:
+            return "unknown"
+
+
+_worker_parser: Optional[MetadataParser] = None
+
+def _init_metadata_worker(config: Dict) -> None:
+    global _worker_parser
+    _worker_parser = MetadataParser(config)
+
+def _parse_in_worker(file_path: str, file_text: str, summary: str) -> Dict:
+    return _worker_parser.parse(file_path, file_text, summary)
+
+
+class ContentHarvester:
+
+    def __init__(self, config: Dict = None):
+        self.config_manager = ConfigManager()
+        self.config = config if config is not None else asyncio.run(self.config_manager.load_config())
+        self.custom_tags = self.config.get('custom_tags', [])
+        self.base_url = self.config.get('base_url', 'http://127.0.0.1:8000/')
+        self.logger = LoggerService.get_instance("MetadataExtractorLogger")
+        self.model_manager = ModelManager(self.logger)
+        self.parser = MetadataParser(self.config, self.model_manager)
+        metadata_options = self.config.get('metadata_options', {})
+        # 'inline' parses on the event loop, 'process' hands each file to a ProcessPoolExecutor.
+        self.executor_mode = metadata_options.get('executor', 'inline')
+        self.max_workers = metadata_options.get('max_workers') or os.cpu_count()
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+    async def extract_metadata(self, file_path: str, file_text: str, summary: str = "") -> Dict:
+        if not self.base_url:
+            await self.logger.log("error", "base_url is required in the configuration.")
+        if self.executor_mode == 'process':
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), _parse_in_worker, file_path, file_text, summary)
+        return self.parser.parse(file_path, file_text, summary)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_metadata_worker,
+                initargs=(self.config,),
+            )
+        return self.executor
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    async def generate_summary(self, file_text: str, max_length: int = 280) -> str:
+        # Walks paragraph breaks with find() so a large file is not split into a full list.
+        start = 0
+        while start < len(file_text):
+            end = file_text.find('\n\n', start)
+            end = len(file_text) if end == -1 else end
+            paragraph = file_text[start:end].strip()
+            if paragraph:
+                return paragraph[:max_length]
+            start = end + 2
+        return ""
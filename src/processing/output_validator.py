@@ -0,0 +1,283 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterable, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+
+from src.processing.output_writer import compression_for, open_output, read_index
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Declared shape of an enrichment record. Types are JSON type names so a schema can also be
+# supplied through validation_options.schema; nested 'fields' are checked when the parent is present.
+RECORD_SCHEMA: Dict[str, Dict[str, Any]] = {
+    'file_path': {'type': 'string', 'required': True},
+    'metadata': {'type': 'object', 'fields': {
+        'title': {'type': 'string'},
+        'description': {'type': 'string'},
+        'keywords': {'type': 'array', 'items': 'string'},
+        'sections': {'type': 'array'},
+        'code_examples': {'type': 'array'},
+        'content_type': {'type': 'string'},
+        'content_format': {'type': 'string'},
+        'publication_date': {'type': 'string'},
+        'tags': {'type': 'array'},
+        'in_text_references': {'type': 'array'},
+        'external_links': {'type': 'array'},
+    }},
+    'context': {'type': 'object', 'fields': {
+        'surrounding_text': {'type': 'array', 'items': 'string'},
+        'section_headers': {'type': 'array', 'items': 'string'},
+        'named_entities': {'type': 'array', 'items': 'string'},
+        'sentiment_score': {'type': 'number'},
+        'code_examples': {'type': 'boolean'},
+        'content_type': {'type': 'string'},
+    }},
+    'external_data': {'type': 'object'},
+    'internal_data': {'type': 'object'},
+    'structured': {'type': 'object', 'fields': {
+        'format': {'type': 'string'},
+        'entities': {'type': 'array', 'items': 'object'},
+    }},
+    'samples': {'type': 'array', 'items': 'object'},
+}
+
+_JSON_TYPES = {
+    'string': (str,),
+    'integer': (int,),
+    'number': (float,),
+    'boolean': (bool,),
+    'array': (list,),
+    'object': (dict,),
+    'null': (type(None),),
+}
+
+
+def json_type(value: Any) -> str:
+    # bool is an int subclass in Python but never a JSON number.
+    if isinstance(value, bool):
+        return 'boolean'
+    for name, types in _JSON_TYPES.items():
+        if isinstance(value, types):
+            return name
+    return 'unknown'
+
+
+def check_record(record: Any, schema: Dict[str, Dict[str, Any]], prefix: str = '') -> List[str]:
+    if not isinstance(record, dict):
+        return [f"{prefix or 'record'}: expected object, got {json_type(record)}"]
+    problems = []
+    for field, spec in schema.items():
+        name = prefix + field
+        if field not in record:
+            if spec.get('required'):
+                problems.append(f"{name}: missing required field")
+            continue
+        value = record[field]
+        actual = json_type(value)
+        expected = spec['type']
+        if actual != expected and not (expected == 'number' and actual == 'integer'):
+            problems.append(f"{name}: expected {expected}, got {actual}")
+            continue
+        if 'items' in spec and any(json_type(item) != spec['items'] for item in value):
+            problems.append(f"{name}: expected array of {spec['items']}")
+        if 'fields' in spec:
+            problems.extend(check_record(value, spec['fields'], f"{name}."))
+    return problems
+
+
+def _update_field_stats(stats: Dict[str, Dict[str, Any]], record: Dict[str, Any], schema: Dict[str, Dict[str, Any]],
+                        prefix: str = '') -> None:
+    # Presence, type counts and sizes per field. Only objects whose schema declares 'fields' are
+    # descended into: free-form objects such as external_data are keyed by corpus vocabulary,
+    # and a stat per key would grow with the output.
+    for field, value in record.items():
+        name = prefix + field
+        entry = stats.get(name)
+        if entry is None:
+            entry = stats[name] = {'present': 0, 'types': {}, 'min': None, 'max': None, 'total': 0}
+        entry['present'] += 1
+        kind = json_type(value)
+        entry['types'][kind] = entry['types'].get(kind, 0) + 1
+        size = len(value) if kind in ('string', 'array', 'object') else value if kind in ('number', 'integer') else None
+        if size is not None:
+            entry['min'] = size if entry['min'] is None else min(entry['min'], size)
+            entry['max'] = size if entry['max'] is None else max(entry['max'], size)
+            entry['total'] += size
+        spec = schema.get(field)
+        if kind == 'object' and spec is not None and 'fields' in spec:
+            _update_field_stats(stats, value, spec['fields'], f"{name}.")
+
+
+def _merge_field_stats(into: Dict[str, Dict[str, Any]], stats: Dict[str, Dict[str, Any]]) -> None:
+    for name, entry in stats.items():
+        target = into.get(name)
+        if target is None:
+            into[name] = entry
+            continue
+        target['present'] += entry['present']
+        target['total'] += entry['total']
+        for kind, count in entry['types'].items():
+            target['types'][kind] = target['types'].get(kind, 0) + count
+        for bound, pick in (('min', min), ('max', max)):
+            if entry[bound] is not None:
+                target[bound] = entry[bound] if target[bound] is None else pick(target[bound], entry[bound])
+
+
+def validate_range(path: str, start: int, end: Optional[int], schema: Dict, id_field: Optional[str], max_errors: int) -> Dict[str, Any]:
+    # Validates the lines that begin inside [start, end) of one file; end None means to EOF.
+    # Line numbers are relative to the range and are offset by the caller.
+    records = invalid = lines = 0
+    errors: List[Tuple[int, str]] = []
+    stats: Dict[str, Dict[str, Any]] = {}
+    id_digests, id_lines = array('Q'), array('Q')
+    with open_output(path, 'rb') as f:
+        position = start
+        if start > 0:
+            f.seek(start - 1)
+            position += len(f.readline()) - 1
+        for line in f:
+            if end is not None and position >= end:
+                break
+            position += len(line)
+            lines += 1
+            if not line.strip():
+                continue
+            records += 1
+            try:
+                record = _loads(line)
+            except ValueError as e:
+                problems = [f"invalid JSON: {e}"]
+                record = None
+            else:
+                problems = check_record(record, schema)
+            if problems:
+                invalid += 1
+                if len(errors) < max_errors:
+                    errors.append((lines, '; '.join(problems)))
+            if isinstance(record, dict):
+                _update_field_stats(stats, record, schema)
+                if id_field and isinstance(record.get(id_field), str):
+                    digest = hashlib.blake2b(record[id_field].encode('utf-8'), digest_size=8).digest()
+                    id_digests.append(int.from_bytes(digest, 'little'))
+                    id_lines.append(lines)
+    return {'path': path, 'start': start, 'lines': lines, 'records': records, 'invalid': invalid,
+            'errors': errors, 'fields': stats, 'id_digests': id_digests, 'id_lines': id_lines}
+
+
+class OutputValidator:
+    # Streams JSONL output, plain or compressed, a single file or the shards named in its index,
+    # and validates every record against RECORD_SCHEMA in worker processes. Uncompressed files
+    # are split into newline-aligned byte ranges so one large file also validates in parallel.
+
+    def __init__(self, options: Dict = None):
+        # Options come from the 'validation_options' config block.
+        options = options or {}
+        self.schema = options.get('schema', RECORD_SCHEMA)
+        self.id_field = options.get('id_field', 'file_path')
+        self.workers = options.get('workers') or os.cpu_count() or 1
+        self.range_bytes = options.get('range_bytes', 256 * 1024 * 1024)
+        self.max_errors = options.get('max_errors', 100)
+        self.max_duplicates = options.get('max_duplicates', 100)
+
+    def plan(self, paths: List[str]) -> List[Tuple[str, int, Optional[int]]]:
+        ranges = []
+        for path in paths:
+            size = os.path.getsize(path)
+            if compression_for(path) != 'none' or size <= self.range_bytes:
+                ranges.append((path, 0, None))
+                continue
+            starts = list(range(0, size, self.range_bytes))
+            ranges.extend((path, begin, begin + self.range_bytes if begin + self.range_bytes < size else None) for begin in starts)
+        return ranges
+
+    async def validate(self, output_file: str, index_file: Optional[str] = None) -> Dict[str, Any]:
+        paths = read_index(output_file, index_file)
+        missing = [path for path in paths if not os.path.exists(path)]
+        if missing:
+            return {'valid': False, 'files': paths, 'records': 0, 'invalid_records': 0,
+                    'errors': [{'file': path, 'line': None, 'error': 'file does not exist'} for path in missing],
+                    'duplicate_ids': 0, 'duplicates': [], 'fields': {}}
+        ranges = self.plan(paths)
+        loop = asyncio.get_running_loop()
+        if len(ranges) == 1 or self.workers == 1:
+            results = [validate_range(path, start, end, self.schema, self.id_field, self.max_errors) for path, start, end in ranges]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(ranges))) as executor:
+                results = await asyncio.gather(*(
+                    loop.run_in_executor(executor, validate_range, path, start, end, self.schema, self.id_field, self.max_errors)
+                    for path, start, end in ranges
+                ))
+        return self._merge(paths, results)
+
+    async def validate_stream(self, paths: AsyncIterable[str]) -> Dict[str, Any]:
+        # Validates shards as they are produced: each one is submitted as soon as it arrives, so
+        # validation overlaps with the run writing the later shards.
+        loop = asyncio.get_running_loop()
+        seen, pending = [], []
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            async for path in paths:
+                seen.append(path)
+                pending.extend(
+                    loop.run_in_executor(executor, validate_range, range_path, start, end, self.schema, self.id_field, self.max_errors)
+                    for range_path, start, end in self.plan([path])
+                )
+            results = await asyncio.gather(*pending)
+        return self._merge(seen, results)
+
+    def _merge(self, paths: List[str], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        report = {'files': paths, 'records': 0, 'invalid_records': 0, 'errors': [], 'duplicate_ids': 0, 'duplicates': [], 'fields': {}}
+        seen: Dict[int, Tuple[str, int]] = {}
+        line_offset, current_path = 0, None
+        # Ranges arrive in file order, so a running line count turns range-relative numbers into file line numbers.
+        for result in results:
+            if result['path'] != current_path:
+                current_path, line_offset = result['path'], 0
+            report['records'] += result['records']
+            report['invalid_records'] += result['invalid']
+            for line, error in result['errors']:
+                if len(report['errors']) < self.max_errors:
+                    report['errors'].append({'file': result['path'], 'line': line + line_offset, 'error': error})
+            for digest, line in zip(result['id_digests'], result['id_lines']):
+                location = (result['path'], line + line_offset)
+                first = seen.setdefault(digest, location)
+                if first is location:
+                    continue
+                report['duplicate_ids'] += 1
+                if len(report['duplicates']) < self.max_duplicates:
+                    report['duplicates'].append({'first': {'file': first[0], 'line': first[1]},
+                                                 'duplicate': {'file': location[0], 'line': location[1]}})
+            _merge_field_stats(report['fields'], result['fields'])
+            line_offset += result['lines']
+        report['valid'] = report['invalid_records'] == 0 and report['duplicate_ids'] == 0 and report['records'] > 0
+        return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Validate enrichment output (JSONL, gzip/zstd, or sharded via its index)")
+    parser.add_argument('output_file')
+    parser.add_argument('--index-file')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--report', help='Write the full report as JSON to this path')
+    args = parser.parse_args(argv)
+    report = asyncio.run(OutputValidator({'workers': args.workers}).validate(args.output_file, args.index_file))
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    print(f"{report['records']} records in {len(report['files'])} file(s): {report['invalid_records']} invalid, "
+          f"{report['duplicate_ids']} duplicate ids")
+    for error in report['errors'][:20]:
+        print(f"  {error['file']}:{error['line']}: {error['error']}")
+    return 0 if report['valid'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,310 @@
+from typing import Any, Callable, Dict, IO, List, Optional, Tuple, Union
+import asyncio
+import gzip
+import json
+import os
+
+COMPRESSION_SUFFIXES = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def fast_dumps(record: Dict[str, Any]) -> str:
+    # orjson is several times faster than json.dumps on enrichment records; both fall back to
+    # str() for values JSON has no type for (datetimes, paths).
+    if orjson is not None:
+        return orjson.dumps(record, default=str).decode('utf-8')
+    return json.dumps(record, default=str, ensure_ascii=False)
+
+
+def fast_dumpb(record: Dict[str, Any]) -> bytes:
+    # One encoded output line, newline included, that goes into the writer's buffer as is,
+    # skipping the str round trip of fast_dumps.
+    if orjson is not None:
+        return orjson.dumps(record, default=str, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(record, default=str, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def compression_for(path: str) -> str:
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if suffix and path.endswith(suffix):
+            return compression
+    return 'none'
+
+
+def open_output(path: str, mode: str = 'rb', compression: Optional[str] = None, level: Optional[int] = None) -> IO[bytes]:
+    # Binary stream over a plain, gzip or zstd file; the compression is inferred from the suffix by default.
+    compression = compression or compression_for(path)
+    if compression == 'gzip':
+        return gzip.open(path, mode, compresslevel=level if level is not None else 6)
+    if compression == 'zstd':
+        import zstandard
+        if 'w' in mode:
+            return zstandard.open(path, mode, cctx=zstandard.ZstdCompressor(level=level if level is not None else 3))
+        return zstandard.open(path, mode)
+    return open(path, mode)
+
+
+def flatten_metadata(record: Dict[str, Any]) -> Dict[str, Any]:
+    # One row per record for the columnar output: scalar and list-of-string metadata fields,
+    # plus the scalar context fields, under 'metadata.' / 'context.' prefixes.
+    row = {'file_path': record.get('file_path')}
+    for section in ('metadata', 'context'):
+        for key, value in (record.get(section) or {}).items():
+            if isinstance(value, (str, int, float, bool)) or value is None:
+                row[f"{section}.{key}"] = value
+            elif isinstance(value, list) and all(isinstance(item, str) for item in value):
+                row[f"{section}.{key}"] = value
+    return row
+
+
+class ParquetMetadataWriter:
+    # Writes flatten_metadata rows to a Parquet file in row groups. The schema is fixed by the
+    # first row group; later rows missing a column get nulls and unknown columns are dropped.
+
+    def __init__(self, path: str, row_group_size: int = 10000):
+        import pyarrow
+        import pyarrow.parquet
+        self.pyarrow = pyarrow
+        self.parquet = pyarrow.parquet
+        self.path = path
+        self.temp_path = f"{path}.tmp"
+        self.row_group_size = max(1, row_group_size)
+        self.rows: List[Dict[str, Any]] = []
+        self.schema = None
+        self.writer = None
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.rows.append(flatten_metadata(record))
+        if len(self.rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.rows:
+            return
+        table = self.pyarrow.Table.from_pylist(self.rows, schema=self.schema)
+        if self.writer is None:
+            self.schema = table.schema
+            self.writer = self.parquet.ParquetWriter(self.temp_path, self.schema)
+        self.writer.write_table(table)
+        self.rows = []
+
+    def close(self) -> None:
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            os.replace(self.temp_path, self.path)
+
+    def abort(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+class ShardedOutputWriter:
+    # Streams serialized JSON lines into rolling shards. A shard is written under '<name>.tmp'
+    # and renamed into place when it rolls or the run commits, so readers never see a partial
+    # shard. An index listing every shard is written last, also atomically; shards left over
+    # from an earlier, larger run are removed at commit. With a ProgressJournal, every buffer
+    # flush is fsynced and journaled, and restore() picks up an interrupted run where its
+    # journal ends.
+
+    def __init__(self, output_file: str, options: Dict = None, journal=None):
+        # Options come from the 'output_options' config block.
+        options = options or {}
+        self.output_file = output_file
+        self.shard_max_bytes = options.get('shard_max_bytes', 0)
+        self.shard_max_records = options.get('shard_max_records', 0)
+        self.compression = options.get('compression', 'none')
+        if self.compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unsupported output compression: {self.compression}")
+        self.compression_level = options.get('compression_level')
+        self.buffer_bytes = options.get('buffer_bytes', 1024 * 1024)
+        self.index_file = options.get('index_file') or f"{output_file}.index.json"
+        self.sharded = bool(self.shard_max_bytes or self.shard_max_records)
+        self.shards: List[Dict[str, Any]] = []
+        self.handle: Optional[IO[bytes]] = None
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        self.records = 0
+        self.journal = journal
+        # Called with each shard path once it is final; runs on the writer's worker thread.
+        self.on_shard: Optional[Callable[[str], None]] = None
+
+    def shard_path(self, index: int) -> str:
+        if not self.sharded:
+            return self.output_file + COMPRESSION_SUFFIXES[self.compression]
+        stem, extension = os.path.splitext(self.output_file)
+        return f"{stem}-{index:05d}{extension or '.jsonl'}{COMPRESSION_SUFFIXES[self.compression]}"
+
+    async def write(self, line: Union[str, bytes], file_path: Optional[str] = None, extra: Optional[Dict[str, Any]] = None) -> Tuple[int, int, int]:
+        # Returns (shard index, offset, length) of the line within the uncompressed shard.
+        # file_path and extra are journaled with the location once the line is flushed.
+        data = line if isinstance(line, bytes) else line.encode('utf-8')
+        if self.handle is None or self._shard_full(len(data)):
+            await asyncio.to_thread(self._roll)
+        shard = self.shards[-1]
+        location = (len(self.shards) - 1, shard['bytes'], len(data))
+        if self.journal is not None:
+            self.journal.add(file_path, *location, extra)
+        shard['bytes'] += len(data)
+        shard['records'] += 1
+        self.records += 1
+        self.buffer.append(data)
+        self.buffered += len(data)
+        if self.buffered >= self.buffer_bytes:
+            await asyncio.to_thread(self._flush_buffer)
+        return location
+
+    def _shard_full(self, incoming: int) -> bool:
+        shard = self.shards[-1]
+        if self.shard_max_records and shard['records'] >= self.shard_max_records:
+            return True
+        return bool(self.shard_max_bytes) and shard['records'] > 0 and shard['bytes'] + incoming > self.shard_max_bytes
+
+    def _roll(self) -> None:
+        self._finish_shard()
+        path = self.shard_path(len(self.shards))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.handle = open_output(f"{path}.tmp", 'wb', self.compression, self.compression_level)
+        self.shards.append({'path': path, 'records': 0, 'bytes': 0})
+
+    def _flush_buffer(self) -> None:
+        if self.buffer:
+            self.handle.write(b''.join(self.buffer))
+            self.buffer = []
+            self.buffered = 0
+            if self.journal is not None:
+                # The shard bytes must be durable before the journal says they are.
+                self.handle.flush()
+                if self.journal.fsync:
+                    os.fsync(self.handle.fileno())
+                shard = self.shards[-1]
+                self.journal.flushed(len(self.shards) - 1, shard['path'], shard['bytes'], shard['records'])
+
+    def _finish_shard(self) -> None:
+        if self.handle is None:
+            return
+        self._flush_buffer()
+        self.handle.close()
+        self.handle = None
+        shard = self.shards[-1]
+        os.replace(f"{shard['path']}.tmp", shard['path'])
+        shard['stored_bytes'] = os.path.getsize(shard['path'])
+        if self.journal is not None:
+            self.journal.closed(len(self.shards) - 1, shard['path'], shard['bytes'], shard['records'])
+        if self.on_shard is not None:
+            self.on_shard(shard['path'])
+
+    async def commit(self) -> List[str]:
+        await asyncio.to_thread(self._commit)
+        return [shard['path'] for shard in self.shards]
+
+    def _commit(self) -> None:
+        if self.handle is None and not self.shards:
+            # An empty run still produces one (empty) shard so readers find a valid output.
+            self._roll()
+        self._finish_shard()
+        previous = self._read_index()
+        index = {
+            'compression': self.compression,
+            'records': self.records,
+            'shards': [{**shard, 'path': os.path.basename(shard['path'])} for shard in self.shards],
+        }
+        temp_path = f"{self.index_file}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        os.replace(temp_path, self.index_file)
+        current = {os.path.basename(shard['path']) for shard in self.shards}
+        directory = os.path.dirname(os.path.abspath(self.index_file))
+        for shard in previous.get('shards', []):
+            stale = os.path.join(directory, shard['path'])
+            if shard['path'] not in current and os.path.exists(stale):
+                os.remove(stale)
+
+    def _read_index(self) -> Dict[str, Any]:
+        try:
+            with open(self.index_file, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def abort(self) -> None:
+        # Drops the in-progress shard; shards already renamed into place are left for the next run.
+        # A journaled shard is flushed and kept instead, so a resumed run can continue from it.
+        if self.handle is not None:
+            if self.journal is not None:
+                try:
+                    self._flush_buffer()
+                finally:
+                    self.handle.close()
+                    self.handle = None
+                return
+            self.handle.close()
+            self.handle = None
+            temp_path = f"{self.shards[-1]['path']}.tmp"
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    async def restore(self) -> None:
+        await asyncio.to_thread(self._restore)
+
+    def _restore(self) -> None:
+        # Rebuilds the shard list from the journal and cuts every shard back to its last journaled
+        # flush, dropping partial trailing records. Plain shards are truncated in place; compressed
+        # streams cannot be cut, so their journaled prefix is recompressed into a new file.
+        last = max(self.journal.shards, default=None)
+        for index, state in sorted(self.journal.shards.items()):
+            path = self.shard_path(index)
+            if path != state['path']:
+                raise ValueError(f"Cannot resume {self.output_file}: output options changed since the interrupted run")
+            self.shards.append({'path': path, 'records': state['records'], 'bytes': state['bytes']})
+            self.records += state['records']
+            if state['closed'] and (index != last or self.sharded):
+                self.shards[-1]['stored_bytes'] = os.path.getsize(path)
+                if self.on_shard is not None:
+                    self.on_shard(path)
+                continue
+            source = path if os.path.exists(path) else f"{path}.tmp"
+            if self.compression == 'none':
+                os.replace(source, f"{path}.tmp")
+                os.truncate(f"{path}.tmp", state['bytes'])
+                self.handle = open(f"{path}.tmp", 'ab')
+            else:
+                self.handle = self._recompress(source, path, state['bytes'])
+            if index != last:
+                self._finish_shard()
+
+    def _recompress(self, source: str, path: str, size: int) -> IO[bytes]:
+        restoring = f"{path}.restoring"
+        handle = open_output(restoring, 'wb', self.compression, self.compression_level)
+        remaining = size
+        with open_output(source, 'rb', self.compression) as f:
+            while remaining:
+                chunk = f.read(min(remaining, self.buffer_bytes))
+                if not chunk:
+                    raise ValueError(f"Cannot resume {self.output_file}: {source} is shorter than its journal")
+                handle.write(chunk)
+                remaining -= len(chunk)
+        handle.flush()
+        os.fsync(handle.fileno())
+        # The copy replaces the source only once complete, so a crash here loses nothing.
+        os.replace(restoring, f"{path}.tmp")
+        if source != f"{path}.tmp" and os.path.exists(source):
+            os.remove(source)
+        return handle
+
+
+def read_index(output_file: str, index_file: Optional[str] = None) -> List[str]:
+    # Absolute shard paths for an output, from its index if one exists, else the file itself.
+    index_file = index_file or f"{output_file}.index.json"
+    if not os.path.exists(index_file):
+        return [output_file]
+    with open(index_file, encoding='utf-8') as f:
+        index = json.load(f)
+    directory = os.path.dirname(os.path.abspath(index_file))
+    return [os.path.join(directory, shard['path']) for shard in index.get('shards', [])]
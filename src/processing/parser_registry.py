@@ -0,0 +1,132 @@
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import importlib
+import os
+import re
+
+from src.telemetry import Telemetry
+
+# One leading run of whitespace or one comment, skipped before sniffing a file's first
+# declaration. It is applied in a loop rather than as a repeated group inside the sniff
+# patterns: nested repetition there backtracks exponentially on a failed sniff.
+_PREAMBLE = re.compile(r'\s+|--[^\n]*|//[^\n]*|/\*.*?\*/', re.S)
+
+# Source files whose extension already says what they are. They are never sniffed, since a
+# dotted call such as 'os.makedirs(path, ...)' on their first line reads like a bare table.
+CODE_EXTENSIONS = [
+    '.py', '.pyi', '.js', '.mjs', '.cjs', '.jsx', '.ts', '.tsx', '.java', '.kt', '.scala', '.go', '.rs',
+    '.rb', '.php', '.c', '.h', '.cc', '.cpp', '.hpp', '.cs', '.swift', '.m', '.lua', '.pl', '.r', '.sh',
+]
+
+# Each parser names its handler as 'module:function', imported on first use, so a run that
+# never meets a schema file never imports the extractors. A handler takes the file text and
+# returns a list of entity dicts; an empty list sends the file down the generic path.
+PARSERS: Dict[str, Dict[str, Any]] = {
+    'sql_ddl': {
+        'handler': 'src.processing.schema_extractor:extract_sql_tables',
+        'extensions': ['.sql', '.ddl', '.schema'],
+        'sniff': r'(?:create\s+(?:or\s+replace\s+)?(?:(?:temp|temporary|unlogged)\s+)?table\b|[a-z_]\w*\.[a-z_]\w*\s*\(\s*(?:"[^"\n]*"|[a-z_]\w*)\s+[a-z_])',
+    },
+    'typescript': {
+        'handler': 'src.processing.schema_extractor:extract_typescript_types',
+        'extensions': ['.d.ts', '.types'],
+        'sniff': r'(?:export\s+)?(?:declare\s+)?(?:interface|type)\s+[A-Za-z_$][\w$]*\s*(?:<[^>{]*>\s*)?(?:extends\b[^{]*)?[={]',
+    },
+}
+
+
+def skip_preamble(text: str) -> str:
+    # The text from its first character that is neither whitespace nor part of a comment.
+    position = 0
+    while True:
+        match = _PREAMBLE.match(text, position)
+        if match is None or match.end() == position:
+            return text[position:]
+        position = match.end()
+
+
+def render_entities(entities: List[Dict[str, Any]]) -> str:
+    # Plain-text rendering of extracted entities, one paragraph each, for the chunk stage.
+    paragraphs = []
+    for entity in entities:
+        lines = [f"{entity['kind']} {entity['name']}" + (f" = {entity['definition']}" if entity.get('definition') else '')]
+        for field in entity.get('columns') or entity.get('fields') or []:
+            flags = [flag for flag, on in (
+                ('primary key', field.get('primary_key')),
+                ('not null', field.get('nullable') is False and not field.get('primary_key')),
+                ('unique', field.get('unique')),
+                ('optional', field.get('optional')),
+                ('readonly', field.get('readonly')),
+            ) if on]
+            if field.get('default') is not None:
+                flags.append(f"default {field['default']}")
+            if field.get('references'):
+                reference = field['references']
+                flags.append(f"references {reference['table']}({', '.join(reference['columns'])})")
+            lines.append(f"  {field['name']}: {field['type'] or 'unknown'}" + (f" ({', '.join(flags)})" if flags else ''))
+        for constraint in entity.get('constraints', []):
+            lines.append(f"  {constraint['type'].replace('_', ' ')} ({', '.join(constraint.get('columns') or [constraint.get('expression', '')])})")
+        paragraphs.append('\n'.join(lines))
+    return '\n\n'.join(paragraphs)
+
+
+class ParserRegistry:
+    # Routes a file to a structured parser by extension, or by sniffing its first declaration
+    # when the extension is neither registered nor a known source-code one. Structured files skip NLP enrichment: their record
+    # carries the extracted entities and their samples are cut from the rendered entities.
+
+    def __init__(self, options: Dict = None):
+        # Options come from the 'parser_options' config block.
+        options = options or {}
+        self.parsers = {**PARSERS, **options.get('parsers', {})}
+        self.sniff = options.get('sniff', True)
+        self.sniff_bytes = options.get('sniff_bytes', 4096)
+        self.code_extensions = {extension.lower() for extension in options.get('code_extensions', CODE_EXTENSIONS)}
+        # Text up to this size is parsed on the event loop; larger files go to a thread.
+        self.inline_bytes = options.get('inline_bytes', 256 * 1024)
+        self.extensions: Dict[str, str] = {}
+        for name, spec in self.parsers.items():
+            for extension in spec.get('extensions', []):
+                self.extensions[extension.lower()] = name
+        self.extensions.update({extension.lower(): name for extension, name in options.get('extensions', {}).items()})
+        # Longest extension first, so '.d.ts' wins over '.ts'.
+        self.suffixes = sorted(self.extensions, key=len, reverse=True)
+        self.sniffers = [
+            (name, re.compile(spec['sniff'], re.I | re.S)) for name, spec in self.parsers.items() if spec.get('sniff')
+        ]
+        self.handlers: Dict[str, Callable[[str], List[Dict[str, Any]]]] = {}
+        self.telemetry = Telemetry.get_instance()
+
+    def resolve(self, file_path: str, text: str) -> Optional[str]:
+        name = os.path.basename(file_path).lower()
+        for suffix in self.suffixes:
+            if name.endswith(suffix):
+                return self.extensions[suffix]
+        if self.sniff and os.path.splitext(name)[1] not in self.code_extensions:
+            head = skip_preamble(text[:self.sniff_bytes])
+            for parser, pattern in self.sniffers:
+                if pattern.match(head):
+                    return parser
+        return None
+
+    def handler(self, parser: str) -> Callable[[str], List[Dict[str, Any]]]:
+        if parser not in self.handlers:
+            module_name, function_name = self.parsers[parser]['handler'].split(':', 1)
+            self.handlers[parser] = getattr(importlib.import_module(module_name), function_name)
+        return self.handlers[parser]
+
+    async def parse(self, file_path: str, text: str) -> Optional[Dict[str, Any]]:
+        # {'format': parser, 'entities': [...]} for a structured file, None for any other.
+        parser = self.resolve(file_path, text)
+        if parser is None:
+            return None
+        handler = self.handler(parser)
+        with self.telemetry.span('parse.structured', file_path):
+            if len(text) <= self.inline_bytes:
+                entities = handler(text)
+            else:
+                entities = await asyncio.to_thread(handler, text)
+        if not entities:
+            return None
+        self.telemetry.increment('structured_files_total', format=parser)
+        return {'format': parser, 'entities': entities}
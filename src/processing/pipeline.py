@@ -0,0 +1,86 @@
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+import asyncio
+
+from src.utils import LoggerService
+from src.telemetry import Telemetry
+
+_STOP = object()
+
+StageHandler = Callable[[Any], Awaitable[Any]]
+ErrorHandler = Callable[[str, Any, Exception], Awaitable[None]]
+
+
+# Stages are joined by bounded queues, so a slow stage applies backpressure to its producers.
+# A handler returning None drops the item; an item whose handler raises is passed to on_error, then dropped.
+class StreamingPipeline:
+    def __init__(self, queue_size: int = 64, on_error: Optional[ErrorHandler] = None):
+        self.queue_size = max(1, queue_size)
+        self.on_error = on_error
+        self.stages: List[Tuple[str, StageHandler, int]] = []
+        self.logger = LoggerService.get_instance()
+        self.telemetry = Telemetry.get_instance()
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self.queues: List[asyncio.Queue] = []
+
+    def add_stage(self, name: str, handler: StageHandler, workers: int = 1) -> 'StreamingPipeline':
+        self.stages.append((name, handler, max(1, workers)))
+        self.counts[name] = {'in': 0, 'out': 0, 'errors': 0}
+        return self
+
+    async def run(self, source: Union[Iterable[Any], AsyncIterable[Any]]) -> Dict[str, Dict[str, int]]:
+        if not self.stages:
+            raise ValueError("StreamingPipeline requires at least one stage.")
+        queues = self.queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        workers: List[List[asyncio.Task]] = []
+        for index, (name, handler, count) in enumerate(self.stages):
+            outbound = queues[index + 1] if index + 1 < len(queues) else None
+            workers.append([
+                asyncio.create_task(self._worker(name, handler, queues[index], outbound))
+                for _ in range(count)
+            ])
+        try:
+            await self._feed(source, queues[0])
+            for queue, stage_workers in zip(queues, workers):
+                for _ in stage_workers:
+                    await queue.put(_STOP)
+                await asyncio.gather(*stage_workers)
+        finally:
+            for task in (task for stage_workers in workers for task in stage_workers):
+                if not task.done():
+                    task.cancel()
+        return self.counts
+
+    async def _feed(self, source: Union[Iterable[Any], AsyncIterable[Any]], queue: asyncio.Queue) -> None:
+        if hasattr(source, '__aiter__'):
+            async for item in source:
+                await queue.put(item)
+        else:
+            for item in source:
+                await queue.put(item)
+
+    async def _worker(self, name: str, handler: StageHandler, inbound: asyncio.Queue, outbound: asyncio.Queue) -> None:
+        counts = self.counts[name]
+        span_name = f"stage.{name}"
+        while True:
+            item = await inbound.get()
+            if item is _STOP:
+                return
+            counts['in'] += 1
+            try:
+                with self.telemetry.span(span_name, item):
+                    result = await handler(item)
+            except Exception as e:
+                counts['errors'] += 1
+                self.telemetry.increment('pipeline_errors_total', stage=name)
+                await self.logger.log("error", f"Pipeline stage '{name}' failed: {e}")
+                if self.on_error is not None:
+                    await self.on_error(name, item, e)
+                continue
+            if result is None:
+                continue
+            counts['out'] += 1
+            if outbound is not None:
+                await outbound.put(result)
+
+    def queue_depths(self) -> Dict[str, int]:
+        return {name: queue.qsize() for (name, _, _), queue in zip(self.stages, self.queues)}
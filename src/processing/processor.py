@@ -1,42 +1,440 @@
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Callable, Optional, Tuple, Union
 import asyncio
+import json
+import os
 
-from src.utils import LoggerService
+from src.utils import LoggerService, FileManager, RequestManager, ModelRegistry
+from src.telemetry import Telemetry
+from src.processing.pipeline import StreamingPipeline
+from src.processing.manifest import FileManifest
+from src.processing.archive_source import ArchiveSource, MEMBER_SEPARATOR, is_archive
+from src.processing.large_file_reader import LargeFileReader
+from src.processing.output_writer import ShardedOutputWriter, ParquetMetadataWriter, fast_dumpb
+from src.processing.chunker import TokenChunker, SequencePacker
+from src.processing.deduplicator import Deduplicator, DedupIndex
+from src.processing.sharding import assign_shards, shard_output_file
+from src.processing.journal import ProgressJournal, DeadLetterList
+from src.processing.parser_registry import ParserRegistry, render_entities
 
 class DataProcessor:
 
-    def __init__(self, config: Dict[str, Any], output_file: str):
+    def __init__(self, config: Dict[str, Any], output_file: Optional[str] = None, shard: Optional[Tuple[int, int]] = None,
+                 resume: bool = False, on_shard: Optional[Callable[[str], None]] = None):
         self.config = config
-        self.output_file = output_file
+        file_paths = config.get('globalSettings', {}).get('filePaths', {})
+        self.input_dir = file_paths.get('inputDir', './mock/input')
+        self.output_file = output_file or file_paths.get('outputFile', './mock/output/global_enriched_data.jsonl')
+        self.pipeline_options = config.get('pipeline_options', {})
+        self.output_options = config.get('output_options', {})
+        self.chunking_options = config.get('chunking_options', {})
+        # A (index, count) shard processes only its share of the input and writes its own output,
+        # index, manifest and Parquet file, all named after the shard output file.
+        self.shard = shard
+        if shard is not None:
+            self.output_file = shard_output_file(self.output_file, *shard)
+            self.output_options = {key: value for key, value in self.output_options.items() if key != 'index_file'}
+            if self.output_options.get('parquet_file'):
+                self.output_options['parquet_file'] = shard_output_file(self.output_options['parquet_file'], *shard)
+            if self.chunking_options.get('packed_output'):
+                self.chunking_options = {**self.chunking_options,
+                                         'packed_output': shard_output_file(self.chunking_options['packed_output'], *shard)}
+        self.dedup_options = config.get('dedup_options', {})
+        self.journal_options = config.get('journal_options', {})
+        self.resume = resume
+        # Told about every output shard as soon as it is final, so later stages can start on it.
+        self.on_shard = on_shard
+        self.large_file_reader = LargeFileReader(config.get('large_file_options', {}))
         # Utilize the singleton pattern for logging
         self.logger = LoggerService("DataProcessorLogger")
         # Utilize the FileManager for file operations
-        # self.file_manager = "FileManager()"
-        # self.initialize_services()
-        self.logger.log("info", "DataProcessor initialized")
+        self.file_manager = FileManager()
+        self.telemetry = Telemetry.get_instance()
+        # Set up by initialize_services and process_files; None until then, so the stages can
+        # also be driven directly (as bench_pipeline does) without the optional outputs.
+        self.manifest: Optional[FileManifest] = None
+        self.journal: Optional[ProgressJournal] = None
+        self.dead_letters: Optional[DeadLetterList] = None
+        self.writer: Optional[ShardedOutputWriter] = None
+        self.parquet_writer: Optional[ParquetMetadataWriter] = None
+        self.packed_writer: Optional[ShardedOutputWriter] = None
+        self.packer: Optional[SequencePacker] = None
+        self.deduplicator: Optional[Deduplicator] = None
+        self.dedup_index_file: Optional[str] = None
+        self.chunker: Optional[TokenChunker] = None
+        self.parsers: Optional[ParserRegistry] = None
+        self.services_initialized = False
 
     def initialize_services(self):
-        from src.processing.metadata_extractor import MetadataExtractor
+        if self.services_initialized:
+            return
+        from src.processing.metadata_extractor import ContentHarvester
         from src.processing.context_extractor import ContextExtractor
-        from processing.file_crawler import FileProcessor
+        from src.processing.data_parser import DataProcessor as ExternalDataProcessor
+        from src.processing.file_crawler import FileProcessor
 
-        self.metadata_extractor = MetadataExtractor(self.config)
+        # One pooled HTTP client is shared by the internal and external enrichment fetchers.
+        self.request_manager = RequestManager(self.logger, self.config.get('http_options', {}))
+        self.metadata_extractor = ContentHarvester(self.config)
         self.context_extractor = ContextExtractor(self.config)
-        # self.data_enrichment_service = DataProcessor(self.config)
-        self.internal_data_utility = FileProcessor(self.config)
-
-    def process_files(self, input_dir: str):
-        async def process_files_async():
-            await self.logger.log("info", "Starting file processing")
-            # Use FileManager to list files
-            file_paths = self.file_manager.find_files(input_dir)
-            all_data = await self._process_all_files(file_paths)
-            
-            # Use FileManager to save data
-            await self.file_manager.save_data_to_file(all_data, self.output_file)
-            await self.logger.log("info", "File processing completed")
-        
-        asyncio.run(process_files_async())
+        self.data_enrichment_service = ExternalDataProcessor(self.config, self.request_manager)
+        self.internal_data_utility = FileProcessor(self.config, self.request_manager)
+        self.chunker = TokenChunker(self.config) if self.chunking_options.get('enabled', False) else None
+        parser_options = self.config.get('parser_options', {})
+        self.parsers = ParserRegistry(parser_options) if parser_options.get('enabled', True) else None
+        self.services_initialized = True
+
+    async def process_files(self, input_dir: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        await self.logger.log("info", "Starting file processing")
+        ModelRegistry.get_instance().start_warmup()
+        self.initialize_services()
+        workers = self.pipeline_options.get('workers', {})
+        self.manifest = self._load_manifest()
+        self.journal, self.dead_letters, resuming = self._open_journal()
+        self.writer = ShardedOutputWriter(self.output_file, self.output_options, self.journal)
+        self.writer.on_shard = self.on_shard
+        self.parquet_writer = self._open_parquet_writer()
+        self.packed_writer = self._open_packed_writer()
+        self.packer = None
+        self.deduplicator = self._open_deduplicator(resuming)
+        self.written = 0
+        self.reused = 0
+        self.resumed = 0
+
+        try:
+            if resuming:
+                await self._resume()
+            # crawl -> read [-> dedup] -> enrich [-> chunk] -> serialize [-> pack] -> write
+            pipeline = StreamingPipeline(self.pipeline_options.get('queue_size', 64),
+                                         self._dead_letter if self.dead_letters is not None else None)
+            pipeline.add_stage('read', self._read_file, workers.get('read', 8))
+            if self.deduplicator is not None:
+                pipeline.add_stage('dedup', self._dedup_task, workers.get('dedup', 4))
+            pipeline.add_stage('enrich', self._enrich_file, workers.get('enrich', 4))
+            if self.chunker is not None:
+                pipeline.add_stage('chunk', self._chunk_task, workers.get('chunk', 4))
+            pipeline.add_stage('serialize', self._serialize_record, workers.get('serialize', 2))
+            if self.packed_writer is not None:
+                pipeline.add_stage('pack', self._pack_task, 1)
+            pipeline.add_stage('write', self._write_task, 1)
+            self.telemetry.watch('pipeline_queue_depth', pipeline.queue_depths)
+            self.telemetry.start()
+            counts = await pipeline.run(self._iter_inputs(input_dir or self.input_dir))
+            # Shards are committed before the manifest, so the manifest never points at uncommitted output.
+            outputs = await self.writer.commit()
+            if self.packed_writer is not None:
+                for sequence in self.packer.flush() if self.packer is not None else []:
+                    await self.packed_writer.write(fast_dumpb(sequence))
+                await self.packed_writer.commit()
+            if self.parquet_writer is not None:
+                await asyncio.to_thread(self.parquet_writer.close)
+            if self.manifest is not None:
+                self.manifest.commit(outputs)
+            # Everything the journal describes is now committed output.
+            if self.journal is not None:
+                self.journal.remove()
+        except BaseException:
+            # A journaled writer keeps its flushed shard for --resume instead of deleting it.
+            self.writer.abort()
+            if self.packed_writer is not None:
+                self.packed_writer.abort()
+            if self.parquet_writer is not None:
+                self.parquet_writer.abort()
+            raise
+        finally:
+            await self.telemetry.stop()
+            self.metadata_extractor.shutdown()
+            await self.request_manager.close()
+            self.data_enrichment_service.close()
+            if self.manifest is not None:
+                self.manifest.close()
+            if self.deduplicator is not None:
+                self.deduplicator.close()
+            if self.journal is not None:
+                self.journal.close()
+                self.dead_letters.close()
+        if self.dedup_index_file is not None:
+            # Like the journal, the run's own dedup index is only kept to resume the run.
+            DedupIndex.remove(self.dedup_index_file)
+
+        await self.logger.log("info", f"File processing completed: {self.written} records written to {self.output_file} ({self.reused} reused from the previous run)")
+        if self.resumed:
+            await self.logger.log("info", f"{self.resumed} records were kept from the interrupted run")
+        if self.dead_letters is not None and self.dead_letters.entries:
+            await self.logger.log("error", f"{len(self.dead_letters.entries)} files failed and are listed in {self.dead_letters.path}")
+        if self.deduplicator is not None:
+            stats = self.deduplicator.stats
+            await self.logger.log("info", f"Dropped {stats['exact']} exact and {stats['near']} near duplicates of {stats['checked']} documents checked")
+        slowest = self.telemetry.slowest('stage.enrich')
+        if slowest:
+            await self.logger.log("info", "Slowest files to enrich: " + ", ".join(f"{path} ({duration:.2f}s)" for duration, path in slowest))
+        return counts
+
+    def _load_manifest(self) -> Optional[FileManifest]:
+        incremental_options = self.config.get('incremental_options', {})
+        if not incremental_options.get('enabled', False):
+            return None
+        manifest = FileManifest(
+            incremental_options.get('manifest_file') or f"{self.output_file}.manifest.json",
+            self.output_file,
+            incremental_options.get('hash_algorithm', 'sha256'),
+            incremental_options.get('reuse_window_bytes', 8 * 1024 * 1024),
+        )
+        manifest.load()
+        return manifest
+
+    def _open_journal(self) -> Tuple[Optional[ProgressJournal], Optional[DeadLetterList], bool]:
+        # --resume implies journaling, so a resumed run can itself be resumed.
+        if not (self.journal_options.get('enabled', False) or self.resume):
+            return None, None, False
+        journal = ProgressJournal(self.journal_options.get('journal_file') or f"{self.output_file}.journal.jsonl",
+                                  self.journal_options.get('fsync', True))
+        header = {'output_file': self.output_file, 'compression': self.output_options.get('compression', 'none')}
+        resuming = self.resume and journal.load()
+        if resuming and {key: journal.header.get(key) for key in header} != header:
+            raise ValueError(f"Cannot resume from {journal.path}: it was written for {journal.header.get('output_file')} "
+                             f"with compression {journal.header.get('compression')}")
+        if self.resume and not resuming:
+            self.logger.logger.warning(f"No journal at {journal.path}, processing from the beginning")
+        journal.open(header, resuming)
+        dead_letters = DeadLetterList(self.journal_options.get('dead_letter_file') or f"{self.output_file}.dead_letter.jsonl")
+        dead_letters.open(resuming)
+        if self.journal_options.get('retry_dead_letters', False):
+            dead_letters.entries.clear()
+        return journal, dead_letters, resuming
+
+    async def _resume(self) -> None:
+        # Side outputs are not journaled; they are rebuilt from the interrupted run's records,
+        # which have to be read before the writer cuts its shards back to the journal.
+        if self.parquet_writer is not None or self.packed_writer is not None:
+            records = self.journal.iter_records(self.writer.compression)
+            while (item := await asyncio.to_thread(next, records, None)) is not None:
+                file_path, line = item
+                if self.parquet_writer is not None:
+                    self.parquet_writer.write(json.loads(line))
+                if self.packed_writer is not None:
+                    await self._pack_task({'file_path': file_path, 'line': line.decode('utf-8')})
+        await self.writer.restore()
+        for file_path, entry in self.journal.completed.items():
+            if self.manifest is not None and 'signature' in entry:
+                self.manifest.record(file_path, tuple(entry['signature']), entry['hash'], entry['offset'], entry['length'], entry['shard'],
+                                     entry.get('parent'))
+        self.resumed = self.written = len(self.journal.completed)
+        await self.logger.log("info", f"Resuming {self.output_file}: {self.resumed} records already written, "
+                                      f"{len(self.dead_letters.entries)} dead-lettered files skipped")
+
+    async def _dead_letter(self, stage: str, item: Any, error: Exception) -> None:
+        file_path = item.get('file_path') if isinstance(item, dict) else item
+        if isinstance(file_path, str):
+            self.dead_letters.add(file_path, stage, error)
+            self.telemetry.increment('dead_letters_total', stage=stage)
+
+    def _already_done(self, file_path: str) -> bool:
+        if self.journal is None:
+            return False
+        return file_path in self.journal.completed or file_path in self.dead_letters.entries
+
+    def _open_packed_writer(self) -> Optional[ShardedOutputWriter]:
+        if self.chunker is None or not self.chunking_options.get('pack', False):
+            return None
+        # Packed sequences are sharded and compressed like the main output, under their own index.
+        options = {key: value for key, value in self.output_options.items() if key not in ('index_file', 'parquet_file')}
+        return ShardedOutputWriter(self.chunking_options.get('packed_output') or f"{self.output_file}.packed.jsonl", options)
+
+    def _open_deduplicator(self, resuming: bool) -> Optional[Deduplicator]:
+        if not self.dedup_options.get('enabled', False):
+            return None
+        options = self.dedup_options
+        if self.journal is not None and not options.get('index_file'):
+            # Files an interrupted run already wrote are skipped on --resume before the dedup stage,
+            # so an in-memory index would never learn them and would let their duplicates through.
+            # A journaled run keeps its index on disk next to the output until it completes.
+            self.dedup_index_file = f"{self.output_file}.dedup.sqlite"
+            if not resuming:
+                DedupIndex.remove(self.dedup_index_file)
+            options = {**options, 'index_file': self.dedup_index_file}
+        try:
+            return Deduplicator(options)
+        except ImportError as e:
+            self.logger.logger.error(f"Deduplication disabled, numpy is not available: {e}")
+            return None
+
+    def _open_parquet_writer(self) -> Optional[ParquetMetadataWriter]:
+        parquet_file = self.output_options.get('parquet_file')
+        if not parquet_file:
+            return None
+        try:
+            return ParquetMetadataWriter(parquet_file, self.output_options.get('parquet_row_group_size', 10000))
+        except ImportError as e:
+            self.logger.logger.error(f"Parquet output disabled, pyarrow is not available: {e}")
+            return None
+
+    async def _iter_inputs(self, input_dir: str) -> AsyncIterator[Union[str, Dict[str, Any]]]:
+        # Archives and files over the large-file threshold are split into parts here and enter
+        # the pipeline as tasks. In the manifest each part carries its container's signature,
+        # so an unchanged container has its parts' records reused without being opened.
+        expand_archives = self.config.get('archive_options', {}).get('expand', False)
+        async for file_path in self._iter_shard_files(input_dir):
+            expand = expand_archives and is_archive(file_path)
+            if not expand and not await asyncio.to_thread(self.large_file_reader.is_large, file_path):
+                yield file_path
+                continue
+            signature = None
+            if self.manifest is not None:
+                signature = await asyncio.to_thread(self.manifest.file_signature, file_path)
+                parts = self.manifest.lookup_unchanged_parts(file_path, signature)
+                if parts:
+                    for part_path, entry in parts:
+                        yield {'file_path': part_path, 'parent': file_path, 'signature': signature, 'reuse': entry}
+                    continue
+            async for task in self._iter_parts(file_path, expand):
+                task['parent'] = file_path
+                if signature is not None:
+                    task['signature'] = signature
+                yield task
+
+    async def _iter_parts(self, file_path: str, expand: bool) -> AsyncIterator[Dict[str, Any]]:
+        if expand:
+            # Members stream out of the archive as 'archive!/member' tasks, without being extracted
+            # to disk; they stay bytes so the read stage can apply the content-kind policy.
+            archive_source = ArchiveSource(self.config.get('archive_options', {}))
+            async for member_path, content in archive_source.iter_members(file_path, file_path + MEMBER_SEPARATOR, decode=False):
+                yield {'file_path': member_path, 'content': content}
+            return
+        # Large files are memory-mapped and enter as one 'file#window-N' task per window; the
+        # policy for the file's sniffed kind is applied as the windows are cut.
+        windows = self.large_file_reader.iter_texts(file_path)
+        index = 0
+        while (window_text := await asyncio.to_thread(next, windows, None)) is not None:
+            yield {'file_path': f"{file_path}#window-{index}", 'file_text': window_text}
+            index += 1
+
+    async def _iter_shard_files(self, input_dir: str) -> AsyncIterator[str]:
+        crawl = self.file_manager.iter_files(input_dir, self.config.get('crawl_options', {}))
+        if self.shard is None:
+            async for file_path in crawl:
+                yield file_path
+            return
+        # Balancing by size needs the whole listing, so a sharded run crawls fully before reading.
+        # Paths are keyed relative to input_dir so nodes mounting the input elsewhere still agree.
+        file_paths = [file_path async for file_path in crawl]
+        sizes = await asyncio.to_thread(lambda: [os.path.getsize(file_path) for file_path in file_paths])
+        keys = [os.path.relpath(file_path, input_dir).replace(os.sep, '/') for file_path in file_paths]
+        assignment = assign_shards(list(zip(keys, sizes)), self.shard[1])
+        selected = [file_path for file_path, key in zip(file_paths, keys) if assignment[key] == self.shard[0]]
+        await self.logger.log("info", f"Shard {self.shard[0]}/{self.shard[1]}: {len(selected)} of {len(file_paths)} files")
+        for file_path in selected:
+            yield file_path
+
+    async def _read_file(self, item: Union[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if self._already_done(item['file_path'] if isinstance(item, dict) else item):
+            return None
+        if isinstance(item, dict):
+            # A part of an archive or large file, already read (or reused) by _iter_inputs.
+            if 'content' in item:
+                content = item.pop('content')
+                self.telemetry.increment('bytes_read_total', len(content))
+                _, item['file_text'] = self.large_file_reader.apply_policy(content)
+                if item['file_text'] is None:
+                    return None
+            return item
+        file_path = item
+        task = {'file_path': file_path}
+        if self.manifest is None:
+            content = await self.file_manager.read_bytes(file_path)
+            self.telemetry.increment('bytes_read_total', len(content))
+            _, task['file_text'] = self.large_file_reader.apply_policy(content)
+            # Binary and undecodable content is dropped here under the 'skip' policy.
+            return task if task['file_text'] is not None else None
+        task['signature'] = self.manifest.file_signature(file_path)
+        task['reuse'] = self.manifest.lookup_unchanged(file_path, task['signature'])
+        if task['reuse'] is None:
+            content = await self.file_manager.read_bytes(file_path)
+            self.telemetry.increment('bytes_read_total', len(content))
+            task['hash'] = self.manifest.hash_bytes(content)
+            task['reuse'] = self.manifest.lookup_unchanged(file_path, task['signature'], task['hash'])
+            if task['reuse'] is None:
+                _, task['file_text'] = self.large_file_reader.apply_policy(content)
+                if task['file_text'] is None:
+                    return None
+        return task
+
+    async def _dedup_task(self, task: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Reused records were kept by an earlier run and are already in a persistent index.
+        if task.get('reuse'):
+            return task
+        duplicate = await self.deduplicator.check(task['file_path'], task['file_text'])
+        if duplicate is None:
+            return task
+        kind, duplicate_of, similarity = duplicate
+        self.telemetry.increment('dedup_dropped_total', kind=kind)
+        await self.logger.log("info", f"Dropping {task['file_path']}: {kind} duplicate of {duplicate_of} (similarity {similarity:.2f})")
+        return None
+
+    async def _enrich_file(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        if not task.get('reuse'):
+            file_path = task['file_path']
+            # The chunk stage still needs the text, so it only pops it when chunking is off.
+            file_text = task['file_text'] if self.chunker is not None else task.pop('file_text')
+            structured = await self.parsers.parse(file_path, file_text) if self.parsers is not None else None
+            if structured is not None:
+                # Schemas and type definitions skip NLP enrichment; their samples are cut from the entities.
+                task['record'] = {'file_path': file_path, 'structured': structured}
+                if self.chunker is not None:
+                    task['file_text'] = render_entities(structured['entities'])
+            else:
+                task['record'] = {'file_path': file_path, **await self._enrich_data(file_path, file_text)}
+        return task
+
+    async def _chunk_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        if task.get('reuse'):
+            return task
+        samples = await self.chunker.chunk(task.pop('file_text'))
+        task['record']['samples'] = [{'text': sample['text'], 'num_tokens': sample['num_tokens']} for sample in samples]
+        if self.packed_writer is not None:
+            task['sample_ids'] = [sample['input_ids'] for sample in samples if sample['input_ids'] is not None]
+        return task
+
+    async def _pack_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        if 'sample_ids' in task:
+            sample_ids = task.pop('sample_ids')
+        else:
+            # Reused records keep their sample texts but not token ids, so those are re-tokenized.
+            texts = [sample['text'] for sample in json.loads(task['line']).get('samples', [])]
+            sample_ids = [input_ids for _, input_ids in [await self.chunker.tokenize(text) for text in texts] if input_ids is not None]
+        if self.packer is None:
+            tokenizer = self.chunker.tokenizer
+            separator_id = getattr(tokenizer, 'eos_token_id', None) or getattr(tokenizer, 'sep_token_id', None)
+            self.packer = SequencePacker(self.chunking_options.get('pack_length', self.chunker.max_tokens), separator_id,
+                                         self.chunking_options.get('drop_last', False))
+        for sequence in self.packer.add(sample_ids, task['file_path']):
+            await self.packed_writer.write(fast_dumpb(sequence))
+        return task
+
+    async def _serialize_record(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        if task.get('reuse'):
+            task['line'] = self.manifest.read_previous_records(task['reuse'])
+        else:
+            record = task['record'] if self.parquet_writer is not None else task.pop('record')
+            task['line'] = fast_dumpb(record)
+        return task
+
+    async def _write_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        # Parts of archives and large files are tracked under their container's signature, without a hash.
+        tracked = self.manifest is not None and 'signature' in task
+        extra = None
+        if tracked:
+            content_hash = task['reuse']['hash'] if task.get('reuse') else task.get('hash')
+            extra = {'signature': task['signature'], 'hash': content_hash, 'parent': task.get('parent')}
+        shard, offset, length = await self.writer.write(task['line'], task['file_path'], extra)
+        if tracked:
+            self.manifest.record(task['file_path'], task['signature'], extra['hash'], offset, length, shard, extra['parent'])
+        if self.parquet_writer is not None:
+            self.parquet_writer.write(task.pop('record', None) or json.loads(task['line']))
+        self.written += 1
+        self.telemetry.increment('files_written_total', reused='true' if task.get('reuse') else 'false')
+        self.telemetry.increment('bytes_written_total', length)
+        self.reused += 1 if task.get('reuse') else 0
+        return task
 
     async def _enrich_data(self, file_path: str, file_text: str) -> Dict[str, Any]:
         # Check if processing steps are enabled in the config
@@ -52,18 +450,22 @@ class DataProcessor:
         internal_data = {}
 
         if process_metadata:
-            summary = await self.metadata_extractor.generate_summary(file_text)
-            metadata = await self.metadata_extractor.extract_metadata(file_path, file_text, summary)
-        
+            with self.telemetry.span('enrich.metadata', file_path):
+                summary = await self.metadata_extractor.generate_summary(file_text)
+                metadata = await self.metadata_extractor.extract_metadata(file_path, file_text, summary)
+
         if process_context:
-            context = await self.context_extractor.extract_enhanced_context(file_text)
-        
+            with self.telemetry.span('enrich.context', file_path):
+                context = await self.context_extractor.extract_enhanced_context(file_text)
+
         if process_external_data:
             # Assuming a correct service is instantiated for data_enrichment_service, the following line is corrected.
-            external_data = await self.data_enrichment_service.integrate_external_data(metadata, context)
-        
+            with self.telemetry.span('enrich.external', file_path):
+                external_data = await self.data_enrichment_service.integrate_external_data(metadata, context)
+
         if process_internal_data:
-            internal_data = await self.internal_data_utility.prepare_data_for_llm(metadata, context)
+            with self.telemetry.span('enrich.internal', file_path):
+                internal_data = await self.internal_data_utility.prepare_data_for_llm(metadata, context)
 
         return {
             'metadata': metadata,
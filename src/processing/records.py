@@ -0,0 +1,45 @@
+from typing import Any, Dict, Iterable, Tuple
+import sys
+
+# Values every simulated enrichment entry repeats. They are created once and referenced by
+# every record; tuples so a record can never mutate a value another record shares.
+EXTERNAL_DETAILS = sys.intern('Simulated entity details from external source.')
+INTERNAL_DETAILS = sys.intern('Simulated entity details for internal use.')
+EXTERNAL_TOPICS = (sys.intern('Topic 1'), sys.intern('Topic 2'))
+INTERNAL_TOPICS = (sys.intern('Internal Topic 1'), sys.intern('Internal Topic 2'))
+
+
+class SimulatedEntries:
+    # Builds an enrichment block from a record's entities and keywords. An entry depends only
+    # on its key and this block's constants, so the first cache_size entries of a run are kept
+    # and records hold references to them instead of fresh dicts and lists of their own.
+    # Entries are shared between records and must not be modified. Sharing trades some encode
+    # speed for memory on corpora with many distinct keys; cache_size 0 turns it off.
+
+    def __init__(self, details: str, topics: Tuple[str, ...], cache_size: int = 65536):
+        self.details = details
+        self.topics = topics
+        self.cache_size = cache_size
+        self.entities: Dict[Any, Dict[str, Any]] = {}
+        self.keywords: Dict[Any, Dict[str, Any]] = {}
+
+    def build(self, entities: Iterable[Any], keywords: Iterable[Any]) -> Dict[Any, Dict[str, Any]]:
+        # Keywords win over entities of the same name, as they always have.
+        entries: Dict[Any, Dict[str, Any]] = {}
+        table, cached = self.entities, self.entities.get
+        for entity in entities:
+            entry = cached(entity)
+            if entry is None:
+                entry = {'entity': entity, 'details': self.details}
+                if len(table) < self.cache_size:
+                    table[entity] = entry
+            entries[entity] = entry
+        table, cached = self.keywords, self.keywords.get
+        for keyword in keywords:
+            entry = cached(keyword)
+            if entry is None:
+                entry = {'keyword': keyword, 'related_topics': self.topics}
+                if len(table) < self.cache_size:
+                    table[keyword] = entry
+            entries[keyword] = entry
+        return entries
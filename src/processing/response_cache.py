@@ -0,0 +1,135 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from src.telemetry import Telemetry
+from src.utils import request_key
+
+
+class MemoryLRUCache:
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max(1, max_entries)
+        self.entries: 'OrderedDict[str, Tuple[Any, float]]' = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        self.entries[key] = (value, expires_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+            Telemetry.get_instance().increment('cache_evictions_total')
+
+    def delete(self, key: str) -> None:
+        self.entries.pop(key, None)
+
+    def close(self) -> None:
+        self.entries.clear()
+
+
+class SQLiteCache:
+    # WAL mode lets several worker processes and later runs share one cache file.
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)')
+        self.connection.commit()
+        # Rows left expired by earlier runs are dropped on open; ResponseCache deletes the ones it hits.
+        self.purge_expired()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self.lock:
+            row = self.connection.execute('SELECT value, expires_at FROM responses WHERE key = ?', (key,)).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)',
+                                    (key, json.dumps(value, default=str), expires_at))
+            self.connection.commit()
+
+    def delete(self, key: str) -> None:
+        with self.lock:
+            self.connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+            self.connection.commit()
+
+    def purge_expired(self) -> int:
+        with self.lock:
+            deleted = self.connection.execute('DELETE FROM responses WHERE expires_at <= ?', (time.time(),)).rowcount
+            self.connection.commit()
+        return deleted
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+class ResponseCache:
+    # In-memory LRU in front of an optional persistent store; both honour per-source TTLs.
+
+    def __init__(self, options: Dict = None):
+        # Options come from the 'cache_options' config block.
+        options = options or {}
+        self.default_ttl = options.get('ttl', 3600)
+        self.ttl_by_source: Dict[str, float] = options.get('ttl_by_source', {})
+        self.memory = MemoryLRUCache(options.get('max_entries', 10000))
+        self.disk = SQLiteCache(options['path']) if options.get('path') else None
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'expired': 0}
+
+    @staticmethod
+    def key_for(url: str, params: Dict = None, method: str = 'GET') -> str:
+        return hashlib.sha256(request_key(method, url, params).encode('utf-8')).hexdigest()
+
+    def ttl_for(self, source: Dict) -> float:
+        if 'cache_ttl' in source:
+            return source['cache_ttl']
+        return self.ttl_by_source.get(source.get('name') or source.get('type'), self.default_ttl)
+
+    async def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        entry = self.memory.get(key)
+        if entry is not None and entry[1] > now:
+            self._count('hits')
+            return entry[0]
+        if entry is None and self.disk is not None:
+            entry = await asyncio.to_thread(self.disk.get, key)
+            if entry is not None and entry[1] > now:
+                self._count('disk_hits')
+                self.memory.set(key, *entry)
+                return entry[0]
+            if entry is not None:
+                await asyncio.to_thread(self.disk.delete, key)
+        if entry is not None:
+            self.memory.delete(key)
+            self._count('expired')
+        self._count('misses')
+        return None
+
+    def _count(self, outcome: str) -> None:
+        self.stats[outcome] += 1
+        Telemetry.get_instance().increment('cache_lookups_total', outcome=outcome)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        expires_at = time.time() + ttl
+        self.memory.set(key, value, expires_at)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value, expires_at)
+
+    def close(self) -> None:
+        self.memory.close()
+        if self.disk is not None:
+            self.disk.close()
@@ -0,0 +1,395 @@
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+import re
+
+# Tokens are (kind, text, first) tuples; 'first' marks the first token on its line, which the
+# extractors use to recover item boundaries in hand-written files that leave out commas.
+Token = Tuple[str, str, bool]
+
+SQL_TOKENS = re.compile(r"""
+    (?P<space>[ \t\r\f\v]+)
+  | (?P<newline>\n)
+  | (?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>'(?:[^']|'')*(?:'|\Z))
+  | (?P<name>"(?:[^"]|"")*"|[A-Za-z_][\w$]*)
+  | (?P<number>\d+(?:\.\d*)?)
+  | (?P<punct>::|<=|>=|<>|!=|\|\||.)
+""", re.S | re.X)
+
+TS_TOKENS = re.compile(r"""
+    (?P<space>[ \t\r\f\v]+)
+  | (?P<newline>\n)
+  | (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>'(?:\\.|[^'\\\n])*'?|"(?:\\.|[^"\\\n])*"?|`(?:\\.|[^`\\])*`?)
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<number>\d[\w.]*)
+  | (?P<punct>=>|\.\.\.|.)
+""", re.S | re.X)
+
+_OPEN = {'(': ')', '[': ']', '{': '}', '<': '>'}
+_CLOSE = {')', ']', '}', '>'}
+_NO_SPACE_BEFORE = {')', ']', ',', '.', '::', '[', ';', '?', ':', '>'}
+_NO_SPACE_AFTER = {'(', '[', '.', '::', '<'}
+# Keywords that keep their space before '(', unlike a type or function name: 'x in (...)'.
+_SPACED_KEYWORDS = {'in', 'and', 'or', 'not', 'exists', 'check', 'key', 'unique', 'as'}
+
+# Words that continue a column definition when they begin a line, rather than start a column.
+_SQL_CONTINUATIONS = {
+    'with', 'without', 'default', 'not', 'null', 'references', 'check', 'on', 'primary', 'unique', 'collate',
+    'generated', 'always', 'as', 'identity', 'deferrable', 'initially', 'match', 'time', 'zone', 'varying', 'precision',
+}
+_SQL_COLUMN_CONSTRAINTS = {'primary', 'not', 'null', 'unique', 'references', 'default', 'check', 'constraint', 'collate', 'generated'}
+_SQL_TABLE_CONSTRAINTS = {'constraint', 'primary', 'unique', 'foreign', 'check', 'exclude'}
+_SQL_CREATE_MODIFIERS = {'or', 'replace', 'temp', 'temporary', 'unlogged', 'global', 'local'}
+
+
+def tokenize(text: str, pattern: Pattern) -> List[Token]:
+    # One pass over the text; whitespace and comments are dropped.
+    tokens, first = [], True
+    for match in pattern.finditer(text):
+        kind = match.lastgroup
+        if kind == 'newline':
+            first = True
+        elif kind != 'space' and kind != 'comment':
+            tokens.append((kind, match.group(), first))
+            first = False
+    return tokens
+
+
+def render(tokens: List[Token]) -> str:
+    # Tokens back to normalized source text, without the comments and line breaks between them.
+    parts, previous = [], None
+    for kind, text, _ in tokens:
+        tight = text in ('(', '<') and previous == 'name' and parts[-1].lower() not in _SPACED_KEYWORDS
+        if parts and not tight and text not in _NO_SPACE_BEFORE and parts[-1] not in _NO_SPACE_AFTER:
+            parts.append(' ')
+        parts.append(text)
+        previous = kind
+    return ''.join(parts)
+
+
+def _word(token: Token) -> Optional[str]:
+    return token[1].lower() if token[0] == 'name' else None
+
+
+def _unquote(name: str) -> str:
+    if len(name) > 1 and name[0] == name[-1] and name[0] in '"\'`':
+        return name[1:-1]
+    return name
+
+
+def _qualified_name(tokens: List[Token], i: int) -> Tuple[Optional[str], int]:
+    # 'schema.table' spelled as name '.' name; returns the name and the index after it.
+    if i >= len(tokens) or tokens[i][0] != 'name':
+        return None, i
+    parts = [_unquote(tokens[i][1])]
+    i += 1
+    while i + 1 < len(tokens) and tokens[i][1] == '.' and tokens[i + 1][0] == 'name':
+        parts.append(_unquote(tokens[i + 1][1]))
+        i += 2
+    return '.'.join(parts), i
+
+
+def _split(tokens: List[Token], separators: set, brackets: Dict[str, str] = None) -> List[List[Token]]:
+    # Splits on separators outside brackets.
+    brackets = brackets or {'(': ')', '[': ']'}
+    items, current, depth = [], [], 0
+    for token in tokens:
+        if token[0] == 'punct' and token[1] in brackets:
+            depth += 1
+        elif token[0] == 'punct' and token[1] in brackets.values():
+            depth -= 1
+        elif depth == 0 and token[0] == 'punct' and token[1] in separators:
+            items.append(current)
+            current = []
+            continue
+        current.append(token)
+    if current:
+        items.append(current)
+    return items
+
+
+def _column_list(tokens: List[Token], i: int) -> Tuple[List[str], int]:
+    # '(a, b)' starting at tokens[i]; an empty list when there is no parenthesized list there.
+    if i >= len(tokens) or tokens[i][1] != '(':
+        return [], i
+    end = _matching(tokens, i)
+    columns = [_unquote(render(item)) for item in _split(tokens[i + 1:end], {','})]
+    return columns, end + 1
+
+
+def _matching(tokens: List[Token], i: int) -> int:
+    # Index of the bracket closing tokens[i], or the last index when it is never closed.
+    close, depth = _OPEN[tokens[i][1]], 0
+    for j in range(i, len(tokens)):
+        if tokens[j][0] != 'punct':
+            continue
+        if tokens[j][1] == tokens[i][1]:
+            depth += 1
+        elif tokens[j][1] == close:
+            depth -= 1
+            if depth == 0:
+                return j
+    return len(tokens) - 1
+
+
+def _sql_table_start(tokens: List[Token], i: int) -> Tuple[Optional[str], int]:
+    # Recognizes 'CREATE [OR REPLACE|TEMP|...] TABLE [IF NOT EXISTS] name (' and the bare
+    # 'schema.table (' form at the start of a line; returns the name and the index after '('.
+    # The bare form must open with a column or table constraint definition, so that a call
+    # such as 'logging.basicConfig(level=...)' is not taken for a table.
+    word = _word(tokens[i])
+    j = i
+    if word == 'create':
+        j += 1
+        while j < len(tokens) and _word(tokens[j]) in _SQL_CREATE_MODIFIERS:
+            j += 1
+        if j >= len(tokens) or _word(tokens[j]) != 'table':
+            return None, i
+        j += 1
+        if [_word(token) for token in tokens[j:j + 3]] == ['if', 'not', 'exists']:
+            j += 3
+    elif word is None or not tokens[i][2] or word in _SQL_CONTINUATIONS or word in _SQL_TABLE_CONSTRAINTS:
+        return None, i
+    name, j = _qualified_name(tokens, j)
+    if name is None or j + 1 >= len(tokens) or tokens[j][1] != '(' or tokens[j + 1][0] != 'name':
+        return None, i
+    if word != 'create' and not _sql_starts_item(tokens, j + 1):
+        return None, i
+    return name, j + 1
+
+
+def _sql_items(tokens: List[Token], i: int) -> Tuple[List[List[Token]], int]:
+    # Column and constraint definitions of a table body starting at tokens[i], split on commas
+    # and, where a comma is missing, on a line that starts a new 'name type' definition.
+    items, current, depth = [], [], 0
+    while i < len(tokens):
+        kind, text, first = tokens[i]
+        if kind == 'punct' and text in '([':
+            depth += 1
+        elif kind == 'punct' and text in ')]':
+            if depth == 0:
+                break
+            depth -= 1
+        elif kind == 'punct' and text == ',' and depth == 0:
+            items.append(current)
+            current = []
+            i += 1
+            continue
+        elif depth == 0 and first and len(current) >= 2 and _sql_starts_item(tokens, i):
+            items.append(current)
+            current = []
+        current.append(tokens[i])
+        i += 1
+    if current:
+        items.append(current)
+    return [item for item in items if item], i + 1
+
+
+def _sql_starts_item(tokens: List[Token], i: int) -> bool:
+    word = _word(tokens[i])
+    if word is None:
+        return False
+    if word in ('constraint', 'foreign'):
+        return True
+    if word == 'primary':
+        return i + 2 < len(tokens) and tokens[i + 2][1] == '('
+    if word == 'unique':
+        return i + 1 < len(tokens) and tokens[i + 1][1] == '('
+    return word not in _SQL_CONTINUATIONS and i + 1 < len(tokens) and tokens[i + 1][0] == 'name'
+
+
+def _sql_references(tokens: List[Token], i: int) -> Tuple[Dict[str, Any], int]:
+    table, i = _qualified_name(tokens, i)
+    columns, i = _column_list(tokens, i)
+    reference = {'table': table, 'columns': columns}
+    while i + 2 < len(tokens) and _word(tokens[i]) == 'on' and _word(tokens[i + 1]) in ('delete', 'update'):
+        action, j = [], i + 2
+        while j < len(tokens) and _word(tokens[j]) in ('cascade', 'restrict', 'set', 'null', 'default', 'no', 'action'):
+            action.append(tokens[j][1].lower())
+            j += 1
+        reference[f"on_{tokens[i + 1][1].lower()}"] = ' '.join(action)
+        i = j
+    return reference, i
+
+
+def _sql_constraint(item: List[Token]) -> Dict[str, Any]:
+    constraint: Dict[str, Any] = {'name': None}
+    i = 0
+    if _word(item[0]) == 'constraint' and len(item) > 1:
+        constraint['name'] = _unquote(item[1][1])
+        i = 2
+    word = _word(item[i]) if i < len(item) else None
+    if word == 'primary':
+        constraint['type'] = 'primary_key'
+        constraint['columns'], _ = _column_list(item, i + 2)
+    elif word == 'unique':
+        constraint['type'] = 'unique'
+        constraint['columns'], _ = _column_list(item, i + 1)
+    elif word == 'foreign':
+        constraint['type'] = 'foreign_key'
+        constraint['columns'], j = _column_list(item, i + 2)
+        if j < len(item) and _word(item[j]) == 'references':
+            constraint['references'], _ = _sql_references(item, j + 1)
+    else:
+        constraint['type'] = word or 'unknown'
+        constraint['expression'] = render(item[i + 1:])
+    return constraint
+
+
+def _sql_column(item: List[Token]) -> Dict[str, Any]:
+    column: Dict[str, Any] = {
+        'name': _unquote(item[0][1]), 'type': None, 'nullable': True, 'primary_key': False, 'unique': False,
+        'default': None, 'references': None, 'check': None,
+    }
+    i = 1
+    while i < len(item) and _word(item[i]) not in _SQL_COLUMN_CONSTRAINTS:
+        i = _matching(item, i) + 1 if item[i][1] in '([' and item[i][0] == 'punct' else i + 1
+    column['type'] = render(item[1:i]) or None
+    while i < len(item):
+        word = _word(item[i])
+        if word == 'primary':
+            column['primary_key'], column['nullable'] = True, False
+            i += 2
+        elif word == 'not' and i + 1 < len(item) and _word(item[i + 1]) == 'null':
+            column['nullable'] = False
+            i += 2
+        elif word == 'unique':
+            column['unique'] = True
+            i += 1
+        elif word == 'references':
+            column['references'], i = _sql_references(item, i + 1)
+        elif word == 'check' and i + 1 < len(item) and item[i + 1][1] == '(':
+            end = _matching(item, i + 1)
+            column['check'] = render(item[i + 2:end])
+            i = end + 1
+        elif word == 'default':
+            start = i = i + 1
+            while i < len(item) and _word(item[i]) not in _SQL_COLUMN_CONSTRAINTS:
+                i = _matching(item, i) + 1 if item[i][1] in '([' and item[i][0] == 'punct' else i + 1
+            column['default'] = render(item[start:i])
+        else:
+            i += 1
+    return column
+
+
+def extract_sql_tables(text: str) -> List[Dict[str, Any]]:
+    # Tables of SQL DDL, as written by CREATE TABLE or the bare 'schema.table (...)' notation
+    # used in hand-written schema files, with their columns, types and constraints.
+    tokens = tokenize(text, SQL_TOKENS)
+    tables, i = [], 0
+    while i < len(tokens):
+        name, body = _sql_table_start(tokens, i)
+        if name is None:
+            i += 1
+            continue
+        items, i = _sql_items(tokens, body)
+        table = {'kind': 'table', 'name': name, 'columns': [], 'constraints': []}
+        for item in items:
+            if _word(item[0]) in _SQL_TABLE_CONSTRAINTS:
+                table['constraints'].append(_sql_constraint(item))
+            else:
+                table['columns'].append(_sql_column(item))
+        for constraint in table['constraints']:
+            if constraint['type'] == 'primary_key':
+                for column in table['columns']:
+                    if column['name'] in constraint['columns']:
+                        column['primary_key'], column['nullable'] = True, False
+        tables.append(table)
+    return tables
+
+
+def _ts_members(tokens: List[Token]) -> List[Dict[str, Any]]:
+    # Members of an interface or object type body, split on ';' and ',' and, where both are
+    # left out, on a line that follows a complete 'name: type' member.
+    members, current, depth = [], [], 0
+    for token in tokens:
+        kind, text, first = token
+        if depth == 0 and first and current and any(t[1] in (':', '(') for t in current):
+            members.append(current)
+            current = []
+        if kind == 'punct' and text in _OPEN:
+            depth += 1
+        elif kind == 'punct' and text in _CLOSE:
+            depth -= 1
+        elif depth == 0 and kind == 'punct' and text in (';', ','):
+            members.append(current)
+            current = []
+            continue
+        current.append(token)
+    if current:
+        members.append(current)
+    fields = []
+    for member in members:
+        if not member:
+            continue
+        field = {'name': None, 'type': None, 'optional': False, 'readonly': False}
+        i = 0
+        if _word(member[0]) == 'readonly' and len(member) > 1 and member[1][1] not in (':', '?', '('):
+            field['readonly'] = True
+            i = 1
+        if member[i][1] == '[':
+            end = _matching(member, i)
+            field['name'] = render(member[i:end + 1])
+            i = end + 1
+        else:
+            field['name'] = _unquote(member[i][1])
+            i += 1
+        if i < len(member) and member[i][1] == '?':
+            field['optional'] = True
+            i += 1
+        if i < len(member) and member[i][1] == ':':
+            i += 1
+        field['type'] = render(member[i:]) or None
+        fields.append(field)
+    return fields
+
+
+def _ts_declaration(tokens: List[Token], i: int) -> Tuple[Optional[Dict[str, Any]], int]:
+    word = tokens[i][1]
+    if i + 1 >= len(tokens) or tokens[i + 1][0] != 'name' or tokens[i][0] != 'name' or word not in ('interface', 'type'):
+        return None, i + 1
+    exported = any(token[1] == 'export' for token in tokens[max(0, i - 2):i])
+    entity: Dict[str, Any] = {'kind': word, 'name': tokens[i + 1][1], 'exported': exported, 'type_parameters': None, 'extends': []}
+    j = i + 2
+    if j < len(tokens) and tokens[j][1] == '<':
+        end = _matching(tokens, j)
+        entity['type_parameters'] = render(tokens[j + 1:end])
+        j = end + 1
+    if word == 'interface':
+        if j < len(tokens) and tokens[j][1] == 'extends':
+            start = j + 1
+            while j < len(tokens) and tokens[j][1] != '{':
+                j = _matching(tokens, j) + 1 if tokens[j][1] == '<' else j + 1
+            entity['extends'] = [render(item) for item in _split(tokens[start:j], {','}, {'<': '>'})]
+    elif j < len(tokens) and tokens[j][1] == '=':
+        j += 1
+    else:
+        return None, i + 1
+    if j >= len(tokens) or tokens[j][1] != '{':
+        # A type alias that is not an object type, e.g. 'type Id = string | number'.
+        if word != 'type':
+            return None, i + 1
+        start = j
+        while j < len(tokens) and tokens[j][1] != ';' and not (j > start and tokens[j][2]):
+            j = _matching(tokens, j) + 1 if tokens[j][1] in _OPEN and tokens[j][1] != '<' else j + 1
+        entity['definition'] = render(tokens[start:j])
+        entity['fields'] = []
+        return entity, j
+    end = _matching(tokens, j)
+    entity['fields'] = _ts_members(tokens[j + 1:end])
+    return entity, end + 1
+
+
+def extract_typescript_types(text: str) -> List[Dict[str, Any]]:
+    # Interfaces and type aliases of TypeScript sources and declaration files, with their
+    # fields and field types. Everything else in the file is skipped over.
+    tokens = tokenize(text, TS_TOKENS)
+    entities, i = [], 0
+    while i < len(tokens):
+        if tokens[i][0] == 'name' and tokens[i][1] in ('interface', 'type'):
+            entity, i = _ts_declaration(tokens, i)
+            if entity is not None:
+                entities.append(entity)
+        else:
+            i += 1
+    return entities
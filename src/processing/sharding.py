@@ -0,0 +1,121 @@
+from typing import Any, Dict, List, Optional, Tuple
+import glob
+import hashlib
+import heapq
+import os
+import re
+
+from src.processing.output_writer import ShardedOutputWriter, open_output, read_index
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
+
+_SHARD_SPEC = re.compile(r'^(\d+)/(\d+)$')
+_SHARD_SUFFIX = re.compile(r'\.shard-(\d{5})-of-(\d{5})')
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    # '--shard i/N' with a zero-based worker index: 0/4 .. 3/4.
+    match = _SHARD_SPEC.match(spec.strip())
+    if not match:
+        raise ValueError(f"Invalid shard '{spec}', expected i/N")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1:
+        raise ValueError(f"Invalid shard '{spec}', N must be at least 1")
+    if index >= count:
+        raise ValueError(f"Invalid shard '{spec}', index must be in 0..{count - 1}")
+    return index, count
+
+
+def stable_hash(key: str) -> int:
+    # Independent of PYTHONHASHSEED, so every worker and node computes the same value.
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def assign_shards(files: List[Tuple[str, int]], count: int) -> Dict[str, int]:
+    # Largest-first greedy assignment to the least-loaded shard. Files are ordered by size,
+    # then by stable hash of their input-relative path, and load ties go to the lower shard,
+    # so any worker given the same listing derives the same plan without coordination.
+    loads = [(0, shard) for shard in range(count)]
+    assignment = {}
+    for key, size in sorted(files, key=lambda item: (-item[1], stable_hash(item[0]), item[0])):
+        load, shard = heapq.heappop(loads)
+        assignment[key] = shard
+        # Empty files still count one byte, so many of them spread out instead of piling onto one shard.
+        heapq.heappush(loads, (load + max(size, 1), shard))
+    return assignment
+
+
+def shard_output_file(output_file: str, index: int, count: int) -> str:
+    stem, extension = os.path.splitext(output_file)
+    return f"{stem}.shard-{index:05d}-of-{count:05d}{extension or '.jsonl'}"
+
+
+def find_shard_outputs(output_file: str, count: Optional[int] = None) -> List[str]:
+    # Shard output files for output_file, in shard order. Without count, the set is discovered
+    # from the files on disk and must be complete and from a single N.
+    stem, extension = os.path.splitext(output_file)
+    extension = extension or '.jsonl'
+    if count is None:
+        # Compressed or rolled shard outputs leave at least their index behind under the shard name.
+        counts = set()
+        for path in glob.glob(f"{glob.escape(stem)}.shard-*-of-*{extension}*"):
+            match = _SHARD_SUFFIX.match(path, len(stem))
+            if match and path[match.end():].startswith(extension):
+                counts.add(int(match.group(2)))
+        if len(counts) != 1:
+            raise ValueError(f"Expected shard outputs of a single run next to {output_file}, found counts {sorted(counts)}")
+        count = counts.pop()
+    paths = [shard_output_file(output_file, index, count) for index in range(count)]
+    missing = [path for path in paths if not all(os.path.exists(shard) for shard in read_index(path))]
+    if missing:
+        raise FileNotFoundError(f"Missing shard outputs: {', '.join(missing)}")
+    return paths
+
+
+class ShardMerger:
+    # Combines per-worker shard outputs into one dataset, streaming records in shard order and
+    # keeping only the first record seen for each id. Ids are held as 8-byte digests so the
+    # merge stays small in memory for large datasets.
+
+    def __init__(self, options: Dict = None, output_options: Dict = None):
+        # Options come from the 'sharding_options' config block.
+        options = options or {}
+        self.id_field = options.get('id_field', 'file_path')
+        self.output_options = output_options or {}
+        self.stats = {'shards': 0, 'records': 0, 'written': 0, 'duplicates': 0, 'invalid': 0}
+
+    async def merge(self, shard_outputs: List[str], output_file: str) -> Dict[str, Any]:
+        writer = ShardedOutputWriter(output_file, self.output_options)
+        seen = set()
+        try:
+            for shard_output in shard_outputs:
+                self.stats['shards'] += 1
+                for path in read_index(shard_output):
+                    with open_output(path, 'rb') as f:
+                        for line in f:
+                            if not line.strip():
+                                continue
+                            self.stats['records'] += 1
+                            try:
+                                record_id = _loads(line).get(self.id_field)
+                            except (ValueError, AttributeError):
+                                self.stats['invalid'] += 1
+                                continue
+                            if record_id is not None:
+                                digest = hashlib.blake2b(str(record_id).encode('utf-8'), digest_size=8).digest()
+                                if digest in seen:
+                                    self.stats['duplicates'] += 1
+                                    continue
+                                seen.add(digest)
+                            await writer.write(line.rstrip(b'\n') + b'\n')
+                            self.stats['written'] += 1
+            outputs = await writer.commit()
+        except BaseException:
+            writer.abort()
+            raise
+        return {**self.stats, 'outputs': outputs}
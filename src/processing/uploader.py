@@ -0,0 +1,363 @@
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterable, Callable, Dict, IO, Iterable, List, Optional, Tuple
+import argparse
+import asyncio
+import hashlib
+import importlib
+import json
+import os
+import random
+import shutil
+import sys
+import time
+import uuid
+
+from src.utils import LoggerService
+from src.telemetry import Telemetry
+
+
+class UploadSink(ABC):
+    # Destination of chunked uploads. An upload is begun (or resumed by id), receives chunks in
+    # any order, each with its sha256, and is completed with the whole-file sha256 and the
+    # ordered chunk hashes; the sink verifies both and only then publishes the file.
+
+    @abstractmethod
+    async def begin(self, name: str, size: int, chunk_bytes: int, upload_id: Optional[str] = None) -> Tuple[str, Optional[Dict[str, str]]]:
+        # Returns (upload id, {chunk index: sha256} already held), or None when the sink cannot tell.
+        ...
+
+    @abstractmethod
+    async def put_chunk(self, upload_id: str, index: int, data: bytes, sha256: str) -> None:
+        ...
+
+    @abstractmethod
+    async def complete(self, upload_id: str, name: str, size: int, sha256: str, chunk_hashes: List[str]) -> None:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalDirectorySink(UploadSink):
+    # Assembles uploads into a directory: chunks are kept under '.uploads/<id>/' until the
+    # upload completes. Also the storage behind the HTTP stand-in server in benchmarks/.
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _parts(self, upload_id: str) -> str:
+        if not upload_id or os.sep in upload_id or upload_id.startswith('.'):
+            raise ValueError(f"Invalid upload id: {upload_id!r}")
+        return os.path.join(self.directory, '.uploads', upload_id)
+
+    async def begin(self, name: str, size: int, chunk_bytes: int, upload_id: Optional[str] = None) -> Tuple[str, Optional[Dict[str, str]]]:
+        return await asyncio.to_thread(self._begin, upload_id)
+
+    def _begin(self, upload_id: Optional[str]) -> Tuple[str, Dict[str, str]]:
+        if upload_id is None or not os.path.isdir(self._parts(upload_id)):
+            upload_id = uuid.uuid4().hex
+            os.makedirs(self._parts(upload_id))
+            return upload_id, {}
+        held = {}
+        for entry in os.listdir(self._parts(upload_id)):
+            index, _, digest = entry.partition('.')
+            if digest and not digest.endswith('.tmp'):
+                held[index] = digest
+        return upload_id, held
+
+    async def put_chunk(self, upload_id: str, index: int, data: bytes, sha256: str) -> None:
+        await asyncio.to_thread(self._put_chunk, upload_id, index, data, sha256)
+
+    def _put_chunk(self, upload_id: str, index: int, data: bytes, sha256: str) -> None:
+        if hashlib.sha256(data).hexdigest() != sha256:
+            raise ValueError(f"Chunk {index} of upload {upload_id} does not match its sha256")
+        parts = self._parts(upload_id)
+        for entry in os.listdir(parts):
+            if entry.partition('.')[0] == str(index):
+                os.remove(os.path.join(parts, entry))
+        path = os.path.join(parts, f"{index}.{sha256}")
+        with open(f"{path}.tmp", 'wb') as f:
+            f.write(data)
+        os.replace(f"{path}.tmp", path)
+
+    async def complete(self, upload_id: str, name: str, size: int, sha256: str, chunk_hashes: List[str]) -> None:
+        await asyncio.to_thread(self._complete, upload_id, name, size, sha256, chunk_hashes)
+
+    def _complete(self, upload_id: str, name: str, size: int, sha256: str, chunk_hashes: List[str]) -> None:
+        parts = self._parts(upload_id)
+        target = os.path.normpath(os.path.join(self.directory, name))
+        if not target.startswith(os.path.normpath(self.directory) + os.sep):
+            raise ValueError(f"Invalid upload name: {name!r}")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        digest, written = hashlib.sha256(), 0
+        with open(f"{target}.tmp", 'wb') as out:
+            for index, chunk_hash in enumerate(chunk_hashes):
+                path = os.path.join(parts, f"{index}.{chunk_hash}")
+                if not os.path.exists(path):
+                    raise ValueError(f"Upload {upload_id} is missing chunk {index} with sha256 {chunk_hash}")
+                with open(path, 'rb') as f:
+                    while block := f.read(1024 * 1024):
+                        digest.update(block)
+                        out.write(block)
+                        written += len(block)
+        if written != size or digest.hexdigest() != sha256:
+            os.remove(f"{target}.tmp")
+            raise ValueError(f"Upload {upload_id} assembled to {written} bytes with sha256 {digest.hexdigest()}, "
+                             f"expected {size} bytes with sha256 {sha256}")
+        os.replace(f"{target}.tmp", target)
+        shutil.rmtree(parts)
+
+
+class HttpSink(UploadSink):
+    # Chunked upload over HTTP:
+    #   POST {url}/uploads                      {"name", "size", "chunk_bytes", "upload_id"?} -> {"upload_id", "chunks"}
+    #   PUT  {url}/uploads/{id}/chunks/{index}  raw bytes, X-Chunk-SHA256 header
+    #   POST {url}/uploads/{id}/complete        {"name", "size", "sha256", "chunks"}
+    # benchmarks/upload_stub_server.py implements it on top of LocalDirectorySink.
+
+    def __init__(self, url: str, options: Dict = None):
+        options = options or {}
+        self.url = url.rstrip('/')
+        self.timeout = options.get('timeout', 300)
+        self.headers = options.get('headers', {})
+        self.limit = options.get('workers', 4)
+        self.session = None
+
+    def _get_session(self):
+        import aiohttp
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.limit),
+                                                 timeout=aiohttp.ClientTimeout(total=self.timeout), headers=self.headers)
+        return self.session
+
+    async def begin(self, name: str, size: int, chunk_bytes: int, upload_id: Optional[str] = None) -> Tuple[str, Optional[Dict[str, str]]]:
+        body = {'name': name, 'size': size, 'chunk_bytes': chunk_bytes, 'upload_id': upload_id}
+        async with self._get_session().post(f"{self.url}/uploads", json=body) as response:
+            response.raise_for_status()
+            result = await response.json()
+        return result['upload_id'], result.get('chunks')
+
+    async def put_chunk(self, upload_id: str, index: int, data: bytes, sha256: str) -> None:
+        async with self._get_session().put(f"{self.url}/uploads/{upload_id}/chunks/{index}", data=data,
+                                           headers={'X-Chunk-SHA256': sha256}) as response:
+            response.raise_for_status()
+
+    async def complete(self, upload_id: str, name: str, size: int, sha256: str, chunk_hashes: List[str]) -> None:
+        body = {'name': name, 'size': size, 'sha256': sha256, 'chunks': chunk_hashes}
+        async with self._get_session().post(f"{self.url}/uploads/{upload_id}/complete", json=body) as response:
+            response.raise_for_status()
+
+    async def close(self) -> None:
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+
+SINKS = {
+    'local': lambda options: LocalDirectorySink(options['directory']),
+    'http': lambda options: HttpSink(options['url'], options),
+}
+
+
+def create_sink(options: Dict) -> UploadSink:
+    # upload_options.sink is 'local', 'http', or 'package.module:ClassName' for a custom sink,
+    # which is constructed with the upload_options dict.
+    sink = options.get('sink')
+    if sink in SINKS:
+        return SINKS[sink](options)
+    if sink and ':' in sink:
+        module_name, class_name = sink.split(':', 1)
+        return getattr(importlib.import_module(module_name), class_name)(options)
+    raise ValueError(f"Unknown upload sink: {sink!r}")
+
+
+class ChunkedUploader:
+    # Uploads files in fixed-size chunks over a bounded pool of workers, a few files at a time. Each file is read once,
+    # sequentially, computing the whole-file and per-chunk sha256 as it goes; chunks the sink
+    # already holds with the same hash are not sent again. Progress is kept in a JSON upload
+    # manifest, so an interrupted upload resumes with the same upload id.
+
+    def __init__(self, options: Dict, manifest_file: str):
+        # Options come from the 'upload_options' config block.
+        self.chunk_bytes = options.get('chunk_bytes', 8 * 1024 * 1024)
+        self.workers = max(1, options.get('workers', 4))
+        # Each file in flight buffers up to about 3 * workers chunks, so the number of files read
+        # at once is bounded too, however many shards are handed over together.
+        self.files_in_flight = asyncio.Semaphore(max(1, options.get('files_in_flight', 2)))
+        self.retries = options.get('retries', 3)
+        self.backoff_base = options.get('backoff_base', 0.5)
+        self.backoff_max = options.get('backoff_max', 30)
+        self.save_interval = options.get('save_interval', 2.0)
+        self.prefix = options.get('prefix', '')
+        self.sink = create_sink(options)
+        self.manifest_file = manifest_file
+        self.manifest = self._load_manifest()
+        self.slots = asyncio.Semaphore(self.workers)
+        self.last_save = 0.0
+        self.logger = LoggerService.get_instance()
+        self.telemetry = Telemetry.get_instance()
+        self.stats = {'files': 0, 'files_skipped': 0, 'chunks': 0, 'chunks_skipped': 0, 'bytes': 0, 'retries': 0}
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_file, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'files': {}}
+
+    def _save_manifest(self, force: bool = True) -> None:
+        if not force and time.monotonic() - self.last_save < self.save_interval:
+            return
+        self.last_save = time.monotonic()
+        os.makedirs(os.path.dirname(os.path.abspath(self.manifest_file)), exist_ok=True)
+        temp_path = f"{self.manifest_file}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f)
+        os.replace(temp_path, self.manifest_file)
+
+    async def upload_stream(self, paths: AsyncIterable[str], on_uploaded: Optional[Callable[[str], None]] = None) -> List[Dict[str, Any]]:
+        # Starts on each path as it arrives, e.g. output shards as the writer closes them.
+        tasks = []
+        try:
+            async for path in paths:
+                tasks.append(asyncio.create_task(self._upload_and_notify(path, on_uploaded)))
+            return list(await asyncio.gather(*tasks))
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._save_manifest()
+
+    async def upload_all(self, paths: Iterable[str]) -> List[Dict[str, Any]]:
+        try:
+            return list(await asyncio.gather(*(self.upload_file(path) for path in paths)))
+        finally:
+            self._save_manifest()
+
+    async def _upload_and_notify(self, path: str, on_uploaded: Optional[Callable[[str], None]]) -> Dict[str, Any]:
+        entry = await self.upload_file(path)
+        if on_uploaded is not None:
+            on_uploaded(path)
+        return entry
+
+    async def upload_file(self, path: str, name: Optional[str] = None) -> Dict[str, Any]:
+        async with self.files_in_flight:
+            return await self._upload_file(path, name)
+
+    async def _upload_file(self, path: str, name: Optional[str]) -> Dict[str, Any]:
+        stat = await asyncio.to_thread(os.stat, path)
+        name = self.prefix + (name or os.path.basename(path))
+        key = os.path.abspath(path)
+        signature = {'name': name, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'chunk_bytes': self.chunk_bytes}
+        entry = self.manifest['files'].get(key)
+        if entry is not None and all(entry.get(field) == value for field, value in signature.items()):
+            if entry.get('complete'):
+                self.stats['files_skipped'] += 1
+                return entry
+        else:
+            entry = self.manifest['files'][key] = {**signature, 'upload_id': None, 'chunks': {}, 'complete': False}
+        upload_id, held = await self.sink.begin(name, stat.st_size, self.chunk_bytes, entry['upload_id'])
+        if upload_id != entry['upload_id']:
+            entry['chunks'] = {}
+        entry['upload_id'] = upload_id
+        held = entry['chunks'] if held is None else held
+        self._save_manifest()
+
+        count = max(1, -(-stat.st_size // self.chunk_bytes))
+        chunk_hashes: List[Optional[str]] = [None] * count
+        whole = hashlib.sha256()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+
+        async def read_chunks() -> None:
+            with open(path, 'rb') as f:
+                for index in range(count):
+                    data, digest = await asyncio.to_thread(self._read_chunk, f, whole)
+                    chunk_hashes[index] = digest
+                    if held.get(str(index)) == digest:
+                        self.stats['chunks_skipped'] += 1
+                        entry['chunks'][str(index)] = digest
+                        continue
+                    await queue.put((index, data, digest))
+            for _ in range(self.workers):
+                await queue.put(None)
+
+        async def send_chunks() -> None:
+            while (item := await queue.get()) is not None:
+                index, data, digest = item
+                await self._put_chunk(upload_id, index, data, digest)
+                entry['chunks'][str(index)] = digest
+                self._save_manifest(force=False)
+
+        tasks = [asyncio.create_task(read_chunks())] + [asyncio.create_task(send_chunks()) for _ in range(self.workers)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._save_manifest()
+        entry['sha256'] = whole.hexdigest()
+        await self.sink.complete(upload_id, name, stat.st_size, entry['sha256'], chunk_hashes)
+        entry['complete'] = True
+        self.stats['files'] += 1
+        self._save_manifest()
+        return entry
+
+    def _read_chunk(self, f: IO[bytes], whole: 'hashlib._Hash') -> Tuple[bytes, str]:
+        data = f.read(self.chunk_bytes)
+        whole.update(data)
+        return data, hashlib.sha256(data).hexdigest()
+
+    async def _put_chunk(self, upload_id: str, index: int, data: bytes, digest: str) -> None:
+        # The semaphore bounds chunks in flight across every file being uploaded.
+        async with self.slots:
+            for attempt in range(self.retries + 1):
+                try:
+                    with self.telemetry.span('upload.chunk', f"{upload_id}/{index}"):
+                        await self.sink.put_chunk(upload_id, index, data, digest)
+                    break
+                except Exception as e:
+                    if attempt >= self.retries:
+                        raise
+                    self.stats['retries'] += 1
+                    self.telemetry.increment('upload_retries_total')
+                    await self.logger.log("warning", f"Retrying chunk {index} of upload {upload_id}: {e}")
+                    await asyncio.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+        self.stats['chunks'] += 1
+        self.stats['bytes'] += len(data)
+        self.telemetry.increment('upload_chunks_total')
+        self.telemetry.increment('upload_bytes_total', len(data))
+
+    async def close(self) -> None:
+        await self.sink.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Upload an output file, or every shard in its index, in verified chunks")
+    parser.add_argument('output_file')
+    parser.add_argument('--config', default='config.json', help="Read upload_options from this config file")
+    parser.add_argument('--sink', help="'local', 'http' or package.module:ClassName")
+    parser.add_argument('--url')
+    parser.add_argument('--directory')
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args(argv)
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, encoding='utf-8') as f:
+            config = json.load(f)
+    options = config.get('upload_options', {})
+    options.update({key: value for key, value in (('sink', args.sink), ('url', args.url), ('directory', args.directory),
+                                                  ('workers', args.workers)) if value is not None})
+    # Like the CLI's light commands, an upload never scores its log lines, so it never loads NLP models.
+    LoggerService.get_instance().configure({**config.get('logging_options', {}), 'sentiment_enabled': False})
+    stats = asyncio.run(_upload(args.output_file, options))
+    return 0 if stats is not None else 1
+
+
+async def _upload(output_file: str, options: Dict) -> Optional[Dict[str, int]]:
+    from src.commands.cli_operations import CLIOperations
+    try:
+        return await CLIOperations().upload_output(output_file, options)
+    finally:
+        await LoggerService.get_instance().close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import json
+import os
+import time
+import tracemalloc
+
+# Upper bounds (seconds) of the span duration histogram buckets in the Prometheus dump.
+_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, float('inf'))
+
+
+class _NullSpan:
+    # Returned by span() while telemetry is disabled, so instrumented code pays one attribute check.
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('telemetry', 'name', 'file', 'start')
+
+    def __init__(self, telemetry: 'Telemetry', name: str, file: Optional[str]):
+        self.telemetry = telemetry
+        self.name = name
+        self.file = file
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *_):
+        self.telemetry._record_span(self.name, self.file, time.perf_counter() - self.start, exc_type is not None)
+        return False
+
+
+def subject_label(subject: Any) -> Optional[str]:
+    # Pipeline items are either paths or task dicts carrying a 'file_path'.
+    if isinstance(subject, dict):
+        return subject.get('file_path')
+    return subject if isinstance(subject, str) else None
+
+
+class Telemetry:
+    # Process-wide spans, counters and gauges. Spans are written to a JSON-lines trace as they
+    # close, gauges and tracemalloc top-N reports are sampled periodically, and stop() writes
+    # all aggregates as Prometheus text. Every entry point returns at once while disabled.
+    _instance = None
+
+    def __init__(self, options: Dict = None):
+        self.trace = None
+        self.sampler: Optional[asyncio.Task] = None
+        self.gauge_sources: Dict[str, Callable[[], Dict[str, float]]] = {}
+        self.started_tracemalloc = False
+        self.configure(options or {})
+
+    @classmethod
+    def get_instance(cls, options: Dict = None) -> 'Telemetry':
+        if cls._instance is None:
+            cls._instance = cls(options)
+        return cls._instance
+
+    def configure(self, options: Dict) -> None:
+        # Options come from the 'telemetry_options' config block.
+        self.enabled = options.get('enabled', False)
+        self.trace_file = options.get('trace_file', './mock/output/trace.jsonl')
+        self.metrics_file = options.get('metrics_file', './mock/output/metrics.prom')
+        self.sample_interval = options.get('sample_interval', 1.0)
+        self.tracemalloc_interval = options.get('tracemalloc_interval', 0)
+        self.tracemalloc_top = options.get('tracemalloc_top', 10)
+        self.slowest_per_span = options.get('slowest_per_span', 5)
+        self.counters: Dict[Tuple[str, tuple], float] = {}
+        self.gauges: Dict[Tuple[str, tuple], float] = {}
+        self.spans: Dict[str, Dict[str, Any]] = {}
+
+    def span(self, name: str, subject: Any = None):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, subject_label(subject))
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        if not self.enabled:
+            return
+        self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def watch(self, name: str, source: Callable[[], Dict[str, float]]) -> None:
+        # source returns {label value: gauge value}, e.g. StreamingPipeline.queue_depths.
+        self.gauge_sources[name] = source
+
+    def start(self) -> None:
+        if not self.enabled or self.sampler is not None:
+            return
+        if self.tracemalloc_interval and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracemalloc = True
+        self.sampler = asyncio.create_task(self._sample_periodically())
+
+    async def stop(self) -> None:
+        if self.sampler is None:
+            return
+        self.sampler.cancel()
+        try:
+            await self.sampler
+        except asyncio.CancelledError:
+            pass
+        self.sampler = None
+        self._sample_gauges()
+        if self.started_tracemalloc:
+            self._report_allocations()
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+        self.write_metrics()
+        if self.trace is not None:
+            self.trace.flush()
+
+    def close(self) -> None:
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+    def slowest(self, name: str) -> List[Tuple[float, str]]:
+        return sorted(self.spans.get(name, {}).get('slowest', []), reverse=True)
+
+    def _record_span(self, name: str, file: Optional[str], duration: float, failed: bool) -> None:
+        aggregate = self.spans.get(name)
+        if aggregate is None:
+            aggregate = self.spans[name] = {'count': 0, 'sum': 0.0, 'errors': 0, 'buckets': [0] * len(_BUCKETS), 'slowest': []}
+        aggregate['count'] += 1
+        aggregate['sum'] += duration
+        aggregate['errors'] += failed
+        for index, bound in enumerate(_BUCKETS):
+            if duration <= bound:
+                aggregate['buckets'][index] += 1
+                break
+        if file is not None:
+            # A small min-heap keeps the slowest files per span without storing them all.
+            entry = (duration, file)
+            if len(aggregate['slowest']) < self.slowest_per_span:
+                heapq.heappush(aggregate['slowest'], entry)
+            elif entry > aggregate['slowest'][0]:
+                heapq.heapreplace(aggregate['slowest'], entry)
+        self._emit({'type': 'span', 'name': name, 'file': file, 'duration_ms': round(duration * 1000, 3), 'error': failed})
+
+    def _emit(self, event: Dict) -> None:
+        if self.trace is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.trace_file)), exist_ok=True)
+            self.trace = open(self.trace_file, 'a', encoding='utf-8')
+        event['ts'] = round(time.time(), 6)
+        self.trace.write(json.dumps(event) + '\n')
+
+    async def _sample_periodically(self) -> None:
+        next_allocation_report = time.monotonic() + self.tracemalloc_interval
+        while True:
+            await asyncio.sleep(self.sample_interval)
+            self._sample_gauges()
+            if self.tracemalloc_interval and time.monotonic() >= next_allocation_report:
+                self._report_allocations()
+                next_allocation_report = time.monotonic() + self.tracemalloc_interval
+
+    def _sample_gauges(self) -> None:
+        for name, source in self.gauge_sources.items():
+            values = source()
+            for label, value in values.items():
+                self.gauges[(name, (('stage', label),))] = value
+            self._emit({'type': 'gauge', 'name': name, 'values': values})
+
+    def _report_allocations(self) -> None:
+        if not tracemalloc.is_tracing():
+            return
+        statistics = tracemalloc.take_snapshot().statistics('lineno')[:self.tracemalloc_top]
+        current, peak = tracemalloc.get_traced_memory()
+        self._emit({
+            'type': 'tracemalloc',
+            'current_kb': current // 1024,
+            'peak_kb': peak // 1024,
+            'top': [{'location': str(stat.traceback[0]), 'size_kb': stat.size // 1024, 'count': stat.count} for stat in statistics],
+        })
+
+    def write_metrics(self) -> None:
+        lines = []
+        for kind, values in (('counter', self.counters), ('gauge', self.gauges)):
+            for name in sorted({name for name, _ in values}):
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{name}{_labels(labels)} {value}" for (metric, labels), value in sorted(values.items()) if metric == name)
+        if self.spans:
+            lines.append("# TYPE span_duration_seconds histogram")
+        for name, aggregate in sorted(self.spans.items()):
+            cumulative = 0
+            for bound, count in zip(_BUCKETS, aggregate['buckets']):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"span_duration_seconds_bucket{_labels((('span', name), ('le', le)))} {cumulative}")
+            lines.append(f"span_duration_seconds_sum{_labels((('span', name),))} {aggregate['sum']:.6f}")
+            lines.append(f"span_duration_seconds_count{_labels((('span', name),))} {aggregate['count']}")
+        os.makedirs(os.path.dirname(os.path.abspath(self.metrics_file)), exist_ok=True)
+        tmp_path = f"{self.metrics_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.metrics_file)
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
@@ -1,48 +1,127 @@
-from typing import List, Dict
+from typing import AsyncIterator, Dict, Iterator, List
 import os
 import re
 import json
 import subprocess
 import aiofiles
-import aiohttp
 import logging
 import asyncio
+import random
+import threading
+import time
+from src.telemetry import Telemetry
 class LoggerService:
     _instance = None
-    _lock = asyncio.Lock()
 
-    def __new__(cls, name: str, alert_range: tuple[int, int] = (30, 40)):
+    def __new__(cls, name: str = "LoggerService", alert_range: tuple[int, int] = (30, 40)):
         if cls._instance is None:
             cls._instance = super(LoggerService, cls).__new__(cls)
             cls._instance._setup(name, alert_range)
         return cls._instance
 
     @classmethod
-    async def get_instance(cls, name: str, alert_range: tuple[int, int] = (30, 40)):
+    def get_instance(cls, name: str = "LoggerService", alert_range: tuple[int, int] = (30, 40)):
         if cls._instance is None:
             cls._instance = cls(name, alert_range)
         return cls._instance
 
     def _setup(self, name: str, alert_range: tuple[int, int] = (30, 40)):
-        import sys
-        sys.path.append('src/processing')
-        from processing.context_extractor import analyze_sentiment
-
         self.logger = self._initialize_logger(name, alert_range)
-        self.lock = self._lock
-        self.sentiment_analyzer = analyze_sentiment()
         self.mood_color_mapper = MoodColorMapper()
         self.alert_range = alert_range
         self.subscribers = []
+        self.sentiment_analyzer = None
+        self.dropped = 0
+        self._loop = None
+        self._queue = None
+        self._drain_task = None
+        self._sentiment_cache: Dict[str, str] = {}
+        self.configure({})
+
+    def configure(self, options: Dict, sentiment_analyzer=None) -> None:
+        # Options come from the 'logging_options' config block.
+        self.sentiment_enabled = options.get('sentiment_enabled', True)
+        self.batch_size = options.get('batch_size', 64)
+        self.queue_size = options.get('queue_size', 10000)
+        self.subscriber_queue_size = options.get('subscriber_queue_size', 1000)
+        # 'drop_newest', 'drop_oldest' or 'block' when a subscriber queue is full.
+        self.overflow_policy = options.get('overflow_policy', 'drop_newest')
+        self.sentiment_cache_size = options.get('sentiment_cache_size', 4096)
+        self.sentiment_analyzer = sentiment_analyzer or self.sentiment_analyzer
 
     async def log(self, level: str, message: str, *_args, **_kwargs) -> None:
-        sentiment_level = await self.sentiment_analyzer.analyze_sentiment(message)
-        adjusted_level = self._adjust_log_level(level, sentiment_level)
-        async with self.lock:
-            log_method = getattr(self.logger, adjusted_level)
-            log_message = f"{message}"
-            log_method(log_message, *_args, **_kwargs)
-            await self._publish_to_subscribers(log_message)
+        # Enqueue and return; scoring, emitting and fan-out happen on the drain task.
+        self._bind_loop()
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = asyncio.create_task(self._drain())
+        try:
+            self._queue.put_nowait((level, f"{message}", _args, _kwargs))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def _bind_loop(self) -> None:
+        # Queues belong to the loop that first used them; a fresh asyncio.run() needs new ones.
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._drain_task = None
+        for subscription in self.subscribers:
+            subscription.queue = asyncio.Queue(maxsize=self.subscriber_queue_size)
+            subscription.task = None
+
+    async def _drain(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                sentiments = await self._score_batch([message for _, message, _, _ in batch])
+                for (level, message, args, kwargs), sentiment_level in zip(batch, sentiments):
+                    adjusted_level = self._adjust_log_level(level, sentiment_level)
+                    self.logger.log(self._level_number(adjusted_level), message, *args, **kwargs)
+                    await self._publish_to_subscribers(message)
+            except Exception as e:
+                self.logger.error(f"LoggerService failed to process a batch of {len(batch)} messages: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _score_batch(self, messages: List[str]) -> List[str]:
+        if not self.sentiment_enabled:
+            return ['neutral'] * len(messages)
+        if self.sentiment_analyzer is None:
+            from src.processing.context_extractor import ContextExtractor
+            self.sentiment_analyzer = ContextExtractor({})
+        templates = [self._message_template(message) for message in messages]
+        unscored = list({template: message for template, message in zip(templates, messages)
+                         if template not in self._sentiment_cache}.items())
+        if unscored:
+            try:
+                results = await self.sentiment_analyzer.analyze_sentiment_batch([message for _, message in unscored])
+            except Exception as e:
+                # Never lose log lines because the model is unavailable; carry on unscored.
+                self.logger.warning(f"Disabling log sentiment scoring: {e}")
+                self.sentiment_enabled = False
+                return ['neutral'] * len(messages)
+            for (template, _), sentiment_level in zip(unscored, results):
+                if len(self._sentiment_cache) >= self.sentiment_cache_size:
+                    self._sentiment_cache.pop(next(iter(self._sentiment_cache)))
+                self._sentiment_cache[template] = sentiment_level
+        return [self._sentiment_cache.get(template, 'neutral') for template in templates]
+
+    @staticmethod
+    def _message_template(message: str) -> str:
+        # Messages that differ only in numbers, quoted values or paths share a sentiment score.
+        return _LOG_TEMPLATE_PATTERN.sub('#', message)
+
+    def _level_number(self, level: str) -> int:
+        if level.isdigit():
+            return int(level)
+        level_number = logging.getLevelName(level.upper())
+        return level_number if isinstance(level_number, int) else logging.ERROR
+
     def _adjust_log_level(self, original_level: str, sentiment_level: str) -> str:
         if original_level.isdigit():
             original_level_num = int(original_level)
@@ -59,11 +138,60 @@ class LoggerService:
         return logging.getLogger(name)
 
     def subscribe(self, subscriber):
-        self.subscribers.append(subscriber)
+        # Each subscriber gets its own bounded queue and task, so a slow one cannot stall the rest.
+        queue = asyncio.Queue(maxsize=self.subscriber_queue_size)
+        self.subscribers.append(_Subscription(subscriber, queue))
 
     async def _publish_to_subscribers(self, message):
-        for subscriber in self.subscribers:
-            await subscriber.receive(message)
+        for subscription in self.subscribers:
+            subscription.ensure_running()
+            if self.overflow_policy == 'block':
+                await subscription.queue.put(message)
+                continue
+            if subscription.queue.full():
+                subscription.dropped += 1
+                if self.overflow_policy != 'drop_oldest':
+                    continue
+                subscription.queue.get_nowait()
+                subscription.queue.task_done()
+            subscription.queue.put_nowait(message)
+
+    async def flush(self) -> None:
+        if self._queue is not None:
+            await self._queue.join()
+        await asyncio.gather(*(subscription.queue.join() for subscription in self.subscribers))
+
+    async def close(self) -> None:
+        await self.flush()
+        for task in [self._drain_task] + [subscription.task for subscription in self.subscribers]:
+            if task is not None:
+                task.cancel()
+        self._drain_task = None
+
+
+_LOG_TEMPLATE_PATTERN = re.compile(r"\d+(?:\.\d+)?|'[^']*'|\"[^\"]*\"|(?:\.{0,2}/)?(?:[\w.-]+/)+[\w.-]*")
+
+
+class _Subscription:
+    def __init__(self, subscriber, queue: asyncio.Queue):
+        self.subscriber = subscriber
+        self.queue = queue
+        self.task = None
+        self.dropped = 0
+
+    def ensure_running(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._consume())
+
+    async def _consume(self) -> None:
+        while True:
+            message = await self.queue.get()
+            try:
+                await self.subscriber.receive(message)
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Log subscriber {self.subscriber!r} failed: {e}")
+            finally:
+                self.queue.task_done()
 
 
 class MoodColorMapper:
@@ -102,47 +230,248 @@ class ConfigManager:
         except json.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON format in {self.config_path}.") from e
         return self.config
+def request_key(method: str, url: str, params: Dict = None, headers: Dict = None, body: Dict = None) -> str:
+    # Stable across dict ordering, so logically identical requests map to the same key.
+    return json.dumps([method.upper(), url, params or {}, headers or {}, body or {}], sort_keys=True, default=str)
+
+
 class RequestManager:
-    def __init__(self, logger: LoggerService) -> None:
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, logger: LoggerService, options: Dict = None) -> None:
+        # Options come from the 'http_options' config block.
+        options = options or {}
         self.logger = logger
+        self.limit = options.get('limit', 100)
+        self.limit_per_host = options.get('limit_per_host', 10)
+        self.timeout = options.get('timeout', 30)
+        self.connect_timeout = options.get('connect_timeout', 10)
+        self.retries = options.get('retries', 3)
+        self.backoff_base = options.get('backoff_base', 0.2)
+        self.backoff_max = options.get('backoff_max', 10)
+        self.retry_statuses = tuple(options.get('retry_statuses', self.RETRY_STATUSES))
+        self.session = None
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.stats = {'requests': 0, 'retries': 0, 'coalesced': 0, 'errors': 0}
+
+    def _get_session(self):
+        import aiohttp
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            timeout = aiohttp.ClientTimeout(total=self.timeout, sock_connect=self.connect_timeout)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self.session
 
     async def send_request(self, url: str, method: str = 'GET', headers: Dict[str, str] = None, params: Dict[str, str] = None, body: Dict[str, str] = None) -> Dict:
+        if method.upper() not in ('GET', 'HEAD'):
+            return await self._timed_send(url, method, headers, params, body)
+        # Identical idempotent requests already in flight share one network call.
+        key = request_key(method, url, params, headers, body)
+        if key in self.in_flight:
+            self.stats['coalesced'] += 1
+            Telemetry.get_instance().increment('http_coalesced_total')
+            return await asyncio.shield(self.in_flight[key])
+        future = asyncio.ensure_future(self._timed_send(url, method, headers, params, body))
+        self.in_flight[key] = future
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.request(method, url, headers=headers or {}, params=params or {}, json=body or {}) as response:
-                    response.raise_for_status()
-                    return await response.json()
-        except aiohttp.ClientError as e:
-            await self.logger.log("error", f"Request to {url} failed: {e}")
-            return {}
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self.in_flight.pop(key, None)
+            else:
+                future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+
+    async def _timed_send(self, url: str, method: str, headers: Dict[str, str], params: Dict[str, str], body: Dict[str, str]) -> Dict:
+        with Telemetry.get_instance().span('http.request', url):
+            return await self._send_with_retries(url, method, headers, params, body)
+
+    async def _send_with_retries(self, url: str, method: str, headers: Dict[str, str], params: Dict[str, str], body: Dict[str, str]) -> Dict:
+        import aiohttp
+        telemetry = Telemetry.get_instance()
+        for attempt in range(self.retries + 1):
+            self.stats['requests'] += 1
+            telemetry.increment('http_requests_total')
+            try:
+                async with self._get_session().request(method, url, headers=headers or {}, params=params or {}, json=body or {}) as response:
+                    if response.status not in self.retry_statuses or attempt >= self.retries:
+                        response.raise_for_status()
+                        return await response.json()
+                    retry_after = response.headers.get('Retry-After', '')
+                # Back off after the response is released, so waiting never holds a pooled connection.
+                await self._backoff(attempt, float(retry_after) if retry_after.isdigit() else None)
+                continue
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt < self.retries and not isinstance(e, aiohttp.ClientResponseError):
+                    await self._backoff(attempt)
+                    continue
+                self.stats['errors'] += 1
+                telemetry.increment('http_errors_total')
+                await self.logger.log("error", f"Request to {url} failed: {e}")
+                return {}
+        return {}
+
+    async def _backoff(self, attempt: int, delay: float = None) -> None:
+        self.stats['retries'] += 1
+        Telemetry.get_instance().increment('http_retries_total')
+        # Full jitter keeps many workers retrying the same host from synchronising; a server's
+        # Retry-After is honoured up to backoff_max.
+        await asyncio.sleep(min(delay, self.backoff_max) if delay is not None else random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+
+    async def close(self) -> None:
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+_NON_ALPHANUMERIC = re.compile(r'[^a-zA-Z0-9\s]')
+_WHITESPACE_RUN = re.compile(r'\s+')
 
 class TextProcessor:
     @staticmethod
     def clean_text(text: str, max_length: int = 512) -> str:
-        text = re.sub(r'\s+', ' ', re.sub(r'[^a-zA-Z0-9\s]', '', text))
-        return text[:max_length]
+        # Cleans growing prefixes instead of the whole text, so only enough of a large
+        # document to fill max_length is ever copied.
+        end = max_length * 2
+        while True:
+            cleaned = _WHITESPACE_RUN.sub(' ', _NON_ALPHANUMERIC.sub('', text[:end]))
+            if len(cleaned) > max_length or end >= len(text):
+                return cleaned[:max_length]
+            end *= 4
+
+class ModelRegistry:
+    # Process-wide cache of HuggingFace pipelines keyed by (task, model id). Models load on
+    # first use, concurrent requests for the same key share one load, and the least recently
+    # used entries are evicted once the estimated weight size exceeds the memory budget.
+    _instance = None
+
+    def __init__(self, options: Dict = None) -> None:
+        self.entries: Dict[tuple, Dict] = {}
+        self.lock = threading.Lock()
+        self.key_locks: Dict[tuple, threading.Lock] = {}
+        self.warmup_task = None
+        self.stats = {'loads': 0, 'hits': 0, 'evictions': 0}
+        self.configure(options or {})
+
+    @classmethod
+    def get_instance(cls, options: Dict = None) -> 'ModelRegistry':
+        if cls._instance is None:
+            cls._instance = cls(options)
+        return cls._instance
+
+    def configure(self, options: Dict) -> None:
+        # Options come from the 'model_registry' config block.
+        self.memory_budget = options.get('memory_budget_mb', 0) * 1024 * 1024
+        self.warmup = options.get('warmup', [])
+
+    def load(self, task: str, model_id: str, **pipeline_kwargs):
+        key = (task, model_id)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self._touch(key, entry)
+                return entry['pipeline']
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None:
+                    self._touch(key, entry)
+                    return entry['pipeline']
+            from transformers import pipeline
+            nlp_pipeline = pipeline(task, model=model_id, **pipeline_kwargs)
+            with self.lock:
+                self.stats['loads'] += 1
+                self.entries[key] = {'pipeline': nlp_pipeline, 'bytes': self.estimate_bytes(nlp_pipeline), 'last_used': time.monotonic()}
+                self._evict(keep=key)
+            return nlp_pipeline
+
+    def register(self, task: str, model_id: str, nlp_pipeline) -> None:
+        # Installs an already-built pipeline (or a stand-in with the same call signature) under a key.
+        with self.lock:
+            self.entries[(task, model_id)] = {'pipeline': nlp_pipeline, 'bytes': self.estimate_bytes(nlp_pipeline), 'last_used': time.monotonic()}
+            self._evict(keep=(task, model_id))
+
+    async def get(self, task: str, model_id: str, **pipeline_kwargs):
+        key = (task, model_id)
+        if key in self.entries:
+            return self.load(task, model_id, **pipeline_kwargs)
+        return await asyncio.to_thread(self.load, task, model_id, **pipeline_kwargs)
+
+    def start_warmup(self) -> None:
+        # Loads the configured [task, model id] pairs in the background so the first file does not pay for them.
+        if self.warmup and self.warmup_task is None:
+            self.warmup_task = asyncio.create_task(self._warm_up())
+
+    async def _warm_up(self) -> None:
+        for task, model_id in self.warmup:
+            try:
+                await self.get(task, model_id)
+            except Exception as e:
+                LoggerService.get_instance().logger.warning(f"Model warm-up failed for {model_id} ({task}): {e}")
+
+    def _touch(self, key: tuple, entry: Dict) -> None:
+        self.stats['hits'] += 1
+        entry['last_used'] = time.monotonic()
+
+    def _evict(self, keep: tuple) -> None:
+        if not self.memory_budget:
+            return
+        for key in sorted(self.entries, key=lambda k: self.entries[k]['last_used']):
+            if self.total_bytes() <= self.memory_budget:
+                break
+            if key != keep:
+                # Callers still holding the pipeline keep it alive until they drop it.
+                del self.entries[key]
+                self.stats['evictions'] += 1
+
+    def total_bytes(self) -> int:
+        return sum(entry['bytes'] for entry in self.entries.values())
+
+    @staticmethod
+    def estimate_bytes(nlp_pipeline) -> int:
+        model = getattr(nlp_pipeline, 'model', None)
+        try:
+            tensors = list(model.parameters()) + list(model.buffers())
+        except AttributeError:
+            return 0
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
 
 class ModelManager:
     def __init__(self, logger: LoggerService) -> None:
         self.logger = logger
-        self.models = {}
+        self.registry = ModelRegistry.get_instance()
+        self.model_specs: Dict[str, str] = {}
 
     def init_models(self, config: Dict) -> None:
-        from transformers import AutoModelForQuestionAnswering, AutoTokenizer, pipeline, set_seed
+        # Only records which model serves each task; weights are loaded by the registry on first use.
+        from transformers import set_seed
         set_seed(42)
         for model_config in config.get('model_configs', []):
-            name, task = model_config['name'], model_config['task']
-            try:
-                model = AutoModelForQuestionAnswering.from_pretrained(name)
-                tokenizer = AutoTokenizer.from_pretrained(name)
-                self.models[task] = pipeline(task, model=model, tokenizer=tokenizer)
-            except Exception as e:
-                asyncio.run(self.logger.log("error", f"Failed to load model {name} for task {task}: {e}"))
+            self.model_specs[model_config['task']] = model_config['name']
+
+    def get_model(self, task: str):
+        return self.registry.load(task, self.model_specs[task])
 
 class FileManager:
     @staticmethod
-    def find_files(directory: str) -> List[str]:
-        return [os.path.join(root, name) for root, _, names in os.walk(directory) for name in names if not name.startswith('.')]
+    def find_files(directory: str, options: Dict = None) -> Iterator[str]:
+        from src.processing.file_crawler import DirectoryCrawler
+        return DirectoryCrawler(options).walk(directory)
+
+    @staticmethod
+    def iter_files(directory: str, options: Dict = None) -> AsyncIterator[str]:
+        from src.processing.file_crawler import DirectoryCrawler
+        return DirectoryCrawler(options).iter_files(directory)
+
+    @staticmethod
+    async def read_file(file_path: str) -> str:
+        async with aiofiles.open(file_path, mode='r', encoding='utf-8', errors='ignore') as f:
+            return await f.read()
+
+    @staticmethod
+    async def read_bytes(file_path: str) -> bytes:
+        async with aiofiles.open(file_path, mode='rb') as f:
+            return await f.read()
 
 class ShellMapper:
     def execute_shell_command(self, command: str, parameters: dict, mood: str = 'neutral', sentiment: str = 'neutral') -> None: